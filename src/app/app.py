@@ -1,16 +1,27 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from starlette.templating import Jinja2Templates
 
 from app.config import AppConfig
 from app.logging_config import configure_logging
-from app.services.auth import ensure_session_middleware
-from app.routes.web import router as web_router
+from app.observability.metrics import MetricsMiddleware, mark_process_dead
+from app.observability.timing import ServerTimingMiddleware
+from app.routes.api import get_admission_controller
 from app.routes.api import router as api_router
 from app.routes.auth_api import router as auth_router
+from app.routes.export import router as export_router
+from app.routes.metrics import router as metrics_router
+from app.routes.resumable import router as resumable_router
+from app.routes.resumable import sweep_expired_uploads
+from app.routes.uploads import router as uploads_router
+from app.routes.web import router as web_router
+from app.services.admission import AdmissionMiddleware
+from app.services.auth import ensure_session_middleware
+from app.templating import build_templates
 
 
 # Factory function to create a FastAPI app instance
@@ -21,8 +32,20 @@ def create_app() -> FastAPI:
         from app.storage.filesystem import FileSystem
         fs = FileSystem()
         fs.ensure_storage(AppConfig.UPLOAD_DIR, AppConfig.METADATA_FILE)
+        warmup = None
+        if AppConfig.WARMUP_ON_STARTUP:
+            # Started here but not awaited: the server begins listening right away
+            from app.services.warmup import warm_up
+            warmup = asyncio.create_task(asyncio.to_thread(warm_up))
+        sweeper = None
+        if AppConfig.RESUMABLE_SWEEP_INTERVAL_S > 0:
+            sweeper = asyncio.create_task(sweep_expired_uploads(AppConfig.RESUMABLE_SWEEP_INTERVAL_S))
         yield
-        # No shutdown actions needed currently
+        if warmup is not None and not warmup.done():
+            warmup.cancel()
+        if sweeper is not None:
+            sweeper.cancel()
+        mark_process_dead()
 
     configure_logging()
     app = FastAPI(
@@ -35,12 +58,15 @@ def create_app() -> FastAPI:
         openapi_url="/openapi.json",
     )
 
-    # Mount static-like uploads serving
-    app.mount("/uploads", StaticFiles(directory=AppConfig.UPLOAD_DIR), name="uploads")
+    # Mount static-like uploads serving; object storage redirects to presigned URLs instead
+    if AppConfig.STORAGE_BACKEND in ('', 'local'):
+        app.mount("/uploads", StaticFiles(directory=AppConfig.UPLOAD_DIR), name="uploads")
+    else:
+        app.include_router(uploads_router)
 
-    # Templates setup
+    # Templates setup: compiled now (through the bytecode cache) rather than on first request
     templates_dir = os.path.join(os.path.dirname(__file__), '..', 'templates')
-    app.state.templates = Jinja2Templates(directory=templates_dir)
+    app.state.templates = build_templates(templates_dir)
 
     # CORS (optional, open by default for demo)
     app.add_middleware(
@@ -52,10 +78,19 @@ def create_app() -> FastAPI:
     )
 
     # Register routes
+    # Upload admission control; added before the session middleware so it runs inside it and sees the user
+    app.add_middleware(AdmissionMiddleware, controller=get_admission_controller())
     ensure_session_middleware(app)
+    # Per-phase timings (Server-Timing header, timing log line, slow request profiles)
+    app.add_middleware(ServerTimingMiddleware)
+    # Request latency histograms; added last so it wraps the whole middleware stack
+    app.add_middleware(MetricsMiddleware)
     app.include_router(web_router)
     app.include_router(api_router, prefix="/api")
+    app.include_router(export_router, prefix="/api")
+    app.include_router(resumable_router, prefix="/api")
     app.include_router(auth_router)
+    app.include_router(metrics_router)
 
     return app
 
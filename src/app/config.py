@@ -1,8 +1,54 @@
 import os
 
+from dotenv import load_dotenv
+
+# .env values must be in the environment before the settings below (and in the services) are read
+load_dotenv()
+
 
 class AppConfig:
     UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads')
     METADATA_FILE = os.path.join(UPLOAD_DIR, 'metadata.json')
+    # Single-entry updates are journaled next to METADATA_FILE; past this size the journal is folded into it
+    METADATA_JOURNAL_MAX_BYTES = int(os.environ.get('METADATA_JOURNAL_MAX_BYTES', str(1024 * 1024)))
     ALLOWED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    # JSON codec for API responses and metadata.json: 'stdlib', 'orjson' or 'msgspec' (pip install -e .[fast-json])
+    JSON_CODEC = os.environ.get('JSON_CODEC', 'stdlib').lower()
+    # Rendered gallery / listing payload cache
+    RENDER_CACHE_MAX_ENTRIES = int(os.environ.get('RENDER_CACHE_MAX_ENTRIES', '256'))
+    RENDER_CACHE_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))  # 32MB
+    # 'sharded' stores new uploads as ab/cd/<uuid>.ext; 'flat' keeps them directly in UPLOAD_DIR
+    UPLOAD_LAYOUT = os.environ.get('UPLOAD_LAYOUT', 'sharded').lower()
+    # Import google.genai / authlib and build their clients in the background after startup
+    WARMUP_ON_STARTUP = os.environ.get('WARMUP_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes')
+    # Where uploaded files live: 'local' (UPLOAD_DIR) or 's3' (any S3-compatible object store)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local').lower()
+    S3_BUCKET = os.environ.get('S3_BUCKET', '')
+    S3_PREFIX = os.environ.get('S3_PREFIX', 'uploads')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')  # e.g. http://localhost:9000 for MinIO
+    S3_REGION = os.environ.get('S3_REGION')
+    S3_PRESIGN_EXPIRES = int(os.environ.get('S3_PRESIGN_EXPIRES', '300'))
+    S3_MAX_POOL_CONNECTIONS = int(os.environ.get('S3_MAX_POOL_CONNECTIONS', '32'))
+    S3_MULTIPART_CHUNK_BYTES = int(os.environ.get('S3_MULTIPART_CHUNK_BYTES', str(8 * 1024 * 1024)))
+    # Near-duplicate detection (Hamming distance between 64-bit dHashes):
+    # up to REUSE the earlier analysis is reused, up to REVIEW the upload is flagged for approval
+    PHASH_REUSE_DISTANCE = int(os.environ.get('PHASH_REUSE_DISTANCE', '4'))
+    PHASH_REVIEW_DISTANCE = int(os.environ.get('PHASH_REVIEW_DISTANCE', '8'))
+    # Dump a profile of requests slower than this many milliseconds (0 disables profiling)
+    PROFILE_SLOW_REQUESTS_MS = float(os.environ.get('PROFILE_SLOW_REQUESTS_MS', '0'))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(UPLOAD_DIR), 'profiles'))
+    # Upload admission control: per-user token bucket (0 disables it) and global load-shedding limits
+    UPLOAD_RATE_PER_MINUTE = float(os.environ.get('UPLOAD_RATE_PER_MINUTE', '30'))
+    UPLOAD_BURST = int(os.environ.get('UPLOAD_BURST', '10'))
+    MAX_ANALYSIS_BACKLOG = int(os.environ.get('MAX_ANALYSIS_BACKLOG', '16'))  # uploads in progress; 0 = unlimited
+    MAX_INFLIGHT_UPLOAD_BYTES = int(os.environ.get('MAX_INFLIGHT_UPLOAD_BYTES', str(256 * 1024 * 1024)))  # 0 = unlimited
+    ADMISSION_RETRY_AFTER_S = int(os.environ.get('ADMISSION_RETRY_AFTER_S', '5'))
+    # Share admission state between uvicorn workers through this file (flock); empty keeps it per process
+    ADMISSION_STATE_FILE = os.environ.get('ADMISSION_STATE_FILE', '')
+    # Resumable (tus-style) uploads: staged chunks live here, outside the served UPLOAD_DIR
+    RESUMABLE_STAGING_DIR = os.environ.get('RESUMABLE_STAGING_DIR', os.path.join(os.path.dirname(UPLOAD_DIR), 'staging'))
+    RESUMABLE_UPLOAD_TTL_S = float(os.environ.get('RESUMABLE_UPLOAD_TTL_S', str(24 * 3600)))  # since the last chunk
+    RESUMABLE_SWEEP_INTERVAL_S = float(os.environ.get('RESUMABLE_SWEEP_INTERVAL_S', '600'))
+    # Compiled Jinja templates are cached here across workers and restarts ('' = Jinja's temp dir, 'off' = disabled)
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR', '')
@@ -0,0 +1,239 @@
+import codecs
+import io
+import json
+import logging
+import re
+from collections.abc import Iterable, Iterator
+from typing import Any, BinaryIO
+
+from starlette.responses import JSONResponse
+
+from app.config import AppConfig
+
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+try:
+    import msgspec
+except Exception:  # pragma: no cover
+    msgspec = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class JsonCodec:
+    """stdlib json; the default and the reference the fast codecs must match.
+
+    `indent=True` produces the two-space layout metadata.json uses.
+    """
+    name = 'stdlib'
+
+    def dumps(self, obj: Any, indent: bool = False) -> bytes:
+        return json.dumps(obj, indent=2 if indent else None).encode('utf-8')
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def dump(self, obj: Any, fp: BinaryIO, indent: bool = False) -> None:
+        # Stream through a text wrapper instead of building the whole document in memory
+        writer = io.TextIOWrapper(fp, encoding='utf-8')
+        json.dump(obj, writer, indent=2 if indent else None)
+        writer.flush()
+        writer.detach()
+
+    def load(self, fp: BinaryIO) -> Any:
+        # Decoded through a text wrapper, so the raw bytes are freed before parsing rather than held alongside the text
+        reader = io.TextIOWrapper(fp, encoding='utf-8')
+        try:
+            return json.load(reader)
+        finally:
+            reader.detach()
+
+
+class OrjsonCodec(JsonCodec):
+    name = 'orjson'
+
+    def dumps(self, obj: Any, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+    def dump(self, obj: Any, fp: BinaryIO, indent: bool = False) -> None:
+        fp.write(self.dumps(obj, indent))
+
+    def load(self, fp: BinaryIO) -> Any:
+        return orjson.loads(fp.read())
+
+
+class MsgspecCodec(JsonCodec):
+    name = 'msgspec'
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any, indent: bool = False) -> bytes:
+        data = self._encoder.encode(obj)
+        return msgspec.json.format(data, indent=2) if indent else data
+
+    def loads(self, data: bytes | str) -> Any:
+        return self._decoder.decode(data)
+
+    def dump(self, obj: Any, fp: BinaryIO, indent: bool = False) -> None:
+        fp.write(self.dumps(obj, indent))
+
+    def load(self, fp: BinaryIO) -> Any:
+        return self._decoder.decode(fp.read())
+
+
+_CODECS: dict[str, type | None] = {
+    'stdlib': JsonCodec,
+    'orjson': OrjsonCodec if orjson is not None else None,
+    'msgspec': MsgspecCodec if msgspec is not None else None,
+}
+_codec: JsonCodec | None = None
+_codec_setting: str | None = None
+
+
+def available_codecs() -> list[str]:
+    """Codec names whose packages are installed."""
+    return [name for name, cls in _CODECS.items() if cls is not None]
+
+
+def codec_by_name(name: str) -> JsonCodec:
+    """Build a codec; a fast codec whose package is missing falls back to stdlib with a warning."""
+    if name not in _CODECS:
+        raise ValueError(f"Unknown JSON_CODEC '{name}'; choose from {', '.join(_CODECS)}")
+    cls = _CODECS[name]
+    if cls is None:
+        logger.warning("JSON_CODEC=%s requested but the package is not installed; using stdlib json", name)
+        cls = JsonCodec
+    return cls()
+
+
+def get_codec() -> JsonCodec:
+    """Process-wide codec selected by AppConfig.JSON_CODEC."""
+    global _codec, _codec_setting
+    if _codec is None or _codec_setting != AppConfig.JSON_CODEC:
+        _codec = codec_by_name(AppConfig.JSON_CODEC)
+        _codec_setting = AppConfig.JSON_CODEC
+    return _codec
+
+
+def iter_ndjson(items: Iterable[Any], chunk_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """Encode items as newline-delimited JSON, yielded in chunks of about `chunk_bytes`.
+
+    Batching keeps the per-chunk overhead of a streamed response (one
+    threadpool hop and one send per chunk) low without buffering the body.
+    """
+    dumps = get_codec().dumps
+    chunk: list[bytes] = []
+    size = 0
+    for item in items:
+        line = dumps(item)
+        chunk.append(line)
+        chunk.append(b'\n')
+        size += len(line) + 1
+        if size >= chunk_bytes:
+            yield b''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DELIMITERS = frozenset(' \t\n\r,]')
+
+
+def iter_json_array(fp: BinaryIO, chunk_bytes: int = 256 * 1024) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time.
+
+    The document is read `chunk_bytes` at a time and each element is decoded
+    with the C scanner behind json.JSONDecoder.raw_decode, so memory holds one
+    chunk and the element being parsed instead of the whole text plus every
+    parsed element. An element cut off at the end of the buffer fails to
+    decode and is retried once the next chunk is in. Raises ValueError for a
+    document that is not a well-formed array.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buf, pos, eof = '', 0, False
+
+    def more() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = fp.read(chunk_bytes)
+        eof = not chunk
+        buf = buf[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+        return True
+
+    def peek() -> str:
+        """Skip whitespace; the next character, or '' at the end of the document."""
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos < len(buf):
+                return buf[pos]
+            if not more():
+                return ''
+
+    if peek() != '[':
+        raise ValueError('expected a JSON array')
+    pos += 1
+    if peek() == ']':
+        return
+    while True:
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not more():
+                    raise
+                continue
+            # A number cut by the chunk boundary ('12' of '125', '-0' of '-0.5') still
+            # decodes; only trust an element that is followed by a delimiter
+            if (end < len(buf) and buf[end] in _DELIMITERS) or not more():
+                break
+        yield item
+        pos = end
+        delimiter = peek()
+        if delimiter == ']':
+            return
+        if delimiter != ',':
+            raise ValueError(f"expected ',' or ']' after array element, got {delimiter or 'end of document'!r}")
+        pos += 1
+        peek()
+
+
+def write_json_array(items: Iterable[Any], fp: BinaryIO, codec: JsonCodec) -> None:
+    """Write items as an indented JSON array one element at a time.
+
+    The bytes match codec.dump(list(items), fp, indent=True): each element is
+    encoded on its own and shifted one level in. JSON strings cannot hold a raw
+    newline, so every newline in an element is layout.
+    """
+    first = True
+    for item in items:
+        fp.write(b'[\n  ' if first else b',\n  ')
+        fp.write(codec.dumps(item, indent=True).replace(b'\n', b'\n  '))
+        first = False
+    fp.write(b'[]' if first else b'\n]')
+
+
+class CodecJSONResponse(JSONResponse):
+    """JSONResponse rendered with the configured codec.
+
+    Content is written as given: no jsonable_encoder pass and no response model
+    validation, so handlers must hand over plain JSON types.
+    """
+    def render(self, content: Any) -> bytes:
+        return get_codec().dumps(content)
+
+
+__all__ = ["CodecJSONResponse", "JsonCodec", "MsgspecCodec", "OrjsonCodec", "available_codecs", "codec_by_name", "get_codec",
+           "iter_json_array", "iter_ndjson", "write_json_array"]
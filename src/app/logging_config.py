@@ -1,32 +1,184 @@
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
+import random
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
 
+from app.observability.timing import current_request_id
 
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
 LOG_FORMAT = os.environ.get(
     "LOG_FORMAT",
     "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
 )
+# 'sync' writes from the logging thread; 'queue' hands records to a background listener thread
+LOG_MODE = os.environ.get("LOG_MODE", "sync").lower()
+# Emit one JSON object per line instead of LOG_FORMAT
+LOG_JSON = os.environ.get("LOG_JSON", "false").lower() in ("1", "true", "yes")
+# Share of INFO/DEBUG records kept per logger, e.g. "app.routes.web=0.1,httpx=0"
+LOG_SAMPLING = os.environ.get("LOG_SAMPLING", "")
+
+_listener: QueueListener | None = None
+# Root handlers set aside while the listener writes instead of them; put back by shutdown_logging()
+_replaced: list[logging.Handler] = []
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the id of the request they were logged in ('-' outside requests)."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'request_id'):
+            record.request_id = current_request_id() or '-'
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a share of INFO and lower records for chosen loggers.
+
+    The most specific configured prefix wins ('app.routes' covers
+    'app.routes.web'); warnings and errors always pass.
+    """
+    def __init__(self, rates: dict[str, float], rng: random.Random | None = None):
+        super().__init__()
+        # longest prefix first so the most specific rule matches
+        self._rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self._random = (rng or random.Random()).random
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        for prefix, rate in self._rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                return rate >= 1 or (rate > 0 and self._random() < rate)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, request_id plus duration_ms/phases when given."""
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            'ts': datetime.fromtimestamp(record.created, UTC).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        request_id = getattr(record, 'request_id', '-')
+        if request_id != '-':
+            doc['request_id'] = request_id
+        for key in ('duration_ms', 'phases'):
+            value = getattr(record, key, None)
+            if value is not None:
+                doc[key] = value
+        if record.exc_info:
+            doc['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            doc['exc_info'] = record.exc_text
+        return json.dumps(doc, default=str)
+
+
+class _RecordQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener.
+
+    The stock prepare() runs the full formatter on the logging thread; here only
+    the message arguments are interpolated (they may change after the call) and
+    a traceback is rendered to text (frames can't outlive the call safely).
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_sampling(spec: str) -> dict[str, float]:
+    rates: dict[str, float] = {}
+    for part in spec.split(','):
+        name, sep, rate = part.partition('=')
+        if not sep or not name.strip():
+            continue
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+def build_handler(stream=None, mode: str = "sync", json_lines: bool = False, sampling: str = "",
+                  level: str = "INFO") -> tuple[logging.Handler, QueueListener | None]:
+    """Handler to attach to a logger, plus the listener to start in queue mode.
+
+    In queue mode the filters run on the QueueHandler, i.e. in the logging
+    thread: the request id is captured there and sampled-out records never
+    reach the queue. Formatting and the stream write happen on the listener.
+    """
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setLevel(level)
+    stream_handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(LOG_FORMAT))
+    handler: logging.Handler = stream_handler
+    listener = None
+    if mode == "queue":
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        handler = _RecordQueueHandler(log_queue)
+        handler.setLevel(level)
+        listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    handler.addFilter(RequestContextFilter())
+    rates = parse_sampling(sampling)
+    if rates:
+        handler.addFilter(SamplingFilter(rates))
+    return handler, listener
 
 
 def configure_logging() -> None:
-    # Avoid adding duplicate handlers if called multiple times (e.g., tests)
+    global _listener
     root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+
+    if LOG_MODE == "queue":
+        if _listener is not None:
+            return
+        handler, _listener = build_handler(mode="queue", json_lines=LOG_JSON, sampling=LOG_SAMPLING, level=LOG_LEVEL)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        # The listener's handler takes over: one left on the root would print every record a second time
+        _replaced[:] = root.handlers
+        for h in _replaced:
+            root.removeHandler(h)
+        root.addHandler(handler)
+        return
+
+    # Avoid adding duplicate handlers if called multiple times (e.g., tests)
     if any(isinstance(h, logging.StreamHandler) for h in root.handlers):
         # Still update level/format on existing stream handlers
-        root.setLevel(LOG_LEVEL)
         for h in root.handlers:
             if isinstance(h, logging.StreamHandler):
                 h.setLevel(LOG_LEVEL)
-                h.setFormatter(logging.Formatter(LOG_FORMAT))
+                h.setFormatter(JsonFormatter() if LOG_JSON else logging.Formatter(LOG_FORMAT))
         return
 
-    handler = logging.StreamHandler()
-    handler.setLevel(LOG_LEVEL)
-    handler.setFormatter(logging.Formatter(LOG_FORMAT))
-
-    root.setLevel(LOG_LEVEL)
+    handler, _ = build_handler(json_lines=LOG_JSON, sampling=LOG_SAMPLING, level=LOG_LEVEL)
     root.addHandler(handler)
 
 
-__all__ = ["configure_logging"]
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread (queue mode only)."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        if isinstance(h, QueueHandler):
+            root.removeHandler(h)
+    for h in _replaced:
+        root.addHandler(h)
+    _replaced.clear()
+
+
+__all__ = ["build_handler", "configure_logging", "shutdown_logging", "JsonFormatter", "RequestContextFilter", "SamplingFilter"]
@@ -0,0 +1,124 @@
+import threading
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any
+
+from app.models.image_entry import Stage
+
+
+def _version(entry: Mapping[str, Any]) -> int:
+    # Same leniency as ImageService.determine_version: unparsable versions count as 0
+    try:
+        return int(entry.get('version') or 0)
+    except Exception:
+        return 0
+
+
+def _size(entry: Mapping[str, Any]) -> int:
+    size = entry.get('size')
+    return size if type(size) is int else 0
+
+
+class CatalogueStats:
+    """Catalogue aggregates maintained entry by entry.
+
+    Counts per stage, count and latest version per medicine (matched
+    case-insensitively, like determine_version), total bytes and uploads per
+    day (UTC date of uploaded_at). add() and remove() cost O(1), so writers
+    keep it current instead of readers scanning the catalogue; a stage
+    transition is a remove of the old entry plus an add of the new one.
+    `revision` is the highest entry revision added; it is never lowered, as
+    revisions only grow.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.total_bytes = 0
+        self.revision = 0
+        self._by_stage: dict[str, int] = {}
+        # lower-cased name -> [display name, count, {version: count}, latest version]
+        self._medicines: dict[str, list] = {}
+        self._by_day: dict[str, int] = {}
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Mapping[str, Any]]) -> "CatalogueStats":
+        stats = cls()
+        for _ in stats.counted(entries):
+            pass
+        return stats
+
+    def counted(self, entries: Iterable[Mapping[str, Any]]) -> Iterator[Mapping[str, Any]]:
+        """Pass entries through, adding each one; lets a write tally while it streams."""
+        for entry in entries:
+            self.add(entry)
+            yield entry
+
+    def add(self, entry: Mapping[str, Any]) -> None:
+        self._apply(entry, 1)
+
+    def remove(self, entry: Mapping[str, Any]) -> None:
+        self._apply(entry, -1)
+
+    def _apply(self, entry: Mapping[str, Any], delta: int) -> None:
+        stage = entry.get('stage') or Stage.UPLOADED.value
+        name = entry.get('medicine_name') or ''
+        key = str(name).lower()
+        version = _version(entry)
+        day = str(entry.get('uploaded_at') or '')[:10]
+        revision = entry.get('revision')
+        with self._lock:
+            self.total += delta
+            self.total_bytes += delta * _size(entry)
+            if delta > 0 and type(revision) is int and revision > self.revision:
+                self.revision = revision
+            _bump(self._by_stage, stage, delta)
+            if day:
+                _bump(self._by_day, day, delta)
+            medicine = self._medicines.get(key)
+            if medicine is None:
+                medicine = self._medicines[key] = [name, 0, {}, 0]
+            medicine[1] += delta
+            if not medicine[1]:
+                del self._medicines[key]
+                return
+            versions = medicine[2]
+            _bump(versions, version, delta)
+            if delta > 0 and version > medicine[3]:
+                medicine[3] = version
+            elif delta < 0 and version == medicine[3] and version not in versions:
+                # The latest version left; the next one down is among this medicine's few versions
+                medicine[3] = max(versions, default=0)
+
+    def latest_version(self, medicine_name: str) -> int:
+        """Highest version stored for `medicine_name` (case-insensitive), 0 if there is none."""
+        with self._lock:
+            medicine = self._medicines.get(str(medicine_name or '').lower())
+            return medicine[3] if medicine is not None else 0
+
+    def stage_counts(self) -> dict[str, int]:
+        with self._lock:
+            counts = {stage.value: 0 for stage in Stage}
+            counts.update(self._by_stage)
+            return counts
+
+    def to_dict(self) -> dict[str, Any]:
+        counts = self.stage_counts()
+        with self._lock:
+            medicines = [{'medicine_name': name or None, 'count': count, 'latest_version': latest}
+                         for _, (name, count, _, latest) in sorted(self._medicines.items())]
+            return {
+                'total': self.total,
+                'total_bytes': self.total_bytes,
+                'by_stage': counts,
+                'medicines': medicines,
+                'uploads_per_day': dict(sorted(self._by_day.items())),
+            }
+
+
+def _bump(counts: dict[Any, int], key: Any, delta: int) -> None:
+    value = counts.get(key, 0) + delta
+    if value:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
@@ -0,0 +1,81 @@
+import sys
+from dataclasses import dataclass
+from typing import Any
+
+# Low-cardinality values shared by many entries; interned so each distinct
+# value is stored once per process
+_INTERNED = frozenset({'content_type', 'medicine_name', 'stage', 'form', 'substance', 'model'})
+# Sentinel for the common url '/uploads/<stored_name>', rebuilt on output instead of stored
+_DERIVED_URL = '\0derived'
+# Stands in `extra` for a key whose value is held by the field of that name
+_FIELD = object()
+
+
+@dataclass(slots=True, eq=False)
+class CompactEntry:
+    """Memory-lean in-process form of a metadata entry.
+
+    A slotted object instead of a ~15-key dict per entry, with interned
+    low-cardinality strings and the default url left implicit. A field is None
+    when its key is absent. Whatever the fields can't express (keys without a
+    field such as duplicate markers, explicit nulls, a key order other than
+    the fields') makes `extra` hold the entry's keys in order, so
+    from_dict/to_dict round-trip losslessly. Convert with to_dict() at the
+    API/template boundary.
+    """
+    id: Any = None
+    original_name: str | None = None
+    stored_name: str | None = None
+    url: str | None = None
+    size: int | None = None
+    content_type: str | None = None
+    uploaded_at: str | None = None
+    medicine_name: str | None = None
+    version: int | None = None
+    stage: str | None = None
+    form: str | None = None
+    substance: str | None = None
+    phash: str | None = None
+    model: str | None = None
+    revision: int | None = None
+    extra: dict[str, Any] | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "CompactEntry":
+        known = {key: value for key, value in data.items() if key in _FIELD_SET and value is not None}
+        for key in _INTERNED:
+            value = known.get(key)
+            if type(value) is str:
+                known[key] = sys.intern(value)
+        if len(known) != len(data) or not _in_field_order(data):
+            # Only entries the fields can't reproduce pay for the layout
+            known['extra'] = {key: _FIELD if key in known else value for key, value in data.items()}
+        entry = cls(**known)
+        if entry.stored_name is not None and entry.url == f"/uploads/{entry.stored_name}":
+            entry.url = _DERIVED_URL
+        return entry
+
+    def to_dict(self) -> dict[str, Any]:
+        """Plain dict with the keys, values and key order of the dict it was built from."""
+        if self.extra is not None:
+            data = {key: getattr(self, key) if value is _FIELD else value for key, value in self.extra.items()}
+        else:
+            data = {}
+            for key in _FIELDS:
+                value = getattr(self, key)
+                if value is not None:
+                    data[key] = value
+        if self.url is _DERIVED_URL:
+            data['url'] = f"/uploads/{self.stored_name}"
+        return data
+
+
+_FIELDS = tuple(name for name in CompactEntry.__dataclass_fields__ if name != 'extra')
+_FIELD_SET = frozenset(_FIELDS)
+_FIELD_RANK = {name: rank for rank, name in enumerate(_FIELDS)}
+
+
+def _in_field_order(data: dict[str, Any]) -> bool:
+    # Only called once every key is known to be a field
+    ranks = [_FIELD_RANK[key] for key in data]
+    return ranks == sorted(ranks)
@@ -32,3 +32,10 @@ class ImageEntry(BaseModel):
     model_config = {
         'use_enum_values': True
     }
+
+
+class ImageUpdate(BaseModel):
+    """Fields a PATCH may change; omitted fields are left as they are."""
+    stage: Stage | None = Field(None, description="New stage")
+    medicine_name: Annotated[str, Field(min_length=1)] | None = Field(
+        None, description="Corrected medicine name; the entry moves to the next version of that medicine")
@@ -0,0 +1,158 @@
+import logging
+import os
+import time
+from collections.abc import Callable, Iterable
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+    from prometheus_client.core import GaugeMetricFamily
+except Exception:  # pragma: no cover
+    CollectorRegistry = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Standard prometheus_client switch: when set (to a shared, empty-at-start directory)
+# every uvicorn worker writes its samples there and /metrics aggregates all workers.
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 2 * 1024 ** 2, 4 * 1024 ** 2, 8 * 1024 ** 2, 16 * 1024 ** 2)
+
+
+class _NoopMetric:
+    """Stand-in used when prometheus-client isn't installed; every call is a no-op."""
+    def labels(self, *args, **kwargs) -> "_NoopMetric":
+        return self
+
+    def observe(self, *args, **kwargs) -> None:
+        pass
+
+    def inc(self, *args, **kwargs) -> None:
+        pass
+
+    def time(self) -> "_NoopMetric":
+        return self
+
+    def __enter__(self) -> "_NoopMetric":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+def _histogram(name: str, documentation: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+    if CollectorRegistry is None:
+        return _NoopMetric()
+    return Histogram(name, documentation, labelnames=tuple(labelnames), buckets=buckets)
+
+
+def _counter(name: str, documentation: str, labelnames: Iterable[str] = ()):
+    if CollectorRegistry is None:
+        return _NoopMetric()
+    return Counter(name, documentation, labelnames=tuple(labelnames))
+
+
+HTTP_REQUEST_LATENCY = _histogram('http_request_duration_seconds', 'HTTP request latency by route template',
+                                  ('method', 'route', 'status'))
+METADATA_LATENCY = _histogram('metadata_operation_duration_seconds', 'Metadata repository load/save/patch latency',
+                              ('operation',))
+ANALYZER_LATENCY = _histogram('analyzer_call_duration_seconds', 'PackagePhotoAnalyzer.analyze_image latency')
+ANALYZER_OUTCOMES = _counter('analyzer_calls_total', 'Analyzer calls by outcome', ('outcome',))
+FILE_WRITE_LATENCY = _histogram('upload_file_write_duration_seconds', 'Time spent writing uploaded files to storage')
+TEMPLATE_RENDER_LATENCY = _histogram('template_render_duration_seconds', 'Jinja template render latency',
+                                     ('template',))
+UPLOAD_SIZE = _histogram('upload_size_bytes', 'Size of accepted uploads', buckets=SIZE_BUCKETS)
+RENDER_CACHE_LOOKUPS = _counter('render_cache_lookups_total', 'Render cache lookups by payload kind and result',
+                                ('kind', 'result'))
+ADMISSION_REJECTIONS = _counter('upload_admission_rejections_total', 'Uploads rejected with 429 by reason',
+                                ('reason',))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency per route template.
+
+    Labels use the matched route path (e.g. /images/{image_id}/promote), never the
+    raw URL, to keep cardinality bounded.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = {'status': 500}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status_holder['status'] = message['status']
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_LATENCY.labels(scope['method'], _route_label(scope), str(status_holder['status'])) \
+                .observe(time.perf_counter() - start)
+
+
+def _route_label(scope) -> str:
+    route = scope.get('route')
+    if route is not None and getattr(route, 'path', None):
+        return route.path
+    # Mounted apps (e.g. /uploads static files) only leave their mount point in root_path
+    return scope.get('root_path') or 'unmatched'
+
+
+def render_latest(catalogue_counts: Callable[[], dict[str, int]] | None = None) -> tuple[bytes, str]:
+    """Return the exposition payload and its content type.
+
+    In multiprocess mode samples of all workers are merged from MULTIPROC_DIR.
+    Catalogue gauges are computed at scrape time from `catalogue_counts`.
+    """
+    if CollectorRegistry is None:
+        return b'# prometheus-client not installed\n', 'text/plain; version=0.0.4; charset=utf-8'
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    payload = generate_latest(registry)
+    if catalogue_counts is not None:
+        catalogue_registry = CollectorRegistry()
+        catalogue_registry.register(_CatalogueCollector(catalogue_counts))
+        payload += generate_latest(catalogue_registry)
+    return payload, CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the shared multiprocess directory on shutdown."""
+    if CollectorRegistry is not None and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class _CatalogueCollector:
+    def __init__(self, counts: Callable[[], dict[str, int]]):
+        self._counts = counts
+
+    def collect(self):
+        family = GaugeMetricFamily('catalogue_entries', 'Catalogue entries per stage', labels=['stage'])
+        for stage, count in sorted(self._counts().items()):
+            family.add_metric([stage], count)
+        yield family
+
+
+__all__ = [
+    "HTTP_REQUEST_LATENCY", "METADATA_LATENCY", "ANALYZER_LATENCY", "ANALYZER_OUTCOMES", "FILE_WRITE_LATENCY",
+    "TEMPLATE_RENDER_LATENCY", "UPLOAD_SIZE", "RENDER_CACHE_LOOKUPS", "MetricsMiddleware", "render_latest",
+    "mark_process_dead",
+]
@@ -0,0 +1,81 @@
+import cProfile
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any
+
+try:
+    from pyinstrument import Profiler
+except Exception:  # pragma: no cover
+    Profiler = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# One profile at a time per process: cProfile (sys.monitoring on 3.12+) and
+# pyinstrument both refuse to start while another profiler is active
+_ACTIVE = threading.Lock()
+
+
+class SlowRequestProfiler:
+    """Profiles requests and keeps the profile only when the request was slow.
+
+    Uses the pyinstrument sampling profiler when it is installed (low overhead,
+    async aware). Otherwise falls back to the deterministic cProfile, which is
+    noticeably slower and mixes interleaved async requests, so keep it for
+    debugging sessions only. Only one request is profiled at a time; requests
+    overlapping it run unprofiled.
+    """
+    def __init__(self, threshold_ms: float, output_dir: str):
+        self._threshold_ms = threshold_ms
+        self._output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        if Profiler is None:
+            logger.warning("pyinstrument not installed; profiling slow requests with cProfile")
+
+    def start(self) -> Any:
+        """Start profiling the current request; None if another profile is running or it can't start."""
+        if not _ACTIVE.acquire(blocking=False):
+            return None
+        try:
+            if Profiler is not None:
+                profiler = Profiler(async_mode='enabled')
+                profiler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+        except Exception as e:
+            # e.g. a debugger or coverage tool already holds the profiling hook
+            _ACTIVE.release()
+            logger.warning("Cannot profile request: %s", e)
+            return None
+        return profiler
+
+    def finish(self, profiler: Any, scope: dict, total_ms: float) -> str | None:
+        """Stop profiling; write the profile if the request exceeded the threshold."""
+        try:
+            if Profiler is not None:
+                profiler.stop()
+            else:
+                profiler.disable()
+        finally:
+            _ACTIVE.release()
+        if total_ms < self._threshold_ms:
+            return None
+
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', scope.get('path', '')).strip('_') or 'root'
+        base = os.path.join(self._output_dir, f"{int(time.time() * 1000)}-{scope.get('method', '')}-{slug}")
+        try:
+            if Profiler is not None:
+                path = base + '.html'
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+            else:
+                path = base + '.pstats'
+                profiler.dump_stats(path)
+        except Exception as e:
+            logger.warning("Failed to write profile for %s: %s", scope.get('path'), e)
+            return None
+        logger.info("Slow request %s %s took %.1f ms, profile written to %s", scope.get('method'), scope.get('path'), total_ms, path)
+        return path
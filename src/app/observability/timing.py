@@ -0,0 +1,141 @@
+import logging
+import re
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.config import AppConfig
+from app.observability.profiling import SlowRequestProfiler
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseTimer:
+    """Collects per-phase durations (milliseconds) for a single request.
+
+    Phases with the same name are summed, e.g. the two metadata loads an upload
+    performs show up as one `metadata_load` entry.
+    """
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] = self._phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    @property
+    def phases(self) -> dict[str, float]:
+        return dict(self._phases)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def server_timing(self) -> str:
+        """Render phases as a Server-Timing header value, with `app` as total so far."""
+        parts = [f"{name};dur={dur:.1f}" for name, dur in self._phases.items()]
+        parts.append(f"app;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+
+_current_timer: ContextVar[PhaseTimer | None] = ContextVar('phase_timer', default=None)
+_current_request_id: ContextVar[str | None] = ContextVar('request_id', default=None)
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+
+
+def current_timer() -> PhaseTimer | None:
+    return _current_timer.get()
+
+
+def current_request_id() -> str | None:
+    return _current_request_id.get()
+
+
+def _request_id_from(scope) -> str:
+    """Reuse a sane incoming X-Request-ID (set by a proxy) or make a new one."""
+    for name, value in scope.get('headers', []):
+        if name == b'x-request-id':
+            candidate = value.decode('latin-1')
+            if _REQUEST_ID_RE.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a phase of the current request; a no-op outside a timed request."""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.phase(name):
+        yield
+
+
+class ServerTimingMiddleware:
+    """Pure ASGI middleware that times each request's phases.
+
+    Adds `Server-Timing` and `X-Request-ID` headers (the id is also attached to
+    every log record of the request), logs a structured line with per-phase durations
+    (INFO for writes and slow requests, DEBUG otherwise) and, when
+    PROFILE_SLOW_REQUESTS_MS is set, dumps a profile of requests above it.
+    """
+    def __init__(self, app, profiler: SlowRequestProfiler | None = None):
+        self.app = app
+        if profiler is None and AppConfig.PROFILE_SLOW_REQUESTS_MS > 0:
+            profiler = SlowRequestProfiler(AppConfig.PROFILE_SLOW_REQUESTS_MS, AppConfig.PROFILE_DIR)
+        self._profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timer = PhaseTimer()
+        request_id = _request_id_from(scope)
+        token = _current_timer.set(timer)
+        id_token = _current_request_id.set(request_id)
+        status_holder = {'status': 500}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status_holder['status'] = message['status']
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', timer.server_timing().encode('latin-1')))
+                headers.append((b'x-request-id', request_id.encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        profile = None
+        try:
+            if self._profiler:
+                profile = self._profiler.start()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timer.reset(token)
+            total_ms = timer.elapsed_ms()
+            if profile is not None:
+                self._profiler.finish(profile, scope, total_ms)
+            self._log(scope, status_holder['status'], timer, total_ms)
+            _current_request_id.reset(id_token)
+
+    def _log(self, scope, status: int, timer: PhaseTimer, total_ms: float) -> None:
+        is_write = scope['method'] not in ('GET', 'HEAD')
+        slow = AppConfig.PROFILE_SLOW_REQUESTS_MS > 0 and total_ms >= AppConfig.PROFILE_SLOW_REQUESTS_MS
+        level = logging.INFO if (is_write or slow) else logging.DEBUG
+        if not logger.isEnabledFor(level):
+            return
+        phases = " ".join(f"{name}={dur:.1f}" for name, dur in timer.phases.items())
+        logger.log(level, "request timing method=%s path=%s status=%s total_ms=%.1f %s",
+                   scope['method'], scope['path'], status, total_ms, phases,
+                   extra={'duration_ms': round(total_ms, 1), 'phases': timer.phases})
+
+
+__all__ = ["PhaseTimer", "ServerTimingMiddleware", "current_request_id", "current_timer", "span"]
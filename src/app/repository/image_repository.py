@@ -1,26 +1,436 @@
-import json
-from typing import List, Dict, Any, Iterable
+import os
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+try:
+    import fcntl
+except Exception:  # pragma: no cover
+    fcntl = None  # type: ignore
 
 from app.config import AppConfig
+from app.json_codec import JsonCodec, get_codec, iter_json_array, write_json_array
+from app.models.catalogue_stats import CatalogueStats
+from app.models.compact_entry import CompactEntry
+from app.observability.metrics import METADATA_LATENCY
+from app.observability.timing import span
 from app.storage.filesystem import FileSystem
 
 
+def next_revision(entries: Iterable[dict[str, Any]]) -> int:
+    """Revision for the entries changed by the next write: one above the highest stored.
+
+    Every write stamps the entries it adds or changes, so `revision > N` selects
+    exactly what changed after a reader saw revision N, across workers and restarts.
+    """
+    return max((e['revision'] for e in entries if type(e.get('revision')) is int), default=0) + 1
+
+
+FileToken = tuple[int, int, int] | None
+
+
+class PreconditionFailed(Exception):
+    """The entry no longer is the version a conditional update was based on."""
+
+
 class ImageMetadataRepository:
-    """Handles metadata persistence (SRP, DIP)."""
-    def __init__(self, metadata_file: str, fs: FileSystem):
+    """Handles metadata persistence (SRP, DIP).
+
+    Single-entry updates (patch()) are not written into metadata.json but
+    appended as one line to a journal next to it, `metadata.json.patches`;
+    readers apply the journal over the file, and the next full rewrite folds
+    it in and empties it.
+
+    Safe to share between threads: the in-memory snapshot, index and
+    aggregates are guarded by a lock, taken before the journal's flock.
+    """
+    def __init__(self, metadata_file: str, fs: FileSystem, codec: JsonCodec | None = None,
+                 journal_max_bytes: int | None = None):
         self._metadata_file = metadata_file
+        self._journal_file = f"{metadata_file}.patches"
         self._fs = fs
+        self._codec = codec
+        self._journal_max_bytes = AppConfig.METADATA_JOURNAL_MAX_BYTES if journal_max_bytes is None else journal_max_bytes
+        self._generation = 0
+        self._stat_token: tuple[FileToken, FileToken] | None = None
+        self._snapshot: tuple[int, list[CompactEntry]] | None = None
+        # What the snapshot reflects: the metadata file's token, the journal's inode and the journal bytes applied
+        self._applied: tuple[FileToken, int | None, int] | None = None
+        self._index: tuple[list[CompactEntry], dict[Any, int]] | None = None
+        self._patched: list[int] = []
+        self._stats: tuple[int, CatalogueStats] | None = None
+        # Sync routes run on the threadpool, next to the async ones on the event loop
+        self._lock = threading.RLock()
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped whenever the metadata file changes.
+
+        Writes from this process bump it directly; writes from other workers are
+        detected through the inode/mtime/size of the file and its journal, so
+        caches keyed on it are invalidated without any cross-process signalling.
+        """
+        with self._lock:
+            token = self._current_stat_token()
+            if token != self._stat_token:
+                self._stat_token = token
+                self._generation += 1
+            return self._generation
 
-    def load_all(self) -> List[Dict[str, Any]]:
+    @property
+    def _json(self) -> JsonCodec:
+        return self._codec or get_codec()
+
+    def load_all(self) -> list[dict[str, Any]]:
+        self._fs.ensure_storage(AppConfig.UPLOAD_DIR, self._metadata_file)
+        with span('metadata_load'), METADATA_LATENCY.labels('load').time():
+            # The journal is read before the file: a rewrite in between folds it into the file
+            # and empties it, so the other order could miss patches, while this one re-applies them
+            patches, _ = self._read_journal()
+            with open(self._metadata_file, 'rb') as f:
+                entries = self._json.load(f)
+        if patches:
+            for entry in entries:
+                patch = patches.get(entry.get('id'))
+                if patch:
+                    entry.update(patch)
+        return entries
+
+    def iter_all(self) -> Iterator[dict[str, Any]]:
+        """Stream entries from the metadata file one at a time.
+
+        Memory stays bounded by one read chunk and one entry, whatever the
+        catalogue size; prefer it to load_all() for a single pass. The file is
+        held open until the iterator is exhausted or closed, and an atomic
+        save_all() meanwhile does not affect it: it keeps reading the old inode.
+        """
         self._fs.ensure_storage(AppConfig.UPLOAD_DIR, self._metadata_file)
-        with open(self._metadata_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        patches, _ = self._read_journal()
+        yield from self._iter_file(patches)
+
+    def _iter_file(self, patches: dict[Any, dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        with open(self._metadata_file, 'rb') as f:
+            for entry in iter_json_array(f):
+                patch = patches.get(entry.get('id')) if patches else None
+                if patch:
+                    entry.update(patch)
+                yield entry
+
+    def entries(self) -> list[CompactEntry]:
+        """Compact, shared snapshot of the catalogue for read paths.
+
+        Reloaded only when the generation changes, so a worker holds one
+        compact copy instead of re-parsing a dict per entry on every request;
+        when only the journal grew (another worker's patch()), just the new
+        journal lines are applied. Callers must treat the list and its entries
+        as read-only; patches replace single items of the list in place.
+        """
+        with self._lock:
+            generation = self.generation
+            snapshot = self._snapshot
+            if snapshot is None or snapshot[0] != generation:
+                if snapshot is not None and self._catch_up(snapshot[1]):
+                    snapshot = (generation, snapshot[1])
+                else:
+                    token = self._stat_token
+                    self._fs.ensure_storage(AppConfig.UPLOAD_DIR, self._metadata_file)
+                    # Loaded after reading the generation: the data is never older than its label
+                    # Built while streaming, so the raw text and the dicts are never all resident
+                    with span('metadata_load'), METADATA_LATENCY.labels('load').time():
+                        patches, end = self._read_journal()
+                        snapshot = (generation, [CompactEntry.from_dict(e) for e in self._iter_file(patches)])
+                    self._patched = []
+                    self._applied = (token[0], token[1] and token[1][0], end) if token else None
+                self._snapshot = snapshot
+            return snapshot[1]
+
+    def patched_positions(self) -> list[int]:
+        """Positions in entries() that patches replaced in place, oldest first.
+
+        A new list whenever entries() is reloaded from the file; lets indexes
+        derived from the snapshot catch up instead of being rebuilt.
+        """
+        return self._patched
+
+    def get(self, entry_id: Any) -> CompactEntry | None:
+        """The entry with `entry_id`, or None; a dict lookup on the current snapshot."""
+        with self._lock:
+            entries = self.entries()
+            position = self._positions(entries).get(entry_id)
+            return entries[position] if position is not None else None
+
+    def _positions(self, entries: list[CompactEntry]) -> dict[Any, int]:
+        # id -> position in `entries`, built once per snapshot and carried along by append()
+        index = self._index
+        if index is None or index[0] is not entries:
+            index = (entries, {e.id: position for position, e in enumerate(entries)})
+            self._index = index
+        return index[1]
+
+    def _catch_up(self, entries: list[CompactEntry]) -> bool:
+        """Apply journal lines written since `entries` was loaded; False if the file itself changed.
+
+        Keeps another worker's patch() from costing a full reload here. The
+        aggregates are updated along, if they describe the same snapshot.
+        """
+        token, applied = self._stat_token, self._applied
+        # No journal inode means there was no journal yet: whatever has been written to it since is new
+        if token is None or applied is None or token[0] != applied[0] or token[1] is None \
+                or applied[1] not in (None, token[1][0]) or token[1][2] < applied[2]:
+            return False
+        patches, end = self._read_journal(applied[2])
+        stats = self._stats
+        stats = stats[1] if stats is not None and self._snapshot is not None and stats[0] == self._snapshot[0] else None
+        positions = self._positions(entries) if patches else {}
+        for entry_id, fields in patches.items():
+            position = positions.get(entry_id)
+            if position is None:
+                continue
+            before = entries[position].to_dict()
+            after = {**before, **fields}
+            entries[position] = CompactEntry.from_dict(after)
+            self._patched.append(position)
+            if stats is not None:
+                stats.remove(before)
+                stats.add(after)
+        self._applied = (applied[0], token[1][0], end)
+        if stats is not None:
+            self._stats = (self._generation, stats)
+        return True
+
+    def stats(self) -> CatalogueStats:
+        """Aggregates over the catalogue (see CatalogueStats), kept current by this process's writes.
+
+        Rebuilt in one streamed pass only when the file changed underneath,
+        i.e. at startup or after another worker wrote; otherwise reading it
+        costs nothing per entry.
+        """
+        with self._lock:
+            generation = self.generation
+            stats = self._stats
+            if stats is not None and stats[0] != generation and self._snapshot is not None \
+                    and self._snapshot[0] == stats[0]:
+                # Patches journaled by another worker are applied to the snapshot and these aggregates together
+                self.entries()
+                stats = self._stats
+            if stats is None or stats[0] != generation:
+                stats = (generation, CatalogueStats.from_entries(self.iter_all()))
+                self._stats = stats
+            return stats[1]
+
+    def _current_stats(self) -> CatalogueStats | None:
+        """The aggregates if they match the file as it is now, for a writer to update in place."""
+        stats = self._stats
+        return stats[1] if stats is not None and stats[0] == self.generation else None
+
+    def save_all(self, entries: Iterable[dict[str, Any]]) -> None:
+        """Replace the catalogue; `entries` may be a generator and is written as it is consumed."""
+        # The aggregates are tallied while the entries stream past, without another read
+        with self._lock:
+            stats = CatalogueStats()
+            self._write(stats.counted(entries))
+            self._stats = (self._generation, stats)
+
+    def _write(self, entries: Iterable[dict[str, Any]]) -> None:
+        # Write to a sibling temp file and swap it in, so readers never see a
+        # half-written document and the inode change marks a new generation.
+        # `entries` is consumed under the journal lock: it reads the journal,
+        # which is folded into the new file and emptied before the lock is released.
+        tmp_file = f"{self._metadata_file}.{os.getpid()}.tmp"
+        with self._journal_lock() as journal, span('metadata_save'), METADATA_LATENCY.labels('save').time():
+            try:
+                with open(tmp_file, 'wb') as f:
+                    write_json_array(entries, f, self._json)
+            except BaseException:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                raise
+            os.replace(tmp_file, self._metadata_file)
+            # Emptied after the swap: a crash in between leaves patches the new file already contains
+            journal.truncate(0)
+        self._stat_token = self._current_stat_token()
+        self._generation += 1
+        self._applied = None
+
+    def append(self, entry: dict[str, Any]) -> None:
+        with self._lock:
+            snapshot = self._snapshot
+            current = snapshot is not None and snapshot[0] == self.generation
+            stats = self._current_stats()
+            count = 0
+
+            def rewritten() -> Iterator[dict[str, Any]]:
+                # Existing entries are copied through; the new one is stamped once the highest revision is known
+                nonlocal count
+                highest = 0
+                for existing in self.iter_all():
+                    if type(existing.get('revision')) is int and existing['revision'] > highest:
+                        highest = existing['revision']
+                    count += 1
+                    yield existing
+                entry['revision'] = highest + 1
+                yield entry
+
+            self._write(rewritten())
+            if current and count == len(snapshot[1]):
+                # Extend the snapshot instead of reloading it; a new list, as readers may hold the old one
+                entries = snapshot[1] + [CompactEntry.from_dict(entry)]
+                self._snapshot = (self._generation, entries)
+                self._applied = self._fresh_applied()
+                index = self._index
+                if index is not None and index[0] is snapshot[1]:
+                    index[1][entry.get('id')] = count
+                    self._index = (entries, index[1])
+            self._stats = None
+            if stats is not None and count == stats.total:
+                stats.add(entry)
+                self._stats = (self._generation, stats)
+
+    def update_many(self, patches: dict[str, dict[str, Any]], expect: dict[str, Any] | None = None) -> int:
+        """Apply field updates keyed by entry id in one read-modify-write; returns entries changed.
+
+        `expect` maps field names to the value an entry must still have for a
+        patch to set that field, so patches computed from an older read don't
+        undo changes made since; other fields are set regardless.
+
+        Streams over the file rather than loading it, so memory stays bounded
+        on large catalogues: once to skip the write when no id is known, then
+        twice under the journal lock, for the next revision and to rewrite it.
+        The revision is taken under the lock so a concurrent patch() can't be
+        stamped with the same one.
+        """
+        if not patches or not any(entry.get('id') in patches for entry in self.iter_all()):
+            return 0
+        with self._lock:
+            stats = self._current_stats()
+            count = 0
+            replaced: list[tuple[dict[str, Any], dict[str, Any]]] = []
+
+            def rewritten() -> Iterator[dict[str, Any]]:
+                nonlocal count
+                revision = next_revision(self.iter_all())
+                for entry in self.iter_all():
+                    count += 1
+                    patch = patches.get(entry.get('id'))
+                    if patch and expect:
+                        # Checked under the journal lock, against the entry as it is now
+                        patch = {k: v for k, v in patch.items() if k not in expect or entry.get(k) == expect[k]}
+                    if patch:
+                        replaced.append((dict(entry), entry))
+                        entry.update(patch)
+                        entry['revision'] = revision
+                    yield entry
+
+            self._write(rewritten())
+            self._stats = None
+            if stats is not None and count == stats.total:
+                # A stage transition or rename moves the entry between aggregates
+                for before, after in replaced:
+                    stats.remove(before)
+                    stats.add(after)
+                self._stats = (self._generation, stats)
+            return len(replaced)
+
+    def patch(self, entry_id: Any, fields: dict[str, Any] | Callable[[CompactEntry, CatalogueStats], dict[str, Any]],
+              precondition: Callable[[CompactEntry], bool] | None = None) -> CompactEntry | None:
+        """Set `fields` on one entry without rewriting the catalogue; returns it updated, or None if unknown.
+
+        The change is one appended journal line, stamped with the next
+        revision, and is applied in place to this process's snapshot, index
+        and aggregates, so the cost does not depend on the catalogue size.
+        Once the journal outgrows METADATA_JOURNAL_MAX_BYTES it is compacted
+        into metadata.json by a full rewrite. `precondition` is called with the
+        current entry under the same lock as the write, so no other writer can
+        slip in between; PreconditionFailed is raised when it returns False.
+        `fields` may likewise be a callable, given the current entry and the
+        aggregates, for changes that depend on them (a rename's next version);
+        when it returns no fields nothing is written.
+        """
+        self._fs.ensure_storage(AppConfig.UPLOAD_DIR, self._metadata_file)
+        with self._lock, self._journal_lock() as journal:
+            # Under the lock, so the snapshot includes every patch journaled before this one
+            entries = self.entries()
+            position = self._positions(entries).get(entry_id)
+            if position is None:
+                return None
+            if precondition is not None and not precondition(entries[position]):
+                raise PreconditionFailed(entry_id)
+            stats = self.stats()
+            if callable(fields):
+                fields = fields(entries[position], stats)
+                if not fields:
+                    return entries[position]
+            changes = dict(fields, revision=stats.revision + 1)
+            line = self._json.dumps({'id': entry_id, 'set': changes}) + b'\n'
+            size = journal.seek(0, os.SEEK_END)
+            if size and os.pread(journal.fileno(), 1, size - 1) != b'\n':
+                # A writer died mid-line; start a new one rather than extend the torn one
+                line = b'\n' + line
+            with span('metadata_patch'), METADATA_LATENCY.labels('patch').time():
+                journal.write(line)
+                journal.flush()
+            before = entries[position].to_dict()
+            after = {**before, **changes}
+            entries[position] = updated = CompactEntry.from_dict(after)
+            self._patched.append(position)
+            self._stat_token = token = self._current_stat_token()
+            self._generation += 1
+            self._snapshot = (self._generation, entries)
+            # Nobody else can write while the lock is held, so the snapshot is exactly the file plus the journal
+            self._applied = (token[0], token[1] and token[1][0], size + len(line)) if token else None
+            stats.remove(before)
+            stats.add(after)
+            self._stats = (self._generation, stats)
+        if size + len(line) > self._journal_max_bytes:
+            self.compact()
+        return updated
+
+    def compact(self) -> None:
+        """Fold the patch journal into metadata.json and empty it."""
+        self.save_all(self.iter_all())
+
+    def _read_journal(self, start: int = 0) -> tuple[dict[Any, dict[str, Any]], int]:
+        """Fields set per entry id by the journal lines from byte `start`, and the offset after the last full line.
+
+        A line still being written, or torn by a crash, is skipped.
+        """
+        try:
+            with open(self._journal_file, 'rb') as f:
+                f.seek(start)
+                data = f.read()
+        except FileNotFoundError:
+            return {}, start
+        complete = data.rfind(b'\n') + 1
+        patches: dict[Any, dict[str, Any]] = {}
+        for line in data[:complete].splitlines():
+            try:
+                record = self._json.loads(line)
+                patches.setdefault(record['id'], {}).update(record['set'])
+            except Exception:
+                continue
+        return patches, start + complete
+
+    @contextmanager
+    def _journal_lock(self) -> Iterator[Any]:
+        """The journal opened for appending, locked against other writers of this catalogue."""
+        with open(self._journal_file, 'a+b') as journal:
+            if fcntl is not None:
+                fcntl.flock(journal, fcntl.LOCK_EX)
+            yield journal
+
+    def _fresh_applied(self) -> tuple[FileToken, int | None, int] | None:
+        token = self._stat_token
+        return (token[0], token[1] and token[1][0], 0) if token is not None else None
+
+    def _current_stat_token(self) -> tuple[FileToken, FileToken] | None:
+        token = _file_token(self._metadata_file)
+        return (token, _file_token(self._journal_file)) if token is not None else None
 
-    def save_all(self, entries: Iterable[Dict[str, Any]]) -> None:
-        with open(self._metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(list(entries), f, indent=2)
 
-    def append(self, entry: Dict[str, Any]) -> None:
-        entries = self.load_all()
-        entries.append(entry)
-        self.save_all(entries)
+def _file_token(path: str) -> FileToken:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
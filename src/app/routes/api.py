@@ -1,29 +1,69 @@
-from typing import Any, Dict, List, Annotated, Optional
+import hashlib
 import logging
-from fastapi import APIRouter, Request, UploadFile, HTTPException, status, File, Form, Depends
-from fastapi.responses import JSONResponse
+from typing import Annotated, Any, Optional
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import Response, StreamingResponse
 from werkzeug.datastructures import FileStorage
 
-from app.repository.image_repository import ImageMetadataRepository
+from app.config import AppConfig
+from app.json_codec import CodecJSONResponse, get_codec, iter_ndjson
+from app.models.image_entry import ImageEntry, ImageUpdate
+from app.repository.image_repository import ImageMetadataRepository, PreconditionFailed
+from app.services.admission import AdmissionController
+from app.services.export import CatalogueExporter
+from app.services.image_service import ImageService
+from app.services.render_cache import RenderCache
+from app.services.resumable_upload import ResumableUploadStore
+from app.storage.backends import storage_backend_from_config
 from app.storage.filesystem import FileSystem
 from app.validation.image_validator import ImageValidator
-from app.services.image_service import ImageService
-from app.config import AppConfig
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Images API"])
 
 # Dependency providers (singletons)
-_fs_singleton = FileSystem()
-_repo_singleton: Optional[ImageMetadataRepository] = None
-_validator_singleton: Optional[ImageValidator] = None
+_fs_singleton: FileSystem | None = None
+_repo_singleton: ImageMetadataRepository | None = None
+_validator_singleton: ImageValidator | None = None
 _analyzer_singleton: Optional["PackagePhotoAnalyzer"] = None
-_image_service_singleton: Optional[ImageService] = None
+_image_service_singleton: ImageService | None = None
+_render_cache_singleton: RenderCache | None = None
+_exporter_singleton: CatalogueExporter | None = None
+_upload_store_singleton: ResumableUploadStore | None = None
+_admission_singleton: AdmissionController | None = None
 
 def get_fs() -> FileSystem:
+    global _fs_singleton
+    if _fs_singleton is None:
+        _fs_singleton = FileSystem(backend=storage_backend_from_config())
     return _fs_singleton
 
+def reset_singletons() -> None:
+    """Drop cached dependencies so they are rebuilt from the current AppConfig (tests, in-process harnesses)."""
+    global _fs_singleton, _repo_singleton, _validator_singleton, _analyzer_singleton, _image_service_singleton, _render_cache_singleton
+    global _exporter_singleton, _upload_store_singleton, _admission_singleton
+    _fs_singleton = None
+    _repo_singleton = None
+    _validator_singleton = None
+    _analyzer_singleton = None
+    _image_service_singleton = None
+    _render_cache_singleton = None
+    _exporter_singleton = None
+    _upload_store_singleton = None
+    _admission_singleton = None
+
 def get_repo(fs: Annotated[FileSystem, Depends(get_fs)]) -> ImageMetadataRepository:
     global _repo_singleton
     if _repo_singleton is None:
@@ -38,6 +78,7 @@ def get_validator() -> ImageValidator:
 
 from app.services.photo_analyzer import PackagePhotoAnalyzer
 
+
 def get_analyzer() -> PackagePhotoAnalyzer:
     global _analyzer_singleton
     if _analyzer_singleton is None:
@@ -52,11 +93,44 @@ def get_image_service(repo: Annotated[ImageMetadataRepository, Depends(get_repo)
         _image_service_singleton = ImageService(upload_dir=AppConfig.UPLOAD_DIR, repo=repo, fs=fs, validator=validator, analyzer=analyzer)
     return _image_service_singleton
 
+def get_render_cache() -> RenderCache:
+    global _render_cache_singleton
+    if _render_cache_singleton is None:
+        _render_cache_singleton = RenderCache(max_entries=AppConfig.RENDER_CACHE_MAX_ENTRIES,
+                                              max_bytes=AppConfig.RENDER_CACHE_MAX_BYTES)
+    return _render_cache_singleton
+
+def get_exporter(repo: Annotated[ImageMetadataRepository, Depends(get_repo)],
+                 fs: Annotated[FileSystem, Depends(get_fs)]) -> CatalogueExporter:
+    global _exporter_singleton
+    if _exporter_singleton is None:
+        _exporter_singleton = CatalogueExporter(repo=repo, fs=fs, upload_dir=AppConfig.UPLOAD_DIR)
+    return _exporter_singleton
+
+def get_upload_store() -> ResumableUploadStore:
+    global _upload_store_singleton
+    if _upload_store_singleton is None:
+        _upload_store_singleton = ResumableUploadStore.from_config()
+    return _upload_store_singleton
+
+def get_admission_controller() -> AdmissionController:
+    """The controller AdmissionMiddleware uses, shared with routes that admit uploads themselves."""
+    global _admission_singleton
+    if _admission_singleton is None:
+        _admission_singleton = AdmissionController.from_config()
+    return _admission_singleton
+
 
 @router.get(
     '/images',
+    # Documents the schema only: handlers return ready-made responses, so FastAPI
+    # neither re-validates nor re-encodes each entry
+    response_model=list[ImageEntry],
     summary="List uploaded images",
-    description="Return all uploaded medicine images with metadata.",
+    description="Return uploaded medicine images with metadata, optionally filtered by medicine name and stage. "
+                "`search` matches words or word prefixes in medicine name, substance and form, ignoring case "
+                "and accents, and returns the best matches first. "
+                "Send `Accept: application/x-ndjson` or `?stream=1` to stream one JSON object per line instead.",
     responses={
         200: {
             "description": "Successful retrieval",
@@ -67,21 +141,40 @@ def get_image_service(repo: Annotated[ImageMetadataRepository, Depends(get_repo)
                          "stored_name": "123.webp", "url": "/uploads/123.webp", "uploaded_at": "2025-09-24T20:54:00Z",
                          "stage": "new"
                     }]
+                },
+                "application/x-ndjson": {
+                    "example": '{"id": "123", "medicine_name": "Ibuprofen", "stage": "UPLOADED"}\n'
                 }
             }
         }
     }
 )
-async def api_list_images(request: Request, image_service: Annotated[ImageService, Depends(get_image_service)]) -> List[Dict[str, Any]]:
+async def api_list_images(request: Request, image_service: Annotated[ImageService, Depends(get_image_service)],
+                          cache: Annotated[RenderCache, Depends(get_render_cache)],
+                          q: str | None = None, stage: str | None = None, search: str | None = None,
+                          stream: bool = False) -> Response:
     logger.info("GET /api/images from %s", request.client.host if request.client else "unknown")
-    images = image_service.list_images()
-    logger.debug("Returned %d images", len(images))
-    return images
+    params = image_service.normalize_filters(q, stage, search)
+
+    if stream or 'application/x-ndjson' in request.headers.get('accept', ''):
+        # Entries are encoded as they are produced: time to first byte and memory
+        # don't grow with the catalogue, and clients can process lines as they arrive
+        return StreamingResponse(iter_ndjson(image_service.iter_images(*params)), media_type='application/x-ndjson')
+
+    def render() -> bytes:
+        images: list[dict[str, Any]] = image_service.filter_images(*params)
+        logger.debug("Returned %d images", len(images))
+        return get_codec().dumps(images)
+
+    # Serialized once per metadata generation and filter; repeated listings are served from the cache
+    body = cache.get_or_render('api', params, image_service.metadata_generation(), render)
+    return Response(content=body, media_type='application/json')
 
 
 @router.post(
     '/images',
     status_code=status.HTTP_201_CREATED,
+    response_model=ImageEntry,
     summary="Upload an image",
     description="Upload a medicine package image as multipart/form-data. Requires authentication via session (web login).",
     responses={
@@ -118,11 +211,120 @@ async def api_upload_image(request: Request,
         logger.info("POST /api/images medicine_name='%s' content_type=%s", medicine_name,
                     getattr(file, 'content_type', None))
         entry = image_service.save_upload(
-            FileStorage(file.file, content_type=file.content_type),
+            FileStorage(file.file, filename=file.filename, content_type=file.content_type),
             lambda stored: request.url_for('uploads', path=stored).path,
             medicine_name)
         logger.info("Upload succeeded id=%s stored_name=%s", entry.get('id'), entry.get('stored_name'))
-        return JSONResponse(content=entry, status_code=status.HTTP_201_CREATED)
+        return CodecJSONResponse(content=entry, status_code=status.HTTP_201_CREATED)
     except ValueError as e:
         logger.warning("Upload failed: %s", e)
-        raise HTTPException(status_code=400, detail=str(e))
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+def _entry_response(entry: dict[str, Any], if_none_match: str | None = None,
+                    status_code: int = status.HTTP_200_OK) -> Response:
+    """One entry with a strong ETag over its encoded body; 304 when the client's copy is current."""
+    body = get_codec().dumps(entry)
+    etag = _etag(body)
+    # no-cache: clients keep the entry but revalidate it, which costs a dict lookup here
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if if_none_match is not None and _etag_matches(if_none_match, etag, weak=True):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, status_code=status_code, media_type='application/json', headers=headers)
+
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    """Whether `etag` is listed in an If-None-Match / If-Match header ('*' or a comma-separated list).
+
+    RFC 9110: If-None-Match compares weakly (a W/ validator matches its
+    opaque part), If-Match strongly (a W/ validator never matches).
+    """
+    candidates = [candidate.strip() for candidate in header.split(',')]
+    if weak:
+        candidates = [candidate.removeprefix('W/') for candidate in candidates]
+    return '*' in candidates or etag in candidates
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+@router.get(
+    '/images/{image_id}',
+    response_model=ImageEntry,
+    summary="Get one image",
+    description="Return a single image entry by id, looked up through an in-memory index rather than the listing. "
+                "The `ETag` response header identifies this version of the entry; send it as `If-None-Match` "
+                "to receive 304 Not Modified while the entry is unchanged.",
+    responses={304: {"description": "Entry unchanged since the given ETag"}, 404: {"description": "Unknown image"}},
+)
+def api_get_image(image_id: str, image_service: Annotated[ImageService, Depends(get_image_service)],
+                  if_none_match: Annotated[str | None, Header()] = None) -> Response:
+    # A plain def: after another worker's upload the snapshot is reloaded, off the event loop
+    entry = image_service.get_image(image_id)
+    if entry is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Image not found')
+    return _entry_response(entry, if_none_match)
+
+
+@router.patch(
+    '/images/{image_id}',
+    response_model=ImageEntry,
+    summary="Update one image",
+    description="Set the stage and/or medicine name of an image. Only this entry is written: the change is "
+                "journaled next to metadata.json instead of rewriting the catalogue. A new medicine name gets "
+                "the next version of that medicine. Send the entry's `ETag` as `If-Match` to fail with 412 "
+                "instead of overwriting a change made since you read it. Requires authentication via session.",
+    responses={400: {"description": "Nothing to update or invalid value"}, 401: {"description": "Authentication required"},
+               404: {"description": "Unknown image"}, 412: {"description": "Entry changed since the If-Match ETag"}},
+)
+def api_update_image(request: Request, image_id: str, update: ImageUpdate,
+                     image_service: Annotated[ImageService, Depends(get_image_service)],
+                     if_match: Annotated[str | None, Header()] = None) -> Response:
+    if not (getattr(request, 'session', None) and request.session.get('user')):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication required')
+    if update.stage is None and update.medicine_name is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Nothing to update')
+    logger.info("PATCH /api/images/%s %s", image_id, update.model_dump(exclude_none=True))
+
+    def matches(current: dict[str, Any]) -> bool:
+        # Checked by the repository under the lock it writes with, so a concurrent update can't slip in between
+        return _etag_matches(if_match, _etag(get_codec().dumps(current)), weak=False)
+
+    try:
+        entry = image_service.update_image(image_id, stage=update.stage, medicine_name=update.medicine_name,
+                                           if_match=matches if if_match is not None else None)
+    except PreconditionFailed:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail='Image was changed meanwhile') from None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    if entry is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Image not found')
+    return _entry_response(entry)
+
+
+@router.get(
+    '/stats',
+    summary="Catalogue statistics",
+    description="Counts per stage, count and latest version per medicine, total stored bytes and uploads per day (UTC). "
+                "Served from aggregates that uploads and stage changes keep up to date, so the cost does not grow "
+                "with the catalogue.",
+    responses={
+        200: {
+            "description": "Current aggregates",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "total": 3, "total_bytes": 482113,
+                        "by_stage": {"APPROVAL_WAITING": 0, "UPLOADED": 2, "PROCESSED": 1, "ARCHIVED": 0},
+                        "medicines": [{"medicine_name": "Ibuprofen", "count": 3, "latest_version": 3}],
+                        "uploads_per_day": {"2025-09-24": 2, "2025-09-25": 1}
+                    }
+                }
+            }
+        }
+    }
+)
+def api_stats(repo: Annotated[ImageMetadataRepository, Depends(get_repo)]) -> Response:
+    # A plain def: after another worker's write the aggregates are rebuilt from the file, off the event loop
+    return CodecJSONResponse(content=repo.stats().to_dict())
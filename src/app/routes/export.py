@@ -0,0 +1,70 @@
+import logging
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.models.image_entry import Stage
+from app.routes.api import get_exporter
+from app.services.export import CatalogueExporter, ExportFilter, parse_timestamp
+from app.services.image_service import ImageService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Export API"])
+
+REVISION_HEADER = 'X-Catalogue-Revision'
+
+
+def export_filter(q: str | None = None, stage: str | None = None,
+                  uploaded_from: Annotated[str | None, Query(description="ISO date or datetime, inclusive")] = None,
+                  uploaded_to: Annotated[str | None, Query(description="ISO date or datetime, exclusive")] = None,
+                  since_revision: Annotated[int, Query(ge=0, description=f"Only entries added or changed after this "
+                                                                         f"revision (the {REVISION_HEADER} of a previous export)")] = 0,
+                  ) -> ExportFilter:
+    med_q, _, _ = ImageService.normalize_filters(q)
+    # Unlike the gallery filters, every stage can be exported, and an unknown one is an error rather than no filter
+    stage_q = (stage or '').strip().upper()
+    if stage_q and stage_q not in Stage.__members__:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"stage must be one of {', '.join(Stage.__members__)}")
+    bounds = {}
+    for name, value in (('uploaded_from', uploaded_from), ('uploaded_to', uploaded_to)):
+        bounds[name] = parse_timestamp(value)
+        if value and bounds[name] is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{name} must be an ISO date or datetime")
+    return ExportFilter(medicine_query=med_q, stage=stage_q, since_revision=since_revision, **bounds)
+
+
+@router.get(
+    '/export/metadata',
+    summary="Export metadata",
+    description="Stream catalogue entries as NDJSON (default) or CSV, filtered by medicine name, stage and upload date. "
+                f"The {REVISION_HEADER} response header is the catalogue revision the export reflects; pass it as "
+                "`since_revision` on the next run to receive only entries added or changed since.",
+)
+async def export_metadata(exporter: Annotated[CatalogueExporter, Depends(get_exporter)],
+                          flt: Annotated[ExportFilter, Depends(export_filter)],
+                          format: Literal['ndjson', 'csv'] = 'ndjson') -> StreamingResponse:
+    entries = exporter.snapshot()
+    headers = {REVISION_HEADER: str(exporter.revision(entries))}
+    logger.info("GET /api/export/metadata format=%s filter=%s", format, flt)
+    if format == 'csv':
+        headers['Content-Disposition'] = 'attachment; filename="metadata.csv"'
+        return StreamingResponse(exporter.iter_csv(entries, flt), media_type='text/csv; charset=utf-8', headers=headers)
+    return StreamingResponse(exporter.iter_ndjson(entries, flt), media_type='application/x-ndjson', headers=headers)
+
+
+@router.get(
+    '/export/images.tar',
+    summary="Export image files",
+    description="Stream the matching image files as an uncompressed tar, one member per entry named by its stored name. "
+                f"Accepts the same filters as /api/export/metadata and returns the same {REVISION_HEADER} header.",
+)
+async def export_images(exporter: Annotated[CatalogueExporter, Depends(get_exporter)],
+                        flt: Annotated[ExportFilter, Depends(export_filter)]) -> StreamingResponse:
+    entries = exporter.snapshot()
+    headers = {REVISION_HEADER: str(exporter.revision(entries)),
+               'Content-Disposition': 'attachment; filename="images.tar"'}
+    logger.info("GET /api/export/images.tar filter=%s", flt)
+    return StreamingResponse(exporter.iter_tar(entries, flt), media_type='application/x-tar', headers=headers)
@@ -0,0 +1,23 @@
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+
+from app.observability.metrics import render_latest
+from app.repository.image_repository import ImageMetadataRepository
+from app.routes.api import get_repo
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.get('/metrics')
+async def metrics(repo: Annotated[ImageMetadataRepository, Depends(get_repo)]) -> Response:
+    def catalogue_counts() -> dict[str, int]:
+        # Maintained by the repository's writes; no pass over the catalogue per scrape
+        return repo.stats().stage_counts()
+
+    payload, content_type = render_latest(catalogue_counts)
+    return Response(content=payload, media_type=content_type)
@@ -0,0 +1,221 @@
+import asyncio
+import base64
+import binascii
+import logging
+from email.utils import formatdate
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.responses import Response
+from werkzeug.datastructures import FileStorage
+
+from app.json_codec import CodecJSONResponse
+from app.routes.api import get_admission_controller, get_image_service, get_upload_store
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.services.image_service import ImageService
+from app.services.resumable_upload import (
+    ResumableUploadStore,
+    UploadConflict,
+    UploadInfo,
+    UploadNotFound,
+    UploadTooLarge,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Resumable Uploads API"])
+
+TUS_VERSION = '1.0.0'
+TUS_EXTENSIONS = 'creation,expiration,termination'
+CHUNK_CONTENT_TYPE = 'application/offset+octet-stream'
+
+
+def _user(request: Request) -> str:
+    user = (getattr(request, 'session', None) or {}).get('user')
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Authentication required')
+    return user.get('email') or ''
+
+
+def _parse_metadata(header: str | None) -> dict[str, str]:
+    """Upload-Metadata: comma-separated `key base64(value)` pairs."""
+    metadata: dict[str, str] = {}
+    for pair in (header or '').split(','):
+        key, _, value = pair.strip().partition(' ')
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(value.strip(), validate=True).decode('utf-8')
+        except (binascii.Error, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Upload-Metadata value of '{key}' is not base64") from e
+    return metadata
+
+
+def _tus_headers(info: UploadInfo | None = None, **extra: str) -> dict[str, str]:
+    headers = {'Tus-Resumable': TUS_VERSION, 'Cache-Control': 'no-store'}
+    if info is not None:
+        headers['Upload-Offset'] = str(info.offset)
+        headers['Upload-Length'] = str(info.length)
+        headers['Upload-Expires'] = _http_date(info.expires_at)
+    headers.update(extra)
+    return headers
+
+
+def _http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def _owned_upload(store: ResumableUploadStore, upload_id: str, user: str) -> UploadInfo:
+    try:
+        info = store.get(upload_id)
+    except UploadNotFound:
+        info = None
+    # Someone else's upload is reported as missing rather than forbidden
+    if info is None or info.user != user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Upload not found or expired',
+                            headers=_tus_headers())
+    return info
+
+
+def _check_tus_version(tus_resumable: str | None) -> None:
+    if tus_resumable is not None and tus_resumable != TUS_VERSION:
+        raise HTTPException(status_code=status.HTTP_412_PRECONDITION_FAILED, detail=f"Only tus {TUS_VERSION} is supported",
+                            headers=_tus_headers(**{'Tus-Version': TUS_VERSION}))
+
+
+@router.options('/uploads', summary="Resumable upload capabilities")
+async def uploads_options(store: Annotated[ResumableUploadStore, Depends(get_upload_store)]) -> Response:
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_tus_headers(**{
+        'Tus-Version': TUS_VERSION, 'Tus-Extension': TUS_EXTENSIONS, 'Tus-Max-Size': str(store.max_size)}))
+
+
+@router.post(
+    '/uploads',
+    status_code=status.HTTP_201_CREATED,
+    summary="Start a resumable upload",
+    description="tus 1.0 creation. Send `Upload-Length` and `Upload-Metadata` with base64 values for `filename`, "
+                "`medicine_name` and optionally `filetype`. The `Location` response header is the upload URL: "
+                "PATCH chunks to it with `Upload-Offset` and `Content-Type: application/offset+octet-stream`, "
+                "and HEAD it after a dropped connection to learn where to resume. The final chunk runs the same "
+                "validation and analysis as POST /api/images and returns the created entry. Requires a session.",
+    responses={201: {"description": "Upload created"}, 400: {"description": "Missing or invalid metadata"},
+               401: {"description": "Authentication required"}, 413: {"description": "Upload-Length too large"}},
+)
+async def create_upload(request: Request, store: Annotated[ResumableUploadStore, Depends(get_upload_store)],
+                        image_service: Annotated[ImageService, Depends(get_image_service)],
+                        upload_length: Annotated[int, Header(ge=1)],
+                        upload_metadata: Annotated[str | None, Header()] = None,
+                        tus_resumable: Annotated[str | None, Header()] = None) -> Response:
+    _check_tus_version(tus_resumable)
+    user = _user(request)
+    metadata = _parse_metadata(upload_metadata)
+    filename = metadata.get('filename') or metadata.get('name') or ''
+    medicine_name = (metadata.get('medicine_name') or '').strip()
+    # Fail before any bytes are sent instead of after the last chunk
+    if not filename or not image_service.is_allowed(filename):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Unsupported file type')
+    if not medicine_name:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='Medicine name is required')
+    try:
+        info = store.create(upload_length, filename, metadata.get('filetype') or 'application/octet-stream',
+                            medicine_name, user)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e), headers=_tus_headers()) from e
+    logger.info("POST /api/uploads id=%s length=%d medicine_name='%s'", info.id, info.length, medicine_name)
+    location = request.url_for('resumable_upload', upload_id=info.id).path
+    return Response(status_code=status.HTTP_201_CREATED, headers=_tus_headers(info, Location=location))
+
+
+@router.head('/uploads/{upload_id}', name='resumable_upload', summary="Resumable upload offset")
+async def upload_offset(request: Request, upload_id: str,
+                        store: Annotated[ResumableUploadStore, Depends(get_upload_store)]) -> Response:
+    info = _owned_upload(store, upload_id, _user(request))
+    extra = {'X-Image-Id': info.entry_id} if info.entry_id else {}
+    return Response(status_code=status.HTTP_200_OK, headers=_tus_headers(info, **extra))
+
+
+@router.patch(
+    '/uploads/{upload_id}',
+    summary="Append a chunk to a resumable upload",
+    description="Body bytes are written at `Upload-Offset`, which must equal the upload's current offset (409 "
+                "otherwise, with the current offset in the response). Intermediate chunks answer 204 with the new "
+                "`Upload-Offset`; the chunk that completes the upload answers 201 with the created entry. The "
+                "completion goes through the same admission control as POST /api/images, for the declared "
+                "`Upload-Length`: when shed it answers 429 with `Retry-After`, the bytes are kept, and an empty "
+                "PATCH at the final offset retries it.",
+    responses={201: {"description": "Upload complete, entry created"}, 204: {"description": "Chunk stored"},
+               404: {"description": "Unknown or expired upload"}, 409: {"description": "Offset mismatch"},
+               415: {"description": "Wrong Content-Type"}, 429: {"description": "Completion shed, retry later"}},
+)
+async def upload_chunk(request: Request, upload_id: str,
+                       store: Annotated[ResumableUploadStore, Depends(get_upload_store)],
+                       image_service: Annotated[ImageService, Depends(get_image_service)],
+                       admission: Annotated[AdmissionController, Depends(get_admission_controller)],
+                       upload_offset: Annotated[int, Header(ge=0)],
+                       content_type: Annotated[str | None, Header()] = None,
+                       tus_resumable: Annotated[str | None, Header()] = None) -> Response:
+    _check_tus_version(tus_resumable)
+    if content_type != CHUNK_CONTENT_TYPE:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail=f"Content-Type must be {CHUNK_CONTENT_TYPE}", headers=_tus_headers())
+    user = _user(request)
+    info = _owned_upload(store, upload_id, user)
+    try:
+        # Chunks go to the staging file as they arrive; a dropped connection keeps what was received
+        with store.writer(upload_id, upload_offset) as write:
+            async for chunk in request.stream():
+                write(chunk)
+        info = store.get(upload_id)
+        if not info.complete:
+            return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_tus_headers(info))
+
+        def save(f) -> dict[str, Any]:
+            return image_service.save_upload(FileStorage(f, filename=info.filename, content_type=info.content_type),
+                                             lambda stored: request.url_for('uploads', path=stored).path,
+                                             info.medicine_name)
+
+        # Validation and analysis happen now, so this is where the upload counts toward the backlog and
+        # in-flight bytes; its rate-limit token was taken when it was created
+        ticket = await asyncio.to_thread(admission.admit, user, info.length, False)
+        try:
+            entry = store.complete(upload_id, save)
+        finally:
+            await asyncio.to_thread(admission.release, ticket)
+    except AdmissionRejected as e:
+        logger.warning("Resumable upload %s completion shed (%s); retry after %ss", upload_id, e.reason, e.retry_after_s)
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail='Too many uploads, try again later',
+                            headers=_tus_headers(info, **{'Retry-After': str(e.retry_after_s)})) from e
+    except UploadConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e),
+                            headers=_tus_headers(**{'Upload-Offset': str(e.offset)})) from e
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e), headers=_tus_headers()) from e
+    except UploadNotFound:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Upload not found or expired',
+                            headers=_tus_headers()) from None
+    except ValueError as e:
+        # Rejected by save_upload's validation; the staged upload is discarded
+        logger.warning("Resumable upload %s rejected: %s", upload_id, e)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e), headers=_tus_headers()) from e
+    logger.info("Resumable upload %s complete: id=%s stored_name=%s", upload_id, entry.get('id'), entry.get('stored_name'))
+    return CodecJSONResponse(content=entry, status_code=status.HTTP_201_CREATED,
+                             headers=_tus_headers(info, **{'X-Image-Id': str(entry.get('id'))}))
+
+
+@router.delete('/uploads/{upload_id}', status_code=status.HTTP_204_NO_CONTENT, summary="Abandon a resumable upload")
+async def delete_upload(request: Request, upload_id: str,
+                        store: Annotated[ResumableUploadStore, Depends(get_upload_store)]) -> Response:
+    _owned_upload(store, upload_id, _user(request))
+    store.delete(upload_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_tus_headers())
+
+
+async def sweep_expired_uploads(interval_s: float) -> None:
+    """Background task removing abandoned uploads every `interval_s` seconds."""
+    while True:
+        try:
+            await asyncio.to_thread(get_upload_store().sweep)
+        except Exception as e:
+            logger.warning("Resumable upload sweep failed: %s", e)
+        await asyncio.sleep(interval_s)
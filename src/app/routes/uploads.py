@@ -0,0 +1,18 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import RedirectResponse
+
+from app.routes.api import get_fs
+from app.storage.filesystem import FileSystem
+
+router = APIRouter(include_in_schema=False)
+
+
+@router.get('/uploads/{path:path}', name='uploads')
+async def uploads(path: str, fs: Annotated[FileSystem, Depends(get_fs)]) -> RedirectResponse:
+    """Object storage counterpart of the /uploads static mount: redirect to a presigned URL."""
+    if fs.backend is None or not path or '..' in path.split('/'):
+        raise HTTPException(status_code=404, detail='Not found')
+    # Signing is local computation; no round-trip to the object store
+    return RedirectResponse(fs.backend.presigned_url(path), status_code=307)
@@ -1,12 +1,20 @@
-from typing import List, Dict, Any, Annotated
 import logging
-
-from fastapi import APIRouter, Request, UploadFile, File, status, Depends, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, File, Form, Request, UploadFile, status
+from fastapi.responses import (
+    HTMLResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 from werkzeug.datastructures import FileStorage
 
-from app.routes.api import get_image_service
+from app.observability.metrics import TEMPLATE_RENDER_LATENCY
+from app.routes.api import get_image_service, get_render_cache
 from app.services.image_service import ImageService
+from app.services.render_cache import RenderCache
+from app.templating import stream_template
 
 logger = logging.getLogger(__name__)
 
@@ -17,39 +25,82 @@ def _templates(request: Request):
     return request.app.state.templates
 
 
+def _render_gallery(request: Request, image_service: ImageService, cache: RenderCache,
+                    med_q: str | None = None, stage_q: str | None = None, search_q: str | None = None) -> bytes:
+    """Render the gallery fragment for the given filters, reusing the cached HTML
+    while the metadata generation is unchanged."""
+    params = image_service.normalize_filters(med_q, stage_q, search_q)
+
+    def render() -> bytes:
+        images_sorted = _ordered(image_service.filter_images(*params), params[2])
+        with TEMPLATE_RENDER_LATENCY.labels('_gallery.html').time():
+            return _templates(request).get_template('_gallery.html').render({"request": request, "images": images_sorted}).encode('utf-8')
+
+    return cache.get_or_render('gallery', params, image_service.metadata_generation(), render)
+
+
+def _stream_gallery(request: Request, image_service: ImageService, cache: RenderCache,
+                    med_q: str | None = None, stage_q: str | None = None, search_q: str | None = None) -> Response:
+    """Gallery fragment as a streamed response; the finished body is cached like _render_gallery's."""
+    params = image_service.normalize_filters(med_q, stage_q, search_q)
+    generation = image_service.metadata_generation()
+    cached = cache.get('gallery', params, generation)
+    if cached is not None:
+        return HTMLResponse(cached)
+    images_sorted = _ordered(image_service.filter_images(*params), params[2])
+    chunks = stream_template(_templates(request), '_gallery.html', {"request": request, "images": images_sorted},
+                             on_complete=lambda body: cache.put('gallery', params, generation, body))
+    return StreamingResponse(chunks, media_type='text/html')
+
+
+def _ordered(images: list[dict[str, Any]], search_q: str | None) -> list[dict[str, Any]]:
+    # Search results are already ranked by relevance; plain listings show newest first
+    if search_q:
+        return images
+    return sorted(images, key=lambda image: image.get('uploaded_at', ''), reverse=True)
+
+
 @router.get('/', response_class=HTMLResponse)
 async def index(request: Request, image_service: Annotated[ImageService, Depends(get_image_service)]) -> Response:
     # Read filters from query params (for initial page render)
     med_q = request.query_params.get('q')
     stage_q = request.query_params.get('stage')
-    logger.info("GET / index q='%s' stage='%s'", med_q, stage_q)
-    images: List[Dict[str, Any]] = image_service.filter_images(med_q, stage_q)
-    images_sorted = sorted(images, key=lambda image: image.get('uploaded_at', ''), reverse=True)
-    return _templates(request).TemplateResponse('index.html', {"request": request, "images": images_sorted, "q": med_q or '', "stage": (stage_q or '')})
+    search_q = request.query_params.get('search')
+    logger.info("GET / index q='%s' stage='%s' search='%s'", med_q, stage_q, search_q)
+    images: list[dict[str, Any]] = image_service.filter_images(med_q, stage_q, search_q)
+    images_sorted = _ordered(images, search_q)
+    # Streamed: the browser paints the header and first cards while the rest is still rendering
+    return StreamingResponse(stream_template(_templates(request), 'index.html', {
+        "request": request, "images": images_sorted, "q": med_q or '', "stage": (stage_q or ''), "search": search_q or ''}),
+        media_type='text/html')
 
 
 @router.get('/partials/gallery', response_class=HTMLResponse)
-async def partial_gallery(request: Request, image_service: Annotated[ImageService, Depends(get_image_service)]) -> Response:
+async def partial_gallery(request: Request, image_service: Annotated[ImageService, Depends(get_image_service)],
+                          cache: Annotated[RenderCache, Depends(get_render_cache)]) -> Response:
     # Accept HTMX or query params for filtering
     med_q = request.query_params.get('q')
     stage_q = request.query_params.get('stage')
-    images: List[Dict[str, Any]] = image_service.filter_images(med_q, stage_q)
-    images_sorted = sorted(images, key=lambda image: image.get('uploaded_at', ''), reverse=True)
-    return _templates(request).TemplateResponse('_gallery.html', {"request": request, "images": images_sorted})
+    search_q = request.query_params.get('search')
+    return _stream_gallery(request, image_service, cache, med_q, stage_q, search_q)
 
 
 @router.post('/images/{image_id}/promote', response_class=HTMLResponse)
-async def promote_image_stage(request: Request, image_id: str, image_service: Annotated[ImageService, Depends(get_image_service)]) -> Response:
+async def promote_image_stage(request: Request, image_id: str, image_service: Annotated[ImageService, Depends(get_image_service)],
+                              cache: Annotated[RenderCache, Depends(get_render_cache)]) -> Response:
     is_htmx = request.headers.get('HX-Request') == 'true'
     logger.info("POST /images/%s/promote", image_id)
     image_service.promote_stage(image_id)
     # Preserve filters after promote
     med_q = request.query_params.get('q')
     stage_q = request.query_params.get('stage')
-    images_sorted = sorted(image_service.filter_images(med_q, stage_q), key=lambda image: image.get('uploaded_at', ''), reverse=True)
+    search_q = request.query_params.get('search')
     if is_htmx:
-        return _templates(request).TemplateResponse('_gallery.html', {"request": request, "images": images_sorted})
-    return _templates(request).TemplateResponse('index.html', {"request": request, "images": images_sorted, "q": med_q or '', "stage": (stage_q or '')})
+        return HTMLResponse(_render_gallery(request, image_service, cache, med_q, stage_q, search_q))
+    images_sorted = _ordered(image_service.filter_images(med_q, stage_q, search_q), search_q)
+    with TEMPLATE_RENDER_LATENCY.labels('index.html').time():
+        return _templates(request).TemplateResponse('index.html', {"request": request, "images": images_sorted, "q": med_q or '',
+                                                                   "stage": (stage_q or ''), "search": search_q or ''})
 
 
 @router.get('/upload', response_class=HTMLResponse)
@@ -62,29 +113,25 @@ async def upload_form(request: Request) -> Response:
 
 
 @router.post('/upload')
-async def ui_upload(request: Request, image_service: Annotated[ImageService, Depends(get_image_service)], medicine_name: str = Form(None), file: UploadFile = File(None)) -> Response:
+async def ui_upload(request: Request, image_service: Annotated[ImageService, Depends(get_image_service)],
+                    cache: Annotated[RenderCache, Depends(get_render_cache)],
+                    medicine_name: str = Form(None), file: UploadFile = File(None)) -> Response:
     is_htmx = request.headers.get('HX-Request') == 'true'
 
     # Require authentication to upload
     if not (getattr(request, 'session', None) and request.session.get('user')):
         logger.info("POST /upload - unauthenticated")
         if is_htmx:
-            body = _templates(request).get_template('_gallery.html').render({
-                "request": request,
-                "images": sorted(image_service.list_images(), key=lambda x: x.get('uploaded_at', ''), reverse=True)
-            })
-            return Response(content=body, status_code=401, headers={'HX-Trigger': 'auth-required'})
+            body = _render_gallery(request, image_service, cache)
+            return Response(content=body, status_code=401, media_type='text/html', headers={'HX-Trigger': 'auth-required'})
         return RedirectResponse(url='/login', status_code=status.HTTP_302_FOUND)
 
     if file is None:
         logger.warning("POST /upload - missing file")
         # HTMX: return gallery and an HX-Trigger header for flash-like behavior
         if is_htmx:
-            body = _templates(request).get_template('_gallery.html').render({
-                "request": request,
-                "images": sorted(image_service.list_images(), key=lambda x: x.get('uploaded_at', ''), reverse=True)
-            })
-            return Response(content=body, status_code=200, headers={'HX-Trigger': 'flash'})
+            body = _render_gallery(request, image_service, cache)
+            return Response(content=body, status_code=200, media_type='text/html', headers={'HX-Trigger': 'flash'})
         # Non-HTMX: redirect to home
         return RedirectResponse(url='/', status_code=status.HTTP_302_FOUND)
 
@@ -97,16 +144,15 @@ async def ui_upload(request: Request, image_service: Annotated[ImageService, Dep
         image_service.save_upload(
             FileStorage(file.file, filename=file.filename, content_type=file.content_type), url_builder, medicine_name or '')
         if is_htmx:
-            med_q = request.query_params.get('q')
-            stage_q = request.query_params.get('stage')
-            images_sorted = sorted(image_service.filter_images(med_q, stage_q), key=lambda image: image.get('uploaded_at', ''), reverse=True)
-            return _templates(request).TemplateResponse('_gallery.html', {"request": request, "images": images_sorted})
-        return RedirectResponse(url=f"/?q={request.query_params.get('q','')}&stage={request.query_params.get('stage','')}", status_code=status.HTTP_302_FOUND)
+            return HTMLResponse(_render_gallery(request, image_service, cache, request.query_params.get('q'), request.query_params.get('stage'),
+                                                request.query_params.get('search')))
+        return RedirectResponse(url=f"/?q={request.query_params.get('q','')}&stage={request.query_params.get('stage','')}"
+                                    f"&search={request.query_params.get('search','')}", status_code=status.HTTP_302_FOUND)
     except ValueError as e:
         logger.warning("UI upload failed: %s", e)
         if is_htmx:
-            med_q = request.query_params.get('q')
-            stage_q = request.query_params.get('stage')
-            images_sorted = sorted(image_service.filter_images(med_q, stage_q), key=lambda image: image.get('uploaded_at', ''), reverse=True)
-            return Response(content=_templates(request).get_template('_gallery.html').render({"request": request, "images": images_sorted}), status_code=400, headers={'HX-Trigger': 'upload-error'})
-        return RedirectResponse(url=f"/?q={request.query_params.get('q','')}&stage={request.query_params.get('stage','')}", status_code=status.HTTP_302_FOUND)
+            body = _render_gallery(request, image_service, cache, request.query_params.get('q'), request.query_params.get('stage'),
+                                   request.query_params.get('search'))
+            return Response(content=body, status_code=400, media_type='text/html', headers={'HX-Trigger': 'upload-error'})
+        return RedirectResponse(url=f"/?q={request.query_params.get('q','')}&stage={request.query_params.get('stage','')}"
+                                    f"&search={request.query_params.get('search','')}", status_code=status.HTTP_302_FOUND)
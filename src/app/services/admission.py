@@ -0,0 +1,226 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+try:
+    import fcntl
+except Exception:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+from starlette.responses import JSONResponse
+
+from app.config import AppConfig
+from app.observability.metrics import ADMISSION_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+# (method, path) of the routes behind admission control. Resumable uploads take their token here when
+# they are created, and the chunk completing one is admitted again by the route, for its declared length
+GUARDED_ROUTES = frozenset({('POST', '/api/images'), ('POST', '/upload'), ('POST', '/api/uploads')})
+# In-flight records older than this are dropped, covering workers that died mid-upload
+TICKET_TTL_S = 600.0
+
+# {'buckets': {user: [tokens, updated_at]}, 'inflight': {ticket: [bytes, pid, started_at]}}
+State = dict[str, dict[str, list[Any]]]
+
+
+@dataclass(frozen=True)
+class AdmissionLimits:
+    rate_per_s: float = 0.0  # token refill rate per user; 0 disables the per-user bucket
+    burst: int = 1
+    max_backlog: int = 0  # uploads in progress at once; 0 = unlimited
+    max_inflight_bytes: int = 0  # declared bytes of uploads in progress; 0 = unlimited
+    retry_after_s: int = 5  # advertised when shedding load (no per-user estimate exists)
+
+    @classmethod
+    def from_config(cls) -> "AdmissionLimits":
+        return cls(rate_per_s=AppConfig.UPLOAD_RATE_PER_MINUTE / 60.0, burst=max(1, AppConfig.UPLOAD_BURST),
+                   max_backlog=AppConfig.MAX_ANALYSIS_BACKLOG, max_inflight_bytes=AppConfig.MAX_INFLIGHT_UPLOAD_BYTES,
+                   retry_after_s=AppConfig.ADMISSION_RETRY_AFTER_S)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after_s: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+def _empty_state() -> State:
+    return {'buckets': {}, 'inflight': {}}
+
+
+class MemoryAdmissionState:
+    """Admission state of a single worker process."""
+    def __init__(self):
+        self._state = _empty_state()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self) -> Iterator[State]:
+        with self._lock:
+            yield self._state
+
+
+class FileAdmissionState:
+    """Admission state shared by the workers of one host through a small JSON file.
+
+    Every admit/release holds an exclusive flock while it reads, updates and
+    rewrites the file, so all workers see one set of buckets and in-flight
+    uploads. The file only holds active users and uploads, so it stays tiny.
+    """
+    def __init__(self, path: str):
+        if fcntl is None:
+            raise RuntimeError('ADMISSION_STATE_FILE requires fcntl (POSIX)')
+        self._path = path
+        # flock is held per open file, not per thread; serialize this process's threads first
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def locked(self) -> Iterator[State]:
+        with self._lock, open(self._path, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                try:
+                    state = json.loads(raw) if raw else _empty_state()
+                except ValueError:
+                    logger.warning("Admission state file %s is corrupt; starting over", self._path)
+                    state = _empty_state()
+                yield state
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class AdmissionController:
+    """Token bucket per user plus global limits on uploads in progress.
+
+    Global limits are checked first, so a shed request doesn't cost the user a
+    token. A single upload larger than max_inflight_bytes is still admitted
+    when nothing else is in progress; otherwise it could never get in.
+    """
+    def __init__(self, limits: AdmissionLimits, state=None, clock: Callable[[], float] = time.time):
+        self._limits = limits
+        self._state = state or MemoryAdmissionState()
+        self._clock = clock
+
+    @classmethod
+    def from_config(cls) -> "AdmissionController":
+        state = FileAdmissionState(AppConfig.ADMISSION_STATE_FILE) if AppConfig.ADMISSION_STATE_FILE else None
+        return cls(AdmissionLimits.from_config(), state)
+
+    def admit(self, user: str | None, size: int, take_token: bool = True) -> str:
+        """Reserve a slot for an upload of `size` bytes; returns a ticket for release().
+
+        Raises AdmissionRejected with the reason and a Retry-After in seconds.
+        `take_token=False` applies only the global limits, for an upload whose
+        token was taken earlier (the completion of a resumable upload).
+        """
+        limits = self._limits
+        now = self._clock()
+        with self._state.locked() as state:
+            self._prune(state, now)
+            inflight = state['inflight']
+            retry_after = float(limits.retry_after_s)
+            if limits.max_backlog and len(inflight) >= limits.max_backlog:
+                reason = 'backlog'
+            elif limits.max_inflight_bytes and inflight \
+                    and sum(record[0] for record in inflight.values()) + size > limits.max_inflight_bytes:
+                reason = 'inflight_bytes'
+            else:
+                wait = self._take_token(state['buckets'], user, now) if take_token else 0.0
+                if not wait:
+                    ticket = uuid.uuid4().hex
+                    inflight[ticket] = [size, os.getpid(), now]
+                    return ticket
+                reason, retry_after = 'rate_limited', wait
+        ADMISSION_REJECTIONS.labels(reason).inc()
+        raise AdmissionRejected(reason, max(1, math.ceil(retry_after)))
+
+    def release(self, ticket: str) -> None:
+        with self._state.locked() as state:
+            state['inflight'].pop(ticket, None)
+
+    def _take_token(self, buckets: dict[str, list[float]], user: str | None, now: float) -> float:
+        """Take one token from the user's bucket; returns 0, or the seconds until a token is available."""
+        rate, burst = self._limits.rate_per_s, self._limits.burst
+        if not user or rate <= 0:
+            return 0.0
+        tokens, updated = buckets.get(user, (burst, now))
+        tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+        if tokens >= 1:
+            buckets[user] = [tokens - 1, now]
+            return 0.0
+        buckets[user] = [tokens, now]
+        return (1 - tokens) / rate
+
+    def _prune(self, state: State, now: float) -> None:
+        # Buckets that refilled completely behave like absent ones
+        rate, burst = self._limits.rate_per_s, self._limits.burst
+        state['buckets'] = {user: bucket for user, bucket in state['buckets'].items()
+                            if rate > 0 and bucket[0] + (now - bucket[1]) * rate < burst}
+        pid = os.getpid()
+        state['inflight'] = {ticket: record for ticket, record in state['inflight'].items()
+                             if now - record[2] < TICKET_TTL_S and (record[1] == pid or _process_alive(record[1]))}
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying admission control to the upload routes.
+
+    Installed inside SessionMiddleware, so the session user is known, and
+    ahead of the route, so a rejected upload's multipart body is never parsed,
+    stored or analyzed. The declared Content-Length counts toward in-flight
+    bytes until the response has been sent; a body without one (chunked)
+    counts as the largest accepted upload, MAX_CONTENT_LENGTH.
+    """
+    def __init__(self, app, controller: AdmissionController | None = None):
+        self.app = app
+        self._controller = controller or AdmissionController.from_config()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or (scope['method'], scope['path']) not in GUARDED_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        user = ((scope.get('session') or {}).get('user') or {}).get('email')
+        size = AppConfig.MAX_CONTENT_LENGTH
+        for name, value in scope['headers']:
+            if name == b'content-length' and value.isdigit():
+                size = int(value)
+        try:
+            # The shared state file may wait on another worker's lock
+            ticket = await asyncio.to_thread(self._controller.admit, user, size)
+        except AdmissionRejected as e:
+            logger.warning("Upload rejected (%s) for %s; retry after %ss", e.reason, user or 'anonymous', e.retry_after_s)
+            response = JSONResponse({'detail': 'Too many uploads, try again later', 'reason': e.reason}, status_code=429,
+                                    headers={'Retry-After': str(e.retry_after_s), 'HX-Trigger': 'upload-error'})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await asyncio.to_thread(self._controller.release, ticket)
@@ -1,30 +1,47 @@
 import os
+import threading
+from typing import Any
 
-from dotenv import load_dotenv
 from starlette.applications import AppType
 from starlette.middleware.sessions import SessionMiddleware
-from authlib.integrations.starlette_client import OAuth
-
-# Configure OAuth
-oauth = OAuth()
-
-load_dotenv()
-oauth.register(
-    name='google',
-    client_id=os.environ.get('GOOGLE_CLIENT_ID', ''),
-    client_secret=os.environ.get('GOOGLE_CLIENT_SECRET', ''),
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={
-        'scope': 'openid email profile'
-    }
-)
+
+_oauth: Any | None = None
+_oauth_lock = threading.Lock()
+
+
+def get_oauth() -> Any:
+    """OAuth registry with the Google client, built on first use.
+
+    authlib's Starlette integration is slow to import, so it is kept off the
+    startup path (see app.services.warmup).
+    """
+    global _oauth
+    if _oauth is None:
+        with _oauth_lock:
+            if _oauth is None:
+                from authlib.integrations.starlette_client import OAuth
+                oauth = OAuth()
+                oauth.register(
+                    name='google',
+                    client_id=os.environ.get('GOOGLE_CLIENT_ID', ''),
+                    client_secret=os.environ.get('GOOGLE_CLIENT_SECRET', ''),
+                    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+                    client_kwargs={
+                        'scope': 'openid email profile'
+                    }
+                )
+                _oauth = oauth
+    return _oauth
+
+def session_secret() -> str:
+    # Secret from env with fallback for dev
+    return os.environ.get('SESSION_SECRET', 'dev-secret-change-me')
 
 def ensure_session_middleware(app: AppType):
     # Starlette/FastAPI requires SessionMiddleware to store user session
-    # Add only once; secret from env with fallback for dev
+    # Add only once
     if not any(isinstance(m.cls, SessionMiddleware) or m.cls is SessionMiddleware for m in app.user_middleware):
-        secret = os.environ.get('SESSION_SECRET', 'dev-secret-change-me')
-        app.add_middleware(SessionMiddleware, secret_key=secret, same_site='lax')
+        app.add_middleware(SessionMiddleware, secret_key=session_secret(), same_site='lax')
 
 
 
@@ -0,0 +1,219 @@
+"""Re-run the photo analyzer over entries that need it.
+
+    python -m app.services.backfill --concurrency 4 --rate 2 --batch-size 50
+    python -m app.services.backfill --older-model --limit 1000
+
+By default APPROVAL_WAITING entries are selected (an analyzer field was
+missing or the call failed); --older-model also selects entries analyzed
+with a model other than the configured one, or never analyzed. Entries held
+for duplicate review are left to a human. Analyzer calls run on a bounded
+thread pool behind a rate limiter; results are committed in one metadata
+rewrite per batch, and the ids handled so far are checkpointed after every
+batch so an interrupted run resumes where it stopped.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from app.config import AppConfig
+from app.models.image_entry import Stage
+from app.repository.image_repository import ImageMetadataRepository
+from app.storage.backends import storage_backend_from_config
+from app.storage.filesystem import FileSystem
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BackfillStats:
+    selected: int = 0
+    skipped: int = 0  # already handled according to the checkpoint
+    completed: int = 0  # all fields found; waiting entries move on to UPLOADED
+    incomplete: int = 0  # analyzed, but a field is still missing
+    invalid: int = 0  # analyzer says it's not a medicine package; left for review
+    failed: int = 0  # file missing or analyzer unavailable; retried on the next run
+    batches: int = 0
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads; rate <= 0 disables it."""
+    def __init__(self, rate_per_s: float, clock=time.monotonic, sleep=time.sleep):
+        self._interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self._interval:
+            return
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next)
+            self._next = slot + self._interval
+        if slot > now:
+            self._sleep(slot - now)
+
+
+def select_entries(entries: Iterable[dict[str, Any]], model_name: str | None = None,
+                   older_model: bool = False) -> list[dict[str, Any]]:
+    selected = []
+    for entry in entries:
+        if entry.get('possible_duplicate_of'):
+            continue
+        waiting = entry.get('stage') == Stage.APPROVAL_WAITING.value
+        stale = older_model and entry.get('model') != model_name
+        if waiting or stale:
+            selected.append(entry)
+    return selected
+
+
+def load_checkpoint(path: str | None) -> set[str]:
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as f:
+        return set(json.load(f).get('done', []))
+
+
+def save_checkpoint(path: str, done: set[str], stats: BackfillStats) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'done': sorted(done), 'stats': asdict(stats)}, f)
+    os.replace(tmp, path)
+
+
+def _analysis_patch(entry: dict[str, Any], result, model_name: str | None, stats: BackfillStats,
+                    versions: dict[str, int]) -> dict[str, Any] | None:
+    """Metadata changes for one analyzer result, mirroring how uploads interpret it.
+
+    None means nothing to write: a failed call (counted in stats.failed) or an
+    invalid package, which stays waiting for a human.
+    """
+    if result is None or result[0] is None:
+        stats.failed += 1
+        return None
+    if result[0] is False:
+        stats.invalid += 1
+        return None
+    _, med, form, substance = result
+    patch: dict[str, Any] = {'model': model_name}
+    if med and med != entry.get('medicine_name'):
+        # A new name starts at the next version of that medicine, as on upload
+        key = med.lower()
+        versions[key] = versions.get(key, 0) + 1
+        patch.update(medicine_name=med, version=versions[key])
+    if form:
+        patch['form'] = form
+    if substance:
+        patch['substance'] = substance
+    if med and form and substance:
+        stats.completed += 1
+        if entry.get('stage') == Stage.APPROVAL_WAITING.value:
+            patch['stage'] = Stage.UPLOADED.value
+    else:
+        stats.incomplete += 1
+    return patch
+
+
+def run_backfill(repo: ImageMetadataRepository, fs: FileSystem, analyzer, upload_dir: str, older_model: bool = False,
+                 concurrency: int = 4, rate_per_s: float = 0.0, batch_size: int = 50, limit: int | None = None,
+                 checkpoint_path: str | None = None, dry_run: bool = False) -> BackfillStats:
+    stats = BackfillStats()
+    model_name = getattr(analyzer, 'model_name', None)
+    done = load_checkpoint(checkpoint_path)
+    # One streamed pass: keep the selected entries and the highest version per medicine
+    selected: list[dict[str, Any]] = []
+    versions: dict[str, int] = {}
+    for entry in repo.iter_all():
+        selected.extend(select_entries((entry,), model_name, older_model))
+        key = str(entry.get('medicine_name') or '').lower()
+        if isinstance(entry.get('version'), int):
+            versions[key] = max(versions.get(key, 0), entry['version'])
+    pending = [e for e in selected if e.get('id') not in done]
+    stats.selected, stats.skipped = len(selected), len(selected) - len(pending)
+    if limit is not None:
+        pending = pending[:limit]
+    logger.info("Backfill: %d entries to analyze with %s (%d already done, %d workers, rate %s/s)",
+                len(pending), model_name, stats.skipped, concurrency, rate_per_s or 'unlimited')
+
+    limiter = RateLimiter(rate_per_s)
+
+    def analyze(entry: dict[str, Any]):
+        try:
+            content = fs.read_file(os.path.join(upload_dir, entry['stored_name']))
+        except Exception as e:
+            logger.warning("Backfill: cannot read file of entry %s: %s", entry.get('id'), e)
+            return None
+        limiter.wait()
+        try:
+            return analyzer.analyze_image(content, entry.get('content_type') or 'image/*')
+        except Exception as e:
+            logger.warning("Backfill: analyzer failed for entry %s: %s", entry.get('id'), e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='backfill') as pool:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            patches: dict[str, dict[str, Any]] = {}
+            for entry, result in zip(batch, pool.map(analyze, batch), strict=True):
+                failed = stats.failed
+                patch = _analysis_patch(entry, result, model_name, stats, versions)
+                if patch:
+                    patches[entry['id']] = patch
+                if stats.failed == failed:
+                    # Failed calls stay out of the checkpoint, so a resumed run retries them
+                    done.add(entry['id'])
+            if not dry_run:
+                # One rewrite per batch; re-reads the metadata, so uploads made meanwhile are kept, and only
+                # moves entries still waiting, so a promote or reject done meanwhile is kept as well
+                repo.update_many(patches, expect={'stage': Stage.APPROVAL_WAITING.value})
+                if checkpoint_path:
+                    save_checkpoint(checkpoint_path, done, stats)
+            stats.batches += 1
+            logger.info("Backfill: batch %d done, %d/%d analyzed", stats.batches, start + len(batch), len(pending))
+
+    finished = len(pending) == stats.selected - stats.skipped
+    if checkpoint_path and finished and not dry_run and os.path.exists(checkpoint_path):
+        # The job is complete; the next run starts over from the current metadata
+        os.remove(checkpoint_path)
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.services.backfill', description=__doc__.splitlines()[0])
+    parser.add_argument('--older-model', action='store_true',
+                        help='also re-analyze entries analyzed with another model than GEMINI_MODEL')
+    parser.add_argument('--concurrency', type=int, default=4, help='analyzer calls in parallel')
+    parser.add_argument('--rate', type=float, default=2.0, help='analyzer calls per second (0 = unlimited)')
+    parser.add_argument('--batch-size', type=int, default=50, help='entries per metadata rewrite and checkpoint')
+    parser.add_argument('--limit', type=int, default=None, help='analyze at most this many entries in this run')
+    parser.add_argument('--checkpoint', default=f"{AppConfig.METADATA_FILE}.backfill.json",
+                        help='progress file; an unfinished job resumes from it')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+    parser.add_argument('--dry-run', action='store_true', help='analyze but do not write metadata or checkpoints')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(name)s | %(message)s')
+    from app.services.photo_analyzer import PackagePhotoAnalyzer
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    fs = FileSystem(backend=storage_backend_from_config())
+    repo = ImageMetadataRepository(AppConfig.METADATA_FILE, fs)
+    stats = run_backfill(repo, fs, PackagePhotoAnalyzer(), AppConfig.UPLOAD_DIR, older_model=args.older_model,
+                         concurrency=args.concurrency, rate_per_s=args.rate, batch_size=args.batch_size, limit=args.limit,
+                         checkpoint_path=args.checkpoint, dry_run=args.dry_run)
+    print(' '.join(f"{key}={value}" for key, value in asdict(stats).items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
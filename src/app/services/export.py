@@ -0,0 +1,156 @@
+import csv
+import io
+import logging
+import os
+import tarfile
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+from app.json_codec import iter_ndjson
+from app.models.compact_entry import CompactEntry
+from app.models.image_entry import Stage
+from app.repository.image_repository import ImageMetadataRepository
+from app.storage.filesystem import FileSystem
+
+logger = logging.getLogger(__name__)
+
+# CSV columns; keys outside this list (duplicate markers and the like) are left out
+CSV_FIELDS = ('id', 'original_name', 'stored_name', 'url', 'size', 'content_type', 'uploaded_at', 'medicine_name',
+              'version', 'stage', 'form', 'substance', 'phash', 'model', 'revision')
+CHUNK_BYTES = 64 * 1024
+
+
+def parse_timestamp(value: str | None) -> datetime | None:
+    """Parse an ISO date or datetime; naive values are taken as UTC. None when absent or malformed."""
+    if not value:
+        return None
+    text = value.strip()
+    if text.endswith('+00:00Z'):
+        # uploaded_at is written with both an offset and a 'Z'
+        text = text[:-1]
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=UTC) if parsed.tzinfo is None else parsed
+
+
+@dataclass
+class ExportFilter:
+    """Which entries an export includes.
+
+    `uploaded_from` is inclusive and `uploaded_to` exclusive, so consecutive
+    date ranges never overlap. `since_revision` keeps only entries added or
+    changed after that catalogue revision (see next_revision).
+    """
+    medicine_query: str = ''
+    stage: str = ''
+    uploaded_from: datetime | None = None
+    uploaded_to: datetime | None = None
+    since_revision: int = 0
+
+    def matches(self, entry: CompactEntry) -> bool:
+        if self.since_revision and (entry.revision or 0) <= self.since_revision:
+            return False
+        if self.stage and (entry.stage or Stage.UPLOADED.value).upper() != self.stage:
+            return False
+        if self.medicine_query and str(entry.medicine_name or '').lower().find(self.medicine_query) == -1:
+            return False
+        if self.uploaded_from is not None or self.uploaded_to is not None:
+            uploaded = parse_timestamp(entry.uploaded_at)
+            if uploaded is None:
+                return False
+            if self.uploaded_from is not None and uploaded < self.uploaded_from:
+                return False
+            if self.uploaded_to is not None and uploaded >= self.uploaded_to:
+                return False
+        return True
+
+
+class CatalogueExporter:
+    """Streams the catalogue as NDJSON, CSV or a tar of the image files.
+
+    Every format is produced entry by entry from one compact snapshot, so
+    memory stays flat regardless of catalogue size; image bytes are copied in
+    CHUNK_BYTES pieces from local disk or object storage. Take the snapshot
+    once and pass it to both revision() and the iterator, so the revision a
+    client resumes from matches what it received.
+    """
+    def __init__(self, repo: ImageMetadataRepository, fs: FileSystem, upload_dir: str):
+        self._repo = repo
+        self._fs = fs
+        self._upload_dir = upload_dir
+
+    def snapshot(self) -> list[CompactEntry]:
+        return self._repo.entries()
+
+    @staticmethod
+    def revision(entries: list[CompactEntry]) -> int:
+        """Highest revision in `entries`; pass it as since_revision next time to get only the delta."""
+        return max((e.revision for e in entries if e.revision is not None), default=0)
+
+    def iter_entries(self, entries: list[CompactEntry], export_filter: ExportFilter) -> Iterator[dict[str, Any]]:
+        for entry in entries:
+            if export_filter.matches(entry):
+                data = entry.to_dict()
+                if not data.get('stage'):
+                    data['stage'] = Stage.UPLOADED.value
+                yield data
+
+    def iter_ndjson(self, entries: list[CompactEntry], export_filter: ExportFilter) -> Iterator[bytes]:
+        return iter_ndjson(self.iter_entries(entries, export_filter), CHUNK_BYTES)
+
+    def iter_csv(self, entries: list[CompactEntry], export_filter: ExportFilter) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for data in self.iter_entries(entries, export_filter):
+            writer.writerow(data)
+            if buffer.tell() >= CHUNK_BYTES:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+
+    def iter_tar(self, entries: list[CompactEntry], export_filter: ExportFilter) -> Iterator[bytes]:
+        """Uncompressed tar of the matching image files, named by their stored_name.
+
+        Headers are written by hand around streamed file bodies (tarfile's
+        writer needs a seekable or fully buffered source per member). Files that
+        are missing from storage are skipped with a warning.
+        """
+        for data in self.iter_entries(entries, export_filter):
+            stored_name = data.get('stored_name')
+            if not stored_name:
+                continue
+            path = os.path.join(self._upload_dir, stored_name)
+            try:
+                size = self._fs.file_size(path)
+                stream = self._fs.open_file(path)
+            except Exception as e:
+                logger.warning("Export: skipping %s: %s", stored_name, e)
+                continue
+            info = tarfile.TarInfo(stored_name)
+            info.size = size
+            info.mode = 0o644
+            uploaded = parse_timestamp(data.get('uploaded_at'))
+            info.mtime = int(uploaded.timestamp()) if uploaded else 0
+            with stream:
+                yield info.tobuf(format=tarfile.PAX_FORMAT)
+                remaining = size
+                while remaining > 0:
+                    chunk = stream.read(min(CHUNK_BYTES, remaining))
+                    if not chunk:
+                        # File shrank since it was sized; pad so the archive stays readable
+                        logger.warning("Export: %s ended %d bytes early", stored_name, remaining)
+                        yield tarfile.NUL * remaining
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+            padding = -size % tarfile.BLOCKSIZE
+            if padding:
+                yield tarfile.NUL * padding
+        # End-of-archive marker: two zero blocks
+        yield tarfile.NUL * (2 * tarfile.BLOCKSIZE)
@@ -1,61 +1,140 @@
+import logging
 import os
+import threading
 import typing
 import uuid
-import logging
-from datetime import datetime, UTC
-from typing import List, Dict, Any
+from datetime import UTC, datetime
+from typing import Any
 
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 
 from app.config import AppConfig
+from app.models.catalogue_stats import CatalogueStats
+from app.models.compact_entry import CompactEntry
 from app.models.image_entry import ImageEntry, Stage
+from app.observability.metrics import UPLOAD_SIZE
+from app.observability.timing import span
 from app.repository.image_repository import ImageMetadataRepository
+from app.services.perceptual_hash import PerceptualHashIndex, dhash, from_hex, to_hex
+from app.services.photo_analyzer import PackagePhotoAnalyzer
+from app.services.search_index import SearchIndex, tokenize
 from app.storage.filesystem import FileSystem
+from app.storage.layout import stored_name_for
 from app.validation.image_validator import ImageValidator
-from app.services.photo_analyzer import PackagePhotoAnalyzer
-
-from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 class ImageService:
     """Coordinates upload and listing (SRP, orchestrates collaborators)."""
     def __init__(self, upload_dir: str, repo: ImageMetadataRepository, fs: FileSystem, validator: ImageValidator,
-                 analyzer: Optional[PackagePhotoAnalyzer] = None):
+                 analyzer: PackagePhotoAnalyzer | None = None):
         self._upload_dir = upload_dir
         self._repo = repo
         self._fs = fs
         self._validator = validator
         self._analyzer = analyzer or PackagePhotoAnalyzer()
+        self._phash_index: PerceptualHashIndex | None = None
+        self._phash_generation = None
+        self._search_index: SearchIndex | None = None
+        self._search_source: list[CompactEntry] | None = None
+        self._search_patched: tuple[list[int] | None, int] = (None, 0)
+        self._search_lock = threading.Lock()
 
-    def list_images(self) -> List[Dict[str, Any]]:
-        # Ensure backward compatibility: default missing stage to UPLOADED
-        images = self._repo.load_all()
-        for img in images:
-            if 'stage' not in img or not img.get('stage'):
-                img['stage'] = Stage.UPLOADED.value
+    def list_images(self) -> list[dict[str, Any]]:
+        images = [self._as_dict(e) for e in self._repo.entries()]
         logger.debug("list_images -> %d items", len(images))
         return images
 
-    def filter_images(self, medicine_query: typing.Optional[str] = None, stage: typing.Optional[str] = None) -> List[Dict[str, Any]]:
-        """Return images filtered by optional medicine name contains (case-insensitive)
-        and/or stage equals (UPLOADED/PROCESSED/ARCHIVED). Stage comparison uses string values.
+    @staticmethod
+    def _as_dict(entry: CompactEntry) -> dict[str, Any]:
+        # Ensure backward compatibility: default missing stage to UPLOADED
+        img = entry.to_dict()
+        if not img.get('stage'):
+            img['stage'] = Stage.UPLOADED.value
+        return img
+
+    def metadata_generation(self) -> int:
+        """Generation of the underlying metadata; changes on every catalogue write."""
+        return self._repo.generation
+
+    @staticmethod
+    def normalize_filters(medicine_query: str | None = None, stage: str | None = None,
+                          search: str | None = None) -> tuple[str, str, str]:
+        """Normalize filter inputs the way filter_images applies them.
+        Unsupported stage values are dropped, since they don't filter anything;
+        the search text is reduced to its folded tokens.
         """
-        images = self.list_images()
         med_q = (medicine_query or '').strip().lower()
         stage_q = (stage or '').strip().upper()
-        if med_q:
-            images = [img for img in images if str(img.get('medicine_name', '')).lower().find(med_q) != -1]
-        if stage_q and stage_q in {Stage.UPLOADED.value, Stage.PROCESSED.value, Stage.ARCHIVED.value}:
-            images = [img for img in images if (img.get('stage') or Stage.UPLOADED.value).upper() == stage_q]
-        logger.debug("filter_images q='%s' stage='%s' -> %d items", medicine_query, stage, len(images))
+        if stage_q not in {Stage.UPLOADED.value, Stage.PROCESSED.value, Stage.ARCHIVED.value}:
+            stage_q = ''
+        return med_q, stage_q, ' '.join(tokenize(search))
+
+    def iter_images(self, medicine_query: str | None = None, stage: str | None = None,
+                    search: str | None = None) -> typing.Iterator[dict[str, Any]]:
+        """Yield the filtered entries one dict at a time; only the matches are converted.
+        With a search text, only matching entries are visited, best match first.
+        """
+        med_q, stage_q, search_q = self.normalize_filters(medicine_query, stage, search)
+        snapshot = self._repo.entries()
+        entries: typing.Iterable[CompactEntry] = snapshot
+        if search_q:
+            entries = (snapshot[position] for position in self.__search_index(snapshot).search(search_q))
+        for e in entries:
+            if med_q and str(e.medicine_name or '').lower().find(med_q) == -1:
+                continue
+            if stage_q and (e.stage or Stage.UPLOADED.value).upper() != stage_q:
+                continue
+            yield self._as_dict(e)
+
+    def filter_images(self, medicine_query: str | None = None, stage: str | None = None,
+                      search: str | None = None) -> list[dict[str, Any]]:
+        """Return images filtered by optional medicine name contains (case-insensitive)
+        and/or stage equals (UPLOADED/PROCESSED/ARCHIVED). Stage comparison uses string values.
+        A search text matches medicine name, substance and form by word prefix,
+        accent- and case-insensitively, and orders the result by relevance.
+        """
+        images = list(self.iter_images(medicine_query, stage, search))
+        logger.debug("filter_images q='%s' stage='%s' search='%s' -> %d items", medicine_query, stage, search, len(images))
         return images
 
+    def __search_index(self, entries: list[CompactEntry]) -> SearchIndex:
+        """Search index over the `entries` snapshot.
+
+        Snapshots are replaced on every reload, so identity tells whether the
+        index is current. A snapshot that only appended entries to the indexed
+        one (our own uploads) is indexed incrementally, and entries patched in
+        place (see patched_positions) are re-indexed one by one; anything else
+        (rewrites, other workers' uploads) rebuilds the index.
+        """
+        patched = self._repo.patched_positions()
+        with self._search_lock:
+            source, index = self._search_source, self._search_index
+            log, seen = self._search_patched
+            if index is not None and source is entries and log is patched and seen == len(patched):
+                return index
+            if index is not None and log is patched and (source is entries or (
+                    len(entries) > len(source) and (not source or entries[len(source) - 1] is source[-1]))):
+                start = len(source)
+            else:
+                index, start, seen = SearchIndex(), 0, len(patched)
+            with span('search_index'):
+                for position in range(start, len(entries)):
+                    e = entries[position]
+                    index.add(position, e.medicine_name, e.substance, e.form)
+                for position in patched[seen:]:
+                    if position < start:
+                        e = entries[position]
+                        index.update(position, e.medicine_name, e.substance, e.form)
+            self._search_index, self._search_source = index, entries
+            self._search_patched = (patched, len(patched))
+            return index
+
     def is_allowed(self, filename: str) -> bool:
         return self._validator.allowed_file(filename)
 
-    def save_upload(self, file: FileStorage, url_builder: typing.Callable[[str], str], medicine_name: str) -> Dict[str, Any]:
+    def save_upload(self, file: FileStorage, url_builder: typing.Callable[[str], str], medicine_name: str) -> dict[str, Any]:
         if file.filename == '':
             raise ValueError('No selected file')
         if not self._validator.allowed_file(file.filename):
@@ -68,21 +147,48 @@ class ImageService:
 
         original_name = secure_filename(file.filename)
         ext = os.path.splitext(original_name)[1].lower()
-        stored_name = f"{uuid.uuid4().hex}{ext}"
+        stored_name = stored_name_for(f"{uuid.uuid4().hex}{ext}")
         self._fs.ensure_storage(self._upload_dir, AppConfig.METADATA_FILE)
         path = os.path.join(self._upload_dir, stored_name)
-        self._fs.save_file(file, path)
+        with span('save_file'):
+            self._fs.save_file(file, path)
         logger.info("Saved file to %s (size=%s, content_type=%s)", path, getattr(file, 'content_length', None), file.mimetype)
 
         # Default metadata based on input
         med = med_input
         stage_value = Stage.UPLOADED
 
-        med, form, stage_value, substance = self.__image_analysis(med, path, stage_value, file.mimetype)
+        # Read the stored bytes once for both the perceptual hash and the analyzer
+        content: bytes | None = None
+        try:
+            with span('read_file'):
+                content = self._fs.read_file(path)
+        except Exception as e:
+            logger.exception("Failed to read stored file %s: %s", path, e)
+
+        with span('phash'):
+            phash = dhash(content) if content else None
+            duplicate = self.__find_near_duplicate(phash)
 
-        version = self.determine_version(med)
+        reused = duplicate is not None and duplicate[1] <= AppConfig.PHASH_REUSE_DISTANCE \
+            and bool(duplicate[0].get('form') and duplicate[0].get('substance'))
+        if reused:
+            # Re-photograph of a known package: reuse its analysis and version, skip Gemini
+            original, distance = duplicate
+            logger.info("Upload is a near-duplicate of %s (distance=%d); reusing its analysis", original.get('id'), distance)
+            med, form, substance = original.get('medicine_name') or med, original.get('form'), original.get('substance')
+            version = int(original.get('version') or 1)
+            model = original.get('model')
+        else:
+            med, form, stage_value, substance, model = self.__image_analysis(med, content, path, stage_value, file.mimetype)
+            if duplicate is not None:
+                # Similar but not close enough to trust; let a human decide
+                stage_value = Stage.APPROVAL_WAITING
+            with span('determine_version'):
+                version = self.determine_version(med)
 
         size = self._fs.file_size(path)
+        UPLOAD_SIZE.observe(size)
         entry = ImageEntry(
             id=uuid.uuid4().hex,
             original_name=original_name,
@@ -101,23 +207,59 @@ class ImageService:
             entry_dict['form'] = form
         if substance:
             entry_dict['substance'] = substance
-        self._repo.append(entry_dict)
+        if phash is not None:
+            entry_dict['phash'] = to_hex(phash)
+        if model:
+            # Which analyzer model produced form/substance; lets a backfill find stale analyses
+            entry_dict['model'] = model
+        if duplicate is not None:
+            entry_dict['duplicate_of' if reused else 'possible_duplicate_of'] = duplicate[0].get('id')
+            entry_dict['duplicate_distance'] = duplicate[1]
+        index_current = self._phash_index is not None and self._phash_generation == self._repo.generation
+        with span('append'):
+            self._repo.append(entry_dict)
+        if phash is not None and index_current:
+            # Keep the index incremental for our own writes; other workers' writes trigger a rebuild
+            self._phash_index.add(entry_dict['id'], phash)
+            self._phash_generation = self._repo.generation
         return entry_dict
 
-    def __image_analysis(self, med: str, path: str, stage_value: Stage, file_mimetype: str = 'image/*',
-                         ) -> tuple[str, str | None, Stage, str | None]:
+    def __find_near_duplicate(self, phash: int | None) -> tuple[dict[str, Any], int] | None:
+        """Closest existing entry within PHASH_REVIEW_DISTANCE of `phash`, with its distance."""
+        if phash is None:
+            return None
+        try:
+            generation = self._repo.generation
+            if self._phash_index is None or generation != self._phash_generation:
+                index = PerceptualHashIndex()
+                for e in self._repo.entries():
+                    value = from_hex(e.phash)
+                    if value is not None:
+                        index.add(e.id, value)
+                self._phash_index, self._phash_generation = index, generation
+            match = self._phash_index.nearest(phash, AppConfig.PHASH_REVIEW_DISTANCE)
+            if match is None:
+                return None
+            original = self._repo.get(match[0])
+            return (original.to_dict(), match[1]) if original is not None else None
+        except Exception as e:
+            logger.exception("Near-duplicate lookup failed: %s", e)
+            return None
+
+    def __image_analysis(self, med: str, content: bytes | None, path: str, stage_value: Stage, file_mimetype: str = 'image/*',
+                         ) -> tuple[str, str | None, Stage, str | None, str | None]:
         # Invoke Gemini analysis if available; failures fall back silently
         analysis_result: tuple[bool, str, str, str] | None = None
         try:
-            with open(path, 'rb') as fbytes:
-                content = fbytes.read()
-            analysis_result = self._analyzer.analyze_image(content, file_mimetype)
+            if content is not None:
+                with span('analyze'):
+                    analysis_result = self._analyzer.analyze_image(content, file_mimetype)
         except Exception as e:
             # On any analyzer error, proceed without AI influence
             logger.exception("Analyzer error: %s", e)
         if analysis_result is None:
             logger.warning("Gemini analysis failed for %s", path)
-            return med, None, stage_value, None
+            return med, None, stage_value, None, None
 
         if analysis_result and analysis_result[0] is False:
             # Remove invalid file and reject upload
@@ -135,21 +277,22 @@ class ImageService:
         if not analysis_result or not analysis_result[1] or not analysis_result[2] or not analysis_result[3]:
             stage_value = Stage.APPROVAL_WAITING
 
-        return med, form, stage_value, substance
+        model = getattr(self._analyzer, 'model_name', None)
+        return med, form, stage_value, substance, model if isinstance(model, str) else None
 
     def determine_version(self, med: str) -> int:
         # Determine version: max an existing version for this medicine_name + 1
         try:
-            existing = self._repo.load_all()
+            existing = self._repo.entries()
         except Exception as e:
             logger.exception("Failed to load existing metadata: %s", e)
             existing = []
         med_lower = med.lower()
         max_ver = 0
         for e in existing:
-            if str(e.get('medicine_name', '')).lower() == med_lower:
+            if str(e.medicine_name or '').lower() == med_lower:
                 try:
-                    v = int(e.get('version', 0))
+                    v = int(e.version or 0)
                 except Exception:
                     v = 0
                 if v > max_ver:
@@ -157,26 +300,57 @@ class ImageService:
         version = max_ver + 1 if max_ver >= 0 else 1
         return version
 
-    def promote_stage(self, image_id: str) -> List[Dict[str, Any]]:
+    def get_image(self, image_id: str) -> dict[str, Any] | None:
+        entry = self._repo.get(image_id)
+        return self._as_dict(entry) if entry is not None else None
+
+    def update_image(self, image_id: str, stage: Stage | None = None, medicine_name: str | None = None,
+                     if_match: typing.Callable[[dict[str, Any]], bool] | None = None) -> dict[str, Any] | None:
+        """Set the stage and/or medicine name of one image; returns it updated, or None if unknown.
+        A new medicine name starts at the next version of that medicine, as on upload.
+        Only the one entry is written (see ImageMetadataRepository.patch). `if_match`
+        gets the image as stored right before the write and raises PreconditionFailed
+        by returning False.
+        """
+        stage_value = Stage(stage).value if stage is not None else None
+        med = None
+        if medicine_name is not None:
+            med = medicine_name.strip()
+            if not med:
+                raise ValueError('Medicine name is required')
+        fields: dict[str, Any] = {}
+
+        def changes(current: CompactEntry, stats: CatalogueStats) -> dict[str, Any]:
+            # Built by the repository under its write lock, so concurrent renames and uploads can't share a version
+            if stage_value is not None:
+                fields['stage'] = stage_value
+            if med is not None:
+                if med != current.medicine_name:
+                    fields['medicine_name'] = med
+                # Medicine names compare case-insensitively (see determine_version); a recasing keeps the version
+                if med.lower() != str(current.medicine_name or '').lower():
+                    fields['version'] = stats.latest_version(med) + 1
+            return fields
+
+        precondition = (lambda entry: if_match(self._as_dict(entry))) if if_match is not None else None
+        index_current = self._phash_index is not None and self._phash_generation == self._repo.generation
+        updated = self._repo.patch(image_id, changes, precondition)
+        if updated is None:
+            return None
+        if fields:
+            if index_current:
+                # Hashes don't change with the stage or name; keep the index instead of rebuilding it
+                self._phash_generation = self._repo.generation
+            logger.info("Updated image %s: %s", image_id, fields)
+        return self._as_dict(updated)
+
+    def promote_stage(self, image_id: str) -> dict[str, Any] | None:
         """Promote the stage of the image with the given ID to the next stage.
         UPLOADED -> PROCESSED -> ARCHIVED (stays at ARCHIVED).
-        Returns the updated list of images.
+        Returns the updated image, or None when no image has that ID.
         """
-        try:
-            entries = self._repo.load_all()
-        except Exception:
-            entries = []
-        changed = False
-        for e in entries:
-            if e.get('id') == image_id:
-                current_stage: Stage = e.get('stage') or Stage.UPLOADED
-                e['stage'] = current_stage.next()
-                changed = True
-                break
-        if changed:
-            self._repo.save_all(entries)
-        # Ensure defaulting on return as well
-        for img in entries:
-            if 'stage' not in img or not img.get('stage'):
-                img['stage'] = Stage.UPLOADED.value
-        return entries
+        current = self._repo.get(image_id)
+        if current is None:
+            return None
+        # Stages loaded from JSON are plain strings; coerce before advancing
+        return self.update_image(image_id, stage=Stage(current.stage or Stage.UPLOADED).next())
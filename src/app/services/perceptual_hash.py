@@ -0,0 +1,141 @@
+import io
+import logging
+from collections.abc import Iterable
+from itertools import combinations
+
+try:
+    from PIL import Image
+except Exception:  # pragma: no cover
+    Image = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+
+
+def dhash(image_bytes: bytes, hash_size: int = 8) -> int | None:
+    """Difference hash: 64-bit fingerprint robust to scaling, compression and mild lighting changes.
+
+    Returns None when Pillow is missing or the bytes can't be decoded.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            # Let the JPEG decoder downscale while decoding; a no-op for other formats
+            img.draft('L', (hash_size * 8, hash_size * 8))
+            small = img.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+            pixels = small.tobytes()
+    except Exception as e:
+        logger.debug("dhash: could not decode image: %s", e)
+        return None
+    bits = 0
+    width = hash_size + 1
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def from_hex(value: str | None) -> int | None:
+    try:
+        return int(value, 16) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class PerceptualHashIndex:
+    """Multi-index hash table for Hamming-distance lookups over 64-bit hashes.
+
+    The hash is split into `bands` segments with one dict per segment. If two
+    hashes are within distance d, at least one segment differs by at most
+    d // bands bits (pigeonhole), so a query only probes those neighbouring
+    segment values and verifies the few candidates found. With 3 bands of
+    21-22 bits a million uniformly spread hashes leave about one entry per
+    bucket, so even a distance-8 query verifies only a few hundred candidates;
+    a BK-tree walk in pure Python visits far more nodes at these radii.
+    """
+
+    def __init__(self, bands: int = 3):
+        if not 1 <= bands <= HASH_BITS:
+            raise ValueError('bands must be between 1 and 64')
+        self._bands = bands
+        # (shift, width) per band; the first bands take the remainder bits
+        widths = [HASH_BITS // bands + (1 if i < HASH_BITS % bands else 0) for i in range(bands)]
+        shifts = [sum(widths[:i]) for i in range(bands)]
+        self._layout = list(zip(shifts, widths, strict=True))
+        # segment value -> position, or a list of positions once a bucket collides
+        # (at ~1 entry per bucket a list per key would dominate memory)
+        self._tables: list[dict[int, int | list[int]]] = [{} for _ in range(bands)]
+        self._hashes: list[int] = []
+        self._ids: list[str] = []
+        self._flip_masks: dict[tuple[int, int], list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, entry_id: str, value: int) -> None:
+        position = len(self._hashes)
+        self._hashes.append(value)
+        self._ids.append(entry_id)
+        for (shift, width), table in zip(self._layout, self._tables, strict=True):
+            key = (value >> shift) & ((1 << width) - 1)
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = position
+            elif isinstance(bucket, list):
+                bucket.append(position)
+            else:
+                table[key] = [bucket, position]
+
+    def add_all(self, items: Iterable[tuple[str, int]]) -> None:
+        for entry_id, value in items:
+            self.add(entry_id, value)
+
+    def query(self, value: int, max_distance: int) -> list[tuple[str, int]]:
+        """Return (entry_id, distance) pairs within `max_distance`, closest first."""
+        sub_radius = max_distance // self._bands
+        seen = set()
+        matches: list[tuple[str, int]] = []
+        for (shift, width), table in zip(self._layout, self._tables, strict=True):
+            key = (value >> shift) & ((1 << width) - 1)
+            for mask in self._masks(width, sub_radius):
+                bucket = table.get(key ^ mask)
+                if bucket is None:
+                    continue
+                for position in (bucket if isinstance(bucket, list) else (bucket,)):
+                    if position in seen:
+                        continue
+                    seen.add(position)
+                    distance = (self._hashes[position] ^ value).bit_count()
+                    if distance <= max_distance:
+                        matches.append((self._ids[position], distance))
+        matches.sort(key=lambda m: m[1])
+        return matches
+
+    def nearest(self, value: int, max_distance: int) -> tuple[str, int] | None:
+        matches = self.query(value, max_distance)
+        return matches[0] if matches else None
+
+    def _masks(self, width: int, radius: int) -> list[int]:
+        """All `width`-bit masks with at most `radius` bits set."""
+        masks = self._flip_masks.get((width, radius))
+        if masks is None:
+            masks = [0]
+            for r in range(1, radius + 1):
+                for bits in combinations(range(width), r):
+                    mask = 0
+                    for bit in bits:
+                        mask |= 1 << bit
+                    masks.append(mask)
+            self._flip_masks[(width, radius)] = masks
+        return masks
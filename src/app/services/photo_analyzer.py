@@ -1,15 +1,22 @@
-import os
+import importlib.util
 import logging
-from typing import Optional, Tuple
+import os
+import threading
+from typing import Any
 
-try:
-    from google import genai
-    from google.genai import types
-except Exception:  # pragma: no cover
-    genai = None  # type: ignore
+from app.observability.metrics import ANALYZER_LATENCY, ANALYZER_OUTCOMES
 
 logger = logging.getLogger(__name__)
 
+
+def _genai_installed() -> bool:
+    # Locating the package is cheap; importing google.genai takes most of a second
+    try:
+        return importlib.util.find_spec('google.genai') is not None
+    except (ImportError, ValueError):
+        return False
+
+
 class PackagePhotoAnalyzer:
     """Thin wrapper around Google Gemini for vision analysis.
 
@@ -20,28 +27,51 @@ class PackagePhotoAnalyzer:
     It uses environment variable GOOGLE_API_KEY. If not configured or the
     google-genai package is missing, it falls back to a no-op mode
     where it returns (None, None, None) meaning unknown.
+
+    google.genai is imported and the client built on first use (or by
+    warmup()), not at construction, to keep cold starts short.
     """
 
-    def __init__(self, model_name: str = os.environ.get('GEMINI_MODEL', 'gemini-2.5-flash')):
-        self.model_name = model_name
+    def __init__(self, model_name: str | None = None):
+        self.model_name = model_name or os.environ.get('GEMINI_MODEL', 'gemini-2.5-flash')
         self.api_key = os.environ.get('GOOGLE_API_KEY')
-        self._enabled = bool(self.api_key) and genai is not None
-        if self._enabled:
-            # Initialize google-genai client
-            logger.info("Initializing Google GenAI client with model=%s", self.model_name)
-            self._client = genai.Client(api_key=self.api_key)
-        else:
+        self._enabled = bool(self.api_key) and _genai_installed()
+        self._client: Any = None
+        self._types: Any = None
+        self._client_lock = threading.Lock()
+        if not self._enabled:
             logger.warning("PackagePhotoAnalyzer disabled: GOOGLE_API_KEY missing or google-genai not installed")
-            self._client = None
 
-    def analyze_image(self, image_bytes: bytes, mime_type: str) -> Tuple[Optional[bool], Optional[str], Optional[str], Optional[str]] | None:
+    def warmup(self) -> bool:
+        """Import google.genai and build the client ahead of the first upload; True when ready."""
+        return self._get_client() is not None
+
+    def _get_client(self) -> Any:
+        if self._client is not None or not self._enabled:
+            return self._client
+        with self._client_lock:
+            if self._client is None and self._enabled:
+                try:
+                    from google import genai
+                    from google.genai import types
+                    logger.info("Initializing Google GenAI client with model=%s", self.model_name)
+                    self._types = types
+                    self._client = genai.Client(api_key=self.api_key)
+                except Exception as e:
+                    logger.exception("PackagePhotoAnalyzer disabled: failed to initialize google-genai: %s", e)
+                    self._enabled = False
+        return self._client
+
+    def analyze_image(self, image_bytes: bytes, mime_type: str) -> tuple[bool | None, str | None, str | None, str | None] | None:
         """Return tuple: (is_valid_package, medicine_name, form, substance)
 
         - is_valid_package: True/False if the model can decide; None if unknown
         - medicine_name/form/substance: strings if detected; otherwise None
         """
-        if not self._enabled:
+        client = self._get_client()
+        if client is None:
             logger.debug("analyze_image skipped: analyzer disabled")
+            ANALYZER_OUTCOMES.labels('disabled').inc()
             return None
 
         prompt = (
@@ -59,13 +89,15 @@ class PackagePhotoAnalyzer:
         try:
             # Prepare image part for google-genai
             logger.debug("Calling GenAI generate_content with model=%s, mime=%s, size=%d", self.model_name, mime_type, len(image_bytes))
-            resp = self._client.models.generate_content(model=self.model_name, contents=[
-                prompt,
-                types.Part.from_bytes(data=image_bytes, mime_type=mime_type)])
+            with ANALYZER_LATENCY.time():
+                resp = client.models.generate_content(model=self.model_name, contents=[
+                    prompt,
+                    self._types.Part.from_bytes(data=image_bytes, mime_type=mime_type)])
             text = resp.text if hasattr(resp, 'text') else str(resp)
             logger.debug("GenAI raw response text length=%d", len(text) if text else 0)
         except Exception as e:
             logger.exception("Error in analyze_image: %s", e)
+            ANALYZER_OUTCOMES.labels('error').inc()
             return None, None, None, None
 
         # Attempt to parse JSON
@@ -89,8 +121,11 @@ class PackagePhotoAnalyzer:
                 s = str(v).strip()
                 return None if not s or s.lower() in {"n/a", "unknown", "none"} else s
 
-            return (bool(is_valid) if isinstance(is_valid, bool) else None,
+            valid = bool(is_valid) if isinstance(is_valid, bool) else None
+            ANALYZER_OUTCOMES.labels({True: 'valid', False: 'invalid', None: 'undecided'}[valid]).inc()
+            return (valid,
                     norm(medicine_name), norm(form), norm(substance))
         except Exception as e:
             logger.warning("Failed to parse GenAI JSON response: %s; text=%s", e, (text[:300] + '...') if text and len(text) > 300 else text)
+            ANALYZER_OUTCOMES.labels('parse_failure').inc()
             return None, None, None, None
@@ -0,0 +1,102 @@
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+
+from app.observability.metrics import RENDER_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+CacheKey = tuple[Hashable, ...]
+
+
+class RenderCache:
+    """Bounded LRU cache of rendered listing payloads (gallery HTML, API JSON).
+
+    Keys are expected to end with the metadata generation, so a write to the
+    catalogue makes every older key unreachable. Entries of past generations are
+    dropped eagerly the first time a newer generation is seen.
+
+    Bounded both by entry count and total payload bytes.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._items: OrderedDict[CacheKey, bytes] = OrderedDict()
+        self._bytes = 0
+        self._generation = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_or_render(self, kind: str, params: tuple[Hashable, ...], generation: int,
+                      render: Callable[[], bytes]) -> bytes:
+        """Return the cached payload for (kind, params) at `generation`, rendering it on a miss."""
+        payload = self.get(kind, params, generation)
+        if payload is None:
+            payload = render()
+            self.put(kind, params, generation, payload)
+        return payload
+
+    def get(self, kind: str, params: tuple[Hashable, ...], generation: int) -> bytes | None:
+        """Cached payload or None; for callers that stream the render themselves and put() it afterwards."""
+        key: CacheKey = (kind, *params, generation)
+        with self._lock:
+            self._drop_stale(generation)
+            payload = self._items.get(key)
+            if payload is not None:
+                self._items.move_to_end(key)
+                self._hits += 1
+                RENDER_CACHE_LOOKUPS.labels(kind, 'hit').inc()
+                return payload
+            self._misses += 1
+        RENDER_CACHE_LOOKUPS.labels(kind, 'miss').inc()
+        return None
+
+    def put(self, kind: str, params: tuple[Hashable, ...], generation: int, payload: bytes) -> None:
+        with self._lock:
+            # A newer generation may have been seen while rendering; don't store stale output
+            if self._generation == generation:
+                self._store((kind, *params, generation), payload)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'entries': len(self._items),
+                'bytes': self._bytes,
+                'hit_rate': (self._hits / lookups) if lookups else 0.0,
+            }
+
+    def _drop_stale(self, generation: int) -> None:
+        if self._generation is None or generation > self._generation:
+            if self._items:
+                logger.debug("RenderCache generation %s -> %s, dropping %d entries", self._generation, generation, len(self._items))
+            self._items.clear()
+            self._bytes = 0
+            self._generation = generation
+
+    def _store(self, key: CacheKey, payload: bytes) -> None:
+        size = len(payload)
+        if size > self._max_bytes:
+            # Larger than the whole budget; never worth caching
+            return
+        previous = self._items.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._items[key] = payload
+        self._bytes += size
+        while len(self._items) > self._max_entries or self._bytes > self._max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._evictions += 1
@@ -0,0 +1,243 @@
+"""Staging area for resumable (tus-style) uploads.
+
+Every upload is a pair of files in the staging directory: `<id>.part`
+holds the bytes received so far and `<id>.json` the declared length, the
+form fields and the committed offset. Chunks are appended straight to the
+part file, so nothing is buffered in memory or spooled per request, and
+all state lives on disk: any worker can continue an upload another one
+started, and a restart loses nothing. An exclusive flock on the part file
+keeps a retried chunk from racing the request it replaces.
+"""
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, BinaryIO
+
+try:
+    import fcntl
+except Exception:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+from app.config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+_UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadNotFound(LookupError):
+    pass
+
+
+class UploadConflict(ValueError):
+    """The chunk does not start at the committed offset, or another request is writing to the upload."""
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+@dataclass
+class UploadInfo:
+    id: str
+    length: int  # declared total size in bytes
+    filename: str
+    content_type: str
+    medicine_name: str
+    user: str | None
+    offset: int = 0  # bytes committed to the part file
+    created_at: float = 0.0
+    expires_at: float = 0.0
+    entry_id: str | None = None  # catalogue entry created on completion; the part file is gone by then
+
+    @property
+    def complete(self) -> bool:
+        return self.offset >= self.length
+
+
+class ResumableUploadStore:
+    """Creates, extends and expires staged uploads; see the module docstring for the layout."""
+    def __init__(self, staging_dir: str, max_size: int, ttl_s: float, clock: Callable[[], float] = time.time):
+        if fcntl is None:
+            raise RuntimeError('Resumable uploads require fcntl (POSIX)')
+        self._dir = staging_dir
+        self._max_size = max_size
+        self._ttl_s = ttl_s
+        self._clock = clock
+
+    @classmethod
+    def from_config(cls) -> "ResumableUploadStore":
+        return cls(AppConfig.RESUMABLE_STAGING_DIR, AppConfig.MAX_CONTENT_LENGTH, AppConfig.RESUMABLE_UPLOAD_TTL_S)
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    def create(self, length: int, filename: str, content_type: str, medicine_name: str,
+               user: str | None) -> UploadInfo:
+        if length > self._max_size:
+            raise UploadTooLarge(f"Upload exceeds the maximum size of {self._max_size} bytes")
+        os.makedirs(self._dir, exist_ok=True)
+        now = self._clock()
+        info = UploadInfo(id=uuid.uuid4().hex, length=length, filename=filename, content_type=content_type,
+                          medicine_name=medicine_name, user=user, created_at=now, expires_at=now + self._ttl_s)
+        open(self._part_path(info.id), 'wb').close()
+        self._save_info(info)
+        return info
+
+    def get(self, upload_id: str) -> UploadInfo:
+        if not _UPLOAD_ID_RE.match(upload_id):
+            raise UploadNotFound(upload_id)
+        try:
+            with open(self._info_path(upload_id), encoding='utf-8') as f:
+                info = UploadInfo(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            raise UploadNotFound(upload_id) from None
+        if info.expires_at <= self._clock():
+            raise UploadNotFound(upload_id)
+        return info
+
+    @contextmanager
+    def writer(self, upload_id: str, offset: int) -> Iterator[Callable[[bytes], None]]:
+        """Lock the upload and yield a function appending one chunk at `offset` onwards.
+
+        The committed offset is advanced when the block exits, also when the
+        client went away mid-chunk: whatever arrived is kept and the client
+        resumes from there, as tus expects. Raises UploadConflict on an offset
+        mismatch or when another request holds the upload, UploadTooLarge when
+        a chunk runs past the declared length.
+        """
+        info = self.get(upload_id)
+        if info.entry_id:
+            raise UploadConflict('Upload is already complete', info.offset)
+        with self._open_part(upload_id, 'r+b') as f:
+            self._lock(f, info)
+            # Re-read under the lock: the request holding it before may have moved the offset
+            info = self.get(upload_id)
+            if info.entry_id or offset != info.offset:
+                raise UploadConflict(f"Upload-Offset {offset} does not match the upload's offset {info.offset}",
+                                     info.offset)
+            # Bytes past the committed offset belong to a write that never committed
+            f.truncate(info.offset)
+            f.seek(info.offset)
+            written = info.offset
+
+            def write(chunk: bytes) -> None:
+                nonlocal written
+                if written + len(chunk) > info.length:
+                    raise UploadTooLarge('Chunk runs past the declared Upload-Length')
+                f.write(chunk)
+                written += len(chunk)
+
+            try:
+                yield write
+            finally:
+                f.flush()
+                info.offset = written
+                info.expires_at = self._clock() + self._ttl_s
+                self._save_info(info)
+
+    def complete(self, upload_id: str, handler: Callable[[BinaryIO], dict[str, Any]]) -> dict[str, Any]:
+        """Hand the assembled file of a fully received upload to `handler` exactly once.
+
+        `handler` gets the open part file and returns the catalogue entry it
+        created. The part file is then removed and the entry id kept in the
+        info until expiry, so a client whose final response was lost can still
+        find it. A ValueError from `handler` (the file was rejected) discards
+        the upload; any other error leaves it for a retry.
+        """
+        info = self.get(upload_id)
+        if info.entry_id:
+            raise UploadConflict('Upload is already complete', info.offset)
+        with self._open_part(upload_id, 'rb') as f:
+            self._lock(f, info)
+            info = self.get(upload_id)
+            if info.entry_id or not info.complete:
+                raise UploadConflict('Upload is already complete' if info.entry_id else 'Upload is not complete',
+                                     info.offset)
+            try:
+                entry = handler(f)
+            except ValueError:
+                self.delete(upload_id)
+                raise
+            info.entry_id = entry.get('id')
+            self._save_info(info)
+        os.remove(self._part_path(upload_id))
+        return entry
+
+    def delete(self, upload_id: str) -> None:
+        for path in (self._info_path(upload_id), self._part_path(upload_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def sweep(self) -> list[str]:
+        """Delete expired uploads and orphaned part files; returns the ids removed."""
+        try:
+            names = os.listdir(self._dir)
+        except FileNotFoundError:
+            return []
+        now = self._clock()
+        removed: list[str] = []
+        for name in names:
+            upload_id, ext = os.path.splitext(name)
+            if ext not in ('.json', '.part') or not _UPLOAD_ID_RE.match(upload_id):
+                continue
+            if ext == '.json':
+                try:
+                    self.get(upload_id)
+                    continue
+                except UploadNotFound:
+                    pass
+            elif os.path.exists(self._info_path(upload_id)) or self._age(name, now) < self._ttl_s:
+                # A part file is judged by its info; one without info (crash during create) by its age
+                continue
+            if upload_id not in removed:
+                self.delete(upload_id)
+                removed.append(upload_id)
+        if removed:
+            logger.info("Resumable uploads: removed %d expired upload(s)", len(removed))
+        return removed
+
+    def _open_part(self, upload_id: str, mode: str) -> BinaryIO:
+        try:
+            return open(self._part_path(upload_id), mode)
+        except FileNotFoundError:
+            # Completed or swept since its info was read
+            raise UploadNotFound(upload_id) from None
+
+    @staticmethod
+    def _lock(f: BinaryIO, info: UploadInfo) -> None:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadConflict('Another request is writing to this upload', info.offset) from None
+
+    def _age(self, name: str, now: float) -> float:
+        try:
+            return now - os.path.getmtime(os.path.join(self._dir, name))
+        except OSError:
+            return 0.0
+
+    def _save_info(self, info: UploadInfo) -> None:
+        path = self._info_path(info.id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(asdict(info), f)
+        os.replace(tmp, path)
+
+    def _info_path(self, upload_id: str) -> str:
+        return os.path.join(self._dir, f"{upload_id}.json")
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self._dir, f"{upload_id}.part")
@@ -0,0 +1,128 @@
+import bisect
+import itertools
+import re
+import unicodedata
+from array import array
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Searchable fields and how much a match in each counts
+FIELD_WEIGHTS: tuple[tuple[str, float], ...] = (('medicine_name', 3.0), ('substance', 2.0), ('form', 1.0))
+# A query term matching only the start of a token counts this much of a whole-token match
+PREFIX_FACTOR = 0.5
+
+
+def fold(text: str) -> str:
+    """Case- and accent-insensitive form: 'Ibuprofén' -> 'ibuprofen'."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def tokenize(text: str | None) -> list[str]:
+    return _TOKEN_RE.findall(fold(text)) if text else []
+
+
+class SearchIndex:
+    """Inverted index over medicine_name, substance and form with prefix matching.
+
+    Entries with the same (medicine_name, substance, form) values share a
+    group: tokens point at groups and each group lists its entry positions.
+    Catalogues repeat these values heavily, so a query scores a few thousand
+    groups rather than walking million-entry posting lists, and the matching
+    positions are gathered with C-level list operations.
+
+    Every query term must match (AND); a term matches whole tokens or, at
+    PREFIX_FACTOR of the weight, tokens it is a prefix of. Results are ranked
+    by score, newest entry (highest position) first among equal scores.
+    """
+
+    def __init__(self):
+        self._group_of_key: dict[tuple[str, str, str], int] = {}
+        self._group_positions: list[array] = []
+        # token -> {group: best field weight of the token in that group}
+        self._postings: dict[str, dict[int, float]] = {}
+        self._vocabulary: list[str] = []  # sorted tokens, for prefix lookups
+        self._group_at = array('I')  # position -> group, for update()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, position: int, medicine_name: str | None, substance: str | None, form: str | None) -> None:
+        key = (medicine_name or '', substance or '', form or '')
+        group = self._group_of_key.get(key)
+        if group is None:
+            group = len(self._group_positions)
+            self._group_of_key[key] = group
+            self._group_positions.append(array('I'))
+            for value, (_, weight) in zip(key, FIELD_WEIGHTS, strict=True):
+                for token in tokenize(value):
+                    posting = self._postings.get(token)
+                    if posting is None:
+                        self._postings[token] = {group: weight}
+                        bisect.insort(self._vocabulary, token)
+                    elif weight > posting.get(group, 0.0):
+                        posting[group] = weight
+        self._group_positions[group].append(position)
+        if position < len(self._group_at):
+            self._group_at[position] = group
+        else:
+            self._group_at.extend(itertools.repeat(0, position - len(self._group_at)))
+            self._group_at.append(group)
+        self._size += 1
+
+    def update(self, position: int, medicine_name: str | None, substance: str | None,
+               form: str | None) -> None:
+        """Re-index an added position whose values changed; costs the size of its old group."""
+        group = self._group_at[position]
+        if self._group_of_key.get((medicine_name or '', substance or '', form or '')) == group:
+            return
+        self._group_positions[group].remove(position)
+        self._size -= 1
+        self.add(position, medicine_name, substance, form)
+
+    def search(self, query: str | None) -> list[int]:
+        """Positions of matching entries, best first; empty for a blank query."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        scores: dict[int, float] | None = None
+        for term_scores in sorted((self._term_scores(term) for term in dict.fromkeys(terms)), key=len):
+            if scores is None:
+                scores = term_scores
+            else:
+                # Terms are visited smallest first, so this walks the shorter side
+                scores = {group: score + term_scores[group] for group, score in scores.items() if group in term_scores}
+            if not scores:
+                return []
+
+        positions: list[int] = []
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        for _, same_score in itertools.groupby(ranked, key=lambda item: item[1]):
+            bucket: list[int] = []
+            for group, _ in same_score:
+                bucket.extend(self._group_positions[group])
+            bucket.sort(reverse=True)
+            positions.extend(bucket)
+        return positions
+
+    def _term_scores(self, term: str) -> dict[int, float]:
+        """Group -> weight for one query term; callers must not modify the result."""
+        start = bisect.bisect_left(self._vocabulary, term)
+        exact = self._postings.get(term)
+        scores: dict[int, float] = {}
+        for token in itertools.islice(self._vocabulary, start, None):
+            if not token.startswith(term):
+                break
+            if token == term:
+                continue
+            for group, weight in self._postings[token].items():
+                weight *= PREFIX_FACTOR
+                if weight > scores.get(group, 0.0):
+                    scores[group] = weight
+        if not scores:
+            # A whole-token match with nothing longer: the posting itself, no copy
+            return exact or {}
+        if exact:
+            scores.update((group, weight) for group, weight in exact.items() if weight > scores.get(group, 0.0))
+        return scores
@@ -0,0 +1,56 @@
+import logging
+import time
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def _analyzer() -> None:
+    from app.routes.api import get_analyzer
+    get_analyzer().warmup()
+
+
+def _oauth() -> None:
+    from app.services.auth import get_oauth
+    get_oauth()
+
+
+def _catalogue() -> None:
+    from app.routes.api import get_fs, get_repo
+    repo = get_repo(get_fs())
+    # Compact snapshot for listings and the aggregates behind /api/stats
+    repo.entries()
+    repo.stats()
+
+
+def _imaging() -> None:
+    from app.services import perceptual_hash  # noqa: F401  (Pillow for the first upload's dhash)
+
+
+# Deferred work the first requests would otherwise pay for, most expensive first
+WARMUP_STEPS: list[tuple[str, Callable[[], None]]] = [
+    ('analyzer', _analyzer),
+    ('oauth', _oauth),
+    ('catalogue', _catalogue),
+    ('imaging', _imaging),
+]
+
+
+def warm_up() -> dict[str, float]:
+    """Run the deferred initialisation steps; returns milliseconds per step.
+
+    Meant for a background thread once the server is accepting connections.
+    A failing step is logged and skipped; whatever it would have set up then
+    happens lazily on first use instead.
+    """
+    timings: dict[str, float] = {}
+    for name, step in WARMUP_STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning("Warmup step %s failed: %s", name, e)
+            continue
+        timings[name] = (time.perf_counter() - start) * 1000
+    logger.info("Warmup done: %s", " ".join(f"{name}={ms:.1f}ms" for name, ms in timings.items()))
+    return timings
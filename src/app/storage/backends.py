@@ -0,0 +1,59 @@
+from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+from app.config import AppConfig
+
+
+class StorageBackend(ABC):
+    """Remote home of uploaded files (object storage).
+
+    Keys are paths relative to the upload root using '/' separators, i.e. the
+    `stored_name` of an entry. Without a backend FileSystem works on the local
+    upload directory directly.
+    """
+
+    @abstractmethod
+    def save(self, key: str, stream: BinaryIO, content_type: str | None = None) -> None:
+        """Stream `stream` to `key` without loading it fully into memory."""
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Readable stream of the stored bytes."""
+
+    @abstractmethod
+    def copy(self, src_key: str, dst_key: str) -> None:
+        """Server-side copy; the source stays in place."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def presigned_url(self, key: str) -> str:
+        """Time-limited URL clients can fetch the file from directly."""
+
+
+def storage_backend_from_config() -> StorageBackend | None:
+    """Build the configured backend; None means local files under AppConfig.UPLOAD_DIR."""
+    if AppConfig.STORAGE_BACKEND == 's3':
+        from app.storage.s3 import S3StorageBackend
+        return S3StorageBackend(
+            bucket=AppConfig.S3_BUCKET,
+            prefix=AppConfig.S3_PREFIX,
+            endpoint_url=AppConfig.S3_ENDPOINT_URL,
+            region_name=AppConfig.S3_REGION,
+            presign_expires=AppConfig.S3_PRESIGN_EXPIRES,
+            max_pool_connections=AppConfig.S3_MAX_POOL_CONNECTIONS,
+            multipart_chunksize=AppConfig.S3_MULTIPART_CHUNK_BYTES,
+        )
+    if AppConfig.STORAGE_BACKEND not in ('', 'local'):
+        raise ValueError(f"Unknown STORAGE_BACKEND '{AppConfig.STORAGE_BACKEND}'")
+    return None
@@ -1,10 +1,30 @@
 import json
 import os
+import shutil
+from typing import BinaryIO
+
 from werkzeug.datastructures import FileStorage
 
+from app.config import AppConfig
+from app.observability.metrics import FILE_WRITE_LATENCY
+from app.storage.backends import StorageBackend
+
 
 class FileSystem:
-    """Abstraction over file system operations (SRP)."""
+    """Abstraction over file system operations (SRP).
+
+    Uploaded files go to the local upload directory, or to `backend` when one is
+    configured; paths are then mapped to backend keys relative to `root`.
+    Metadata always stays on local disk.
+    """
+    def __init__(self, backend: StorageBackend | None = None, root: str | None = None):
+        self._backend = backend
+        self._root = root
+
+    @property
+    def backend(self) -> StorageBackend | None:
+        return self._backend
+
     def ensure_storage(self, upload_dir: str, metadata_file: str) -> None:
         os.makedirs(upload_dir, exist_ok=True)
         if not os.path.exists(metadata_file):
@@ -12,7 +32,59 @@ class FileSystem:
                 json.dump([], f)
 
     def save_file(self, file: FileStorage, path: str) -> None:
-        file.save(path)
+        with FILE_WRITE_LATENCY.time():
+            if self._backend is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                file.save(path)
+            else:
+                self._backend.save(self.key_for(path), file.stream, file.mimetype)
 
     def file_size(self, path: str) -> int:
-        return os.path.getsize(path)
+        if self._backend is None:
+            return os.path.getsize(path)
+        return self._backend.size(self.key_for(path))
+
+    def read_file(self, path: str) -> bytes:
+        if self._backend is None:
+            with open(path, 'rb') as f:
+                return f.read()
+        with self._backend.open(self.key_for(path)) as stream:
+            return stream.read()
+
+    def open_file(self, path: str) -> BinaryIO:
+        """Readable stream of a stored file, for copying without loading it whole."""
+        if self._backend is None:
+            return open(path, 'rb')
+        return self._backend.open(self.key_for(path))
+
+    def file_exists(self, path: str) -> bool:
+        if self._backend is None:
+            return os.path.exists(path)
+        return self._backend.exists(self.key_for(path))
+
+    def copy_file(self, src: str, dst: str) -> None:
+        """Copy src to dst, leaving src in place (hard link when possible)."""
+        if self._backend is not None:
+            self._backend.copy(self.key_for(src), self.key_for(dst))
+            return
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if os.path.exists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    def delete_file(self, path: str) -> None:
+        if self._backend is not None:
+            self._backend.delete(self.key_for(path))
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def key_for(self, path: str) -> str:
+        """Backend key of a path under the upload root (the entry's stored_name)."""
+        root = self._root or AppConfig.UPLOAD_DIR
+        return os.path.relpath(path, root).replace(os.sep, '/')
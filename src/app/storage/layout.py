@@ -0,0 +1,32 @@
+import hashlib
+import posixpath
+
+from app.config import AppConfig
+
+# Two levels of two hex digits: 65,536 leaf directories, so a million uploads
+# leave ~15 files per directory.
+SHARD_DEPTH = 2
+SHARD_WIDTH = 2
+
+
+def sharded_name(file_name: str) -> str:
+    """'<uuid>.png' -> 'ab/cd/<uuid>.png'.
+
+    The shard comes from a hash of the bare file name, so it is spread evenly
+    whatever the name looks like and can be recomputed for existing flat files.
+    """
+    base = posixpath.basename(file_name)
+    digest = hashlib.sha1(base.encode('utf-8')).hexdigest()
+    parts = [digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_DEPTH)]
+    return posixpath.join(*parts, base)
+
+
+def is_sharded(stored_name: str) -> bool:
+    return '/' in stored_name
+
+
+def stored_name_for(file_name: str) -> str:
+    """Stored name of a new upload under the configured UPLOAD_LAYOUT."""
+    if AppConfig.UPLOAD_LAYOUT == 'sharded':
+        return sharded_name(file_name)
+    return file_name
@@ -0,0 +1,119 @@
+"""Move flat uploads into the sharded layout while the app keeps serving.
+
+    python -m app.storage.migrate_layout --batch-size 500 --pause 0.2
+
+Per batch: files are copied (hard-linked locally) to ab/cd/<name>, the
+batch's metadata entries are rewritten in one save, and only then are the
+old files removed, so every URL a reader can see points at an existing
+file. Progress lives in the metadata itself: sharded entries are skipped,
+which makes the command safe to interrupt and re-run at any point.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from app.config import AppConfig
+from app.repository.image_repository import ImageMetadataRepository
+from app.storage.backends import storage_backend_from_config
+from app.storage.filesystem import FileSystem
+from app.storage.layout import is_sharded, sharded_name
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MigrationStats:
+    migrated: int = 0
+    missing: int = 0  # entries whose file is gone; left untouched
+    cleaned: int = 0  # stale flat copies removed after an interrupted run
+    batches: int = 0
+
+
+def _rewrite_url(url: str | None, old: str, new: str) -> str:
+    if url and url.endswith(old):
+        return url[:-len(old)] + new
+    return f"/uploads/{new}"
+
+
+def migrate_to_sharded(repo: ImageMetadataRepository, fs: FileSystem, upload_dir: str, batch_size: int = 500,
+                       pause_s: float = 0.0, limit: int | None = None, dry_run: bool = False,
+                       cleanup: bool = True) -> MigrationStats:
+    stats = MigrationStats()
+    total = 0
+    pending: list[dict[str, Any]] = []
+    # One streamed pass; only the entries still to move are kept in memory
+    for entry in repo.iter_all():
+        total += 1
+        stored = entry.get('stored_name') or ''
+        if not stored:
+            continue
+        if not is_sharded(stored):
+            pending.append(entry)
+        elif cleanup:
+            # A run interrupted between the metadata save and the deletes leaves the
+            # old flat file behind next to an already sharded entry.
+            stale = os.path.join(upload_dir, os.path.basename(stored))
+            if fs.file_exists(stale) and fs.file_exists(os.path.join(upload_dir, stored)):
+                if not dry_run:
+                    fs.delete_file(stale)
+                stats.cleaned += 1
+
+    if limit is not None:
+        pending = pending[:limit]
+    logger.info("Layout migration: %d of %d entries to move (batch size %d)", len(pending), total, batch_size)
+
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        patches: dict[str, dict[str, Any]] = {}
+        moved: list[str] = []
+        for entry in batch:
+            old = entry['stored_name']
+            new = sharded_name(old)
+            src = os.path.join(upload_dir, old)
+            if not fs.file_exists(src):
+                logger.warning("Layout migration: file for entry %s is missing: %s", entry.get('id'), old)
+                stats.missing += 1
+                continue
+            if not dry_run:
+                fs.copy_file(src, os.path.join(upload_dir, new))
+            patches[entry['id']] = {'stored_name': new, 'url': _rewrite_url(entry.get('url'), old, new)}
+            moved.append(src)
+
+        if not dry_run:
+            # Re-reads the metadata, so uploads made meanwhile are kept
+            repo.update_many(patches)
+            for src in moved:
+                fs.delete_file(src)
+        stats.migrated += len(patches)
+        stats.batches += 1
+        logger.info("Layout migration: batch %d done, %d/%d moved", stats.batches, stats.migrated, len(pending))
+        if pause_s and start + batch_size < len(pending):
+            time.sleep(pause_s)
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.storage.migrate_layout', description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=500, help='entries per metadata rewrite')
+    parser.add_argument('--pause', type=float, default=0.0, help='seconds to sleep between batches')
+    parser.add_argument('--limit', type=int, default=None, help='move at most this many entries')
+    parser.add_argument('--skip-cleanup', action='store_true',
+                        help='do not look for flat leftovers of sharded entries (one existence check each)')
+    parser.add_argument('--dry-run', action='store_true', help='only report what would be moved')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(name)s | %(message)s')
+    fs = FileSystem(backend=storage_backend_from_config())
+    repo = ImageMetadataRepository(AppConfig.METADATA_FILE, fs)
+    stats = migrate_to_sharded(repo, fs, AppConfig.UPLOAD_DIR, batch_size=args.batch_size, pause_s=args.pause,
+                               limit=args.limit, dry_run=args.dry_run, cleanup=not args.skip_cleanup)
+    print(f"migrated={stats.migrated} missing={stats.missing} cleaned={stats.cleaned} batches={stats.batches}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
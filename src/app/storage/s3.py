@@ -0,0 +1,80 @@
+import logging
+from typing import BinaryIO
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+except Exception:  # pragma: no cover
+    boto3 = None  # type: ignore
+
+from app.storage.backends import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+
+class S3StorageBackend(StorageBackend):
+    """S3-compatible object storage (AWS S3, GCS interoperability, MinIO, ...).
+
+    - Writes use boto3's managed transfer: streams larger than
+      `multipart_chunksize` go up as a multipart upload, part by part, so an
+      upload is never held in memory as a whole.
+    - One client with a bounded connection pool is shared by all requests
+      (boto3 clients are thread-safe).
+    - Reads are served by redirecting clients to presigned URLs.
+    """
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: str | None = None,
+                 region_name: str | None = None, presign_expires: int = 300,
+                 max_pool_connections: int = 32, multipart_chunksize: int = 8 * 1024 * 1024, client=None):
+        if boto3 is None and client is None:
+            raise RuntimeError('boto3 is required for the S3 storage backend (pip install boto3)')
+        if not bucket:
+            raise ValueError('S3 bucket name is required')
+        self._bucket = bucket
+        self._prefix = prefix.strip('/')
+        self._presign_expires = presign_expires
+        self._client = client or boto3.client(
+            's3', endpoint_url=endpoint_url or None, region_name=region_name or None,
+            config=Config(max_pool_connections=max_pool_connections, retries={'mode': 'standard'}))
+        self._transfer_config = TransferConfig(multipart_threshold=multipart_chunksize,
+                                               multipart_chunksize=multipart_chunksize,
+                                               max_concurrency=4)
+        logger.info("S3 storage backend bucket=%s prefix=%s endpoint=%s", bucket, self._prefix, endpoint_url)
+
+    def _object_key(self, key: str) -> str:
+        key = key.lstrip('/')
+        return f"{self._prefix}/{key}" if self._prefix else key
+
+    def save(self, key: str, stream: BinaryIO, content_type: str | None = None) -> None:
+        extra = {'ContentType': content_type} if content_type else None
+        self._client.upload_fileobj(stream, self._bucket, self._object_key(key), ExtraArgs=extra,
+                                    Config=self._transfer_config)
+
+    def size(self, key: str) -> int:
+        return int(self._client.head_object(Bucket=self._bucket, Key=self._object_key(key))['ContentLength'])
+
+    def open(self, key: str) -> BinaryIO:
+        return self._client.get_object(Bucket=self._bucket, Key=self._object_key(key))['Body']
+
+    def copy(self, src_key: str, dst_key: str) -> None:
+        self._client.copy({'Bucket': self._bucket, 'Key': self._object_key(src_key)}, self._bucket,
+                          self._object_key(dst_key), Config=self._transfer_config)
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self._bucket, Key=self._object_key(key))
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self._bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def presigned_url(self, key: str) -> str:
+        return self._client.generate_presigned_url(
+            'get_object', Params={'Bucket': self._bucket, 'Key': self._object_key(key)},
+            ExpiresIn=self._presign_expires)
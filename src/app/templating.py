@@ -0,0 +1,82 @@
+import logging
+import os
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from jinja2 import FileSystemBytecodeCache
+from starlette.templating import Jinja2Templates
+
+from app.config import AppConfig
+from app.observability.metrics import TEMPLATE_RENDER_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# Characters of rendered HTML per streamed chunk: small enough that the first
+# cards leave right away, large enough that chunks aren't one per template node
+STREAM_CHUNK_CHARS = 16 * 1024
+
+
+def build_templates(directory: str, bytecode_cache_dir: str | None = None) -> Jinja2Templates:
+    """Jinja2Templates with a bytecode cache and every template compiled up front.
+
+    The bytecode cache lets later workers and restarts load compiled
+    templates instead of parsing them again; `bytecode_cache_dir` defaults to
+    AppConfig.TEMPLATE_BYTECODE_CACHE_DIR, where '' picks Jinja's per-user
+    temp directory and 'off' disables it.
+    """
+    templates = Jinja2Templates(directory=directory)
+    cache_dir = AppConfig.TEMPLATE_BYTECODE_CACHE_DIR if bytecode_cache_dir is None else bytecode_cache_dir
+    if cache_dir != 'off':
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        templates.env.bytecode_cache = FileSystemBytecodeCache(cache_dir or None)
+    precompile(templates)
+    return templates
+
+
+def precompile(templates: Jinja2Templates) -> list[str]:
+    """Load every template into the environment's cache, so no request pays for compiling one."""
+    start = time.perf_counter()
+    names = templates.env.list_templates()
+    for name in names:
+        templates.get_template(name)
+    logger.info("Compiled %d templates in %.1fms", len(names), (time.perf_counter() - start) * 1000)
+    return names
+
+
+def stream_template(templates: Jinja2Templates, name: str, context: dict[str, Any],
+                    on_complete: Callable[[bytes], None] | None = None,
+                    chunk_chars: int = STREAM_CHUNK_CHARS) -> Iterator[bytes]:
+    """Render `name` with template.generate(), yielding UTF-8 chunks of about `chunk_chars`.
+
+    The response starts with the first chunk instead of after the whole page,
+    and the full document is never held as one string. `on_complete` receives
+    the whole body once the last chunk is out (e.g. to fill a cache); it is not
+    called when the client disconnects midway. Render time excludes the time
+    spent waiting for the client to take each chunk.
+    """
+    pieces = templates.get_template(name).generate(context)
+    body: list[bytes] = []
+    rendering = 0.0
+    while True:
+        start = time.perf_counter()
+        batch: list[str] = []
+        size = 0
+        for piece in pieces:
+            batch.append(piece)
+            size += len(piece)
+            if size >= chunk_chars:
+                break
+        chunk = ''.join(batch).encode('utf-8')
+        rendering += time.perf_counter() - start
+        if not batch:
+            break
+        if not chunk:
+            continue
+        if on_complete is not None:
+            body.append(chunk)
+        yield chunk
+    TEMPLATE_RENDER_LATENCY.labels(name).observe(rendering)
+    if on_complete is not None:
+        on_complete(b''.join(body))
@@ -0,0 +1 @@
+"""Offline micro-benchmarks; run with `python -m benchmarks --help` from src/."""
@@ -0,0 +1,65 @@
+import argparse
+import importlib
+import logging
+import sys
+import tempfile
+
+from app.config import AppConfig
+from benchmarks.harness import SUITES, compare, format_table, save_results
+
+# Modules defining suites; imported for their @benchmark_suite registrations
+SUITE_MODULES = [
+    'benchmarks.bench_repository',
+    'benchmarks.bench_phash',
+    'benchmarks.bench_logging',
+    'benchmarks.bench_json',
+    'benchmarks.bench_entries',
+    'benchmarks.bench_search',
+    'benchmarks.bench_templates',
+]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Run offline micro-benchmarks.')
+    parser.add_argument('--suite', action='append', help='suite to run (repeatable); default: all')
+    parser.add_argument('--sizes', default='1000,10000',
+                        help='comma separated catalogue sizes, e.g. 1000,10000,100000,1000000')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write results as the new baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare with a baseline; exit 1 on regressions')
+    parser.add_argument('--time-tolerance', type=float, default=0.5, help='allowed slowdown ratio (default 0.5)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help='allowed peak memory growth ratio (default 0.25)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    for module in SUITE_MODULES:
+        importlib.import_module(module)
+    suites = args.suite or list(SUITES)
+    unknown = [s for s in suites if s not in SUITES]
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(unknown)}; available: {', '.join(SUITES)}")
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    measurements = []
+    with tempfile.TemporaryDirectory(prefix='medicine-bench-') as workdir:
+        # Keep every file the app touches inside the scratch directory
+        AppConfig.UPLOAD_DIR = workdir
+        for suite in suites:
+            for size in sizes:
+                measurements.extend(SUITES[suite](size, workdir))
+
+    print(format_table(measurements))
+    if args.save_baseline:
+        save_results(args.save_baseline, measurements)
+        print(f"\nBaseline written to {args.save_baseline}")
+    if args.compare:
+        regressions = compare(measurements, args.compare, args.time_tolerance, args.memory_tolerance)
+        if regressions:
+            print("\nRegressions:")
+            print("\n".join(f"  {r}" for r in regressions))
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
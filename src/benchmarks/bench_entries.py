@@ -0,0 +1,41 @@
+
+from app.json_codec import codec_by_name
+from app.models.compact_entry import CompactEntry
+from benchmarks import catalogue
+from benchmarks.harness import Measurement, benchmark_suite, measure, measure_retained
+
+
+@benchmark_suite('entries')
+def run(size: int, workdir: str) -> list[Measurement]:
+    """Resident memory of the catalogue as dicts (one per entry, as parsed) vs CompactEntry objects.
+
+    'resident' reports the bytes retained by the loaded catalogue in the
+    peak memory column; 'filter' is a medicine + stage scan over it.
+    """
+    codec = codec_by_name('stdlib')
+    document = codec.dumps(catalogue.generate(size), indent=True)
+    measurements: list[Measurement] = []
+
+    def as_dicts():
+        return codec.loads(document)
+
+    def as_compact():
+        return [CompactEntry.from_dict(e) for e in codec.loads(document)]
+
+    seconds, retained = measure_retained(as_dicts)
+    measurements.append(Measurement('entries', 'dict', 'resident', size, seconds, retained))
+    seconds, retained = measure_retained(as_compact)
+    measurements.append(Measurement('entries', 'compact', 'resident', size, seconds, retained))
+
+    dicts, compact = as_dicts(), as_compact()
+
+    def filter_dicts() -> None:
+        [e for e in dicts if 'aspi' in str(e.get('medicine_name', '')).lower() and e.get('stage') == 'PROCESSED']
+
+    def filter_compact() -> None:
+        [e for e in compact if 'aspi' in str(e.medicine_name or '').lower() and e.stage == 'PROCESSED']
+
+    for backend, fn in (('dict', filter_dicts), ('compact', filter_compact)):
+        seconds, peak = measure(fn)
+        measurements.append(Measurement('entries', backend, 'filter', size, seconds, peak))
+    return measurements
@@ -0,0 +1,40 @@
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.json_codec import available_codecs, codec_by_name
+from app.models.image_entry import ImageEntry
+from benchmarks import catalogue
+from benchmarks.harness import Measurement, benchmark_suite, measure
+
+
+@benchmark_suite('json')
+def run(size: int, workdir: str) -> list[Measurement]:
+    """Listing response and metadata.json encode/decode per codec.
+
+    'fastapi' is the default FastAPI path for a handler returning the list:
+    response model validation plus jsonable_encoder plus stdlib json.
+    """
+    entries = catalogue.generate(size)
+    measurements: list[Measurement] = []
+
+    adapter = TypeAdapter(list[ImageEntry])
+    stdlib = codec_by_name('stdlib')
+
+    def fastapi_path() -> None:
+        stdlib.dumps(jsonable_encoder(adapter.validate_python(entries)))
+    seconds, peak = measure(fastapi_path, repeat=3)
+    measurements.append(Measurement('json', 'fastapi', 'encode_response', size, seconds, peak))
+
+    for name in available_codecs():
+        codec = codec_by_name(name)
+        document = codec.dumps(entries, indent=True)
+        operations = {
+            'encode_response': lambda codec=codec: codec.dumps(entries),
+            'encode_file': lambda codec=codec: codec.dumps(entries, indent=True),
+            'decode_file': lambda codec=codec, document=document: codec.loads(document),
+        }
+        for operation, fn in operations.items():
+            seconds, peak = measure(fn, repeat=3)
+            measurements.append(Measurement('json', name, operation, size, seconds, peak))
+    return measurements
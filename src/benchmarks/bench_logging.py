@@ -0,0 +1,63 @@
+import logging
+import os
+import time
+
+from app.logging_config import build_handler
+from benchmarks.harness import Measurement, benchmark_suite, measure
+
+# handler mode, format name, JSON lines, sampling spec
+VARIANTS = [
+    ('sync', 'text', False, ''),
+    ('sync', 'json', True, ''),
+    ('queue', 'text', False, ''),
+    ('queue', 'json', True, ''),
+    ('queue', 'json_sampled_10pct', True, 'bench=0.1'),
+]
+
+
+class BlockingSink:
+    """File sink whose writes stall like stdout piped into a busy log collector."""
+    def __init__(self, f, write_latency_s: float = 0.00005):
+        self._f = f
+        self._latency = write_latency_s
+
+    def write(self, data: str) -> int:
+        time.sleep(self._latency)
+        return self._f.write(data)
+
+    def flush(self) -> None:
+        self._f.flush()
+
+
+@benchmark_suite('logging')
+def run(size: int, workdir: str) -> list[Measurement]:
+    """Time spent in the logging calls for `size` INFO records, i.e. what the request thread pays.
+
+    Queue mode is timed until the records are enqueued; the listener drains
+    them afterwards, outside the measurement.
+    """
+    measurements = []
+    for sink_name in ('file', 'blocking'):
+        for mode, fmt, json_lines, sampling in VARIANTS:
+            path = os.path.join(workdir, f"log-{sink_name}-{mode}-{fmt}.log")
+            with open(path, 'w', encoding='utf-8') as f:
+                sink = f if sink_name == 'file' else BlockingSink(f)
+                handler, listener = build_handler(sink, mode=mode, json_lines=json_lines, sampling=sampling)
+                logger = logging.getLogger(f"bench.{sink_name}.{mode}.{fmt}")
+                logger.propagate = False
+                logger.setLevel(logging.INFO)
+                logger.addHandler(handler)
+                if listener is not None:
+                    listener.start()
+                try:
+                    def emit(logger: logging.Logger = logger) -> None:
+                        for i in range(size):
+                            logger.info("Saved file to %s (size=%s, content_type=%s)", f"/uploads/ab/cd/{i}.png",
+                                        1234, 'image/png', extra={'duration_ms': 12.5})
+                    seconds, peak = measure(emit, repeat=3)
+                finally:
+                    if listener is not None:
+                        listener.stop()
+                    logger.removeHandler(handler)
+            measurements.append(Measurement('logging', mode, f"{fmt}_{sink_name}", size, seconds, peak))
+    return measurements
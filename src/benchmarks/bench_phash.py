@@ -0,0 +1,30 @@
+import random
+
+from app.services.perceptual_hash import PerceptualHashIndex
+from benchmarks.harness import Measurement, benchmark_suite, measure
+
+
+@benchmark_suite('phash')
+def run(size: int, workdir: str) -> list[Measurement]:
+    rnd = random.Random(11)
+    index = PerceptualHashIndex()
+    index.add_all((str(i), rnd.getrandbits(64)) for i in range(size))
+    probes = [rnd.getrandbits(64) for _ in range(100)]
+    # half of the probes have a planted neighbour within distance 3
+    for i, probe in enumerate(probes[:50]):
+        index.add(f"near-{i}", probe ^ 0b10101)
+
+    measurements = []
+    for max_distance in (4, 8):
+        def lookups(max_distance=max_distance) -> None:
+            for probe in probes:
+                index.query(probe, max_distance)
+        seconds, peak = measure(lookups)
+        # report per-lookup time
+        measurements.append(Measurement('phash', 'multi_index', f"query_d{max_distance}", size, seconds / len(probes), peak))
+
+    def build() -> None:
+        PerceptualHashIndex().add_all((str(i), rnd.getrandbits(64)) for i in range(size))
+    seconds, peak = measure(build, repeat=1)
+    measurements.append(Measurement('phash', 'multi_index', 'build', size, seconds, peak))
+    return measurements
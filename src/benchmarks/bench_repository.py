@@ -0,0 +1,67 @@
+import os
+import uuid
+from collections.abc import Callable
+
+from app.config import AppConfig
+from app.json_codec import available_codecs, codec_by_name
+from app.repository.image_repository import ImageMetadataRepository
+from app.services.image_service import ImageService
+from app.storage.filesystem import FileSystem
+from app.validation.image_validator import ImageValidator
+from benchmarks import catalogue
+from benchmarks.harness import Measurement, benchmark_suite, measure
+
+# backend name -> factory(metadata_file) building a repository over an existing metadata file
+REPOSITORY_BACKENDS: dict[str, Callable[[str], ImageMetadataRepository]] = {
+    'json': lambda metadata_file: ImageMetadataRepository(metadata_file, FileSystem()),
+}
+# Same file format through the fast codecs, when installed
+for _name in available_codecs():
+    if _name != 'stdlib':
+        REPOSITORY_BACKENDS[f"json-{_name}"] = lambda metadata_file, _name=_name: ImageMetadataRepository(
+            metadata_file, FileSystem(), codec=codec_by_name(_name))
+
+
+class OfflineAnalyzer:
+    """Analyzer stand-in that never leaves the process."""
+    def analyze_image(self, image_bytes: bytes, mime_type: str):
+        return None
+
+
+def _service(repo: ImageMetadataRepository, workdir: str) -> ImageService:
+    return ImageService(upload_dir=workdir, repo=repo, fs=FileSystem(),
+                        validator=ImageValidator(AppConfig.ALLOWED_EXTENSIONS), analyzer=OfflineAnalyzer())
+
+
+@benchmark_suite('repository')
+def run(size: int, workdir: str) -> list[Measurement]:
+    measurements: list[Measurement] = []
+    for backend, factory in REPOSITORY_BACKENDS.items():
+        metadata_file = os.path.join(workdir, f"metadata-{backend}-{size}.json")
+        entries = catalogue.write_metadata(metadata_file, size)
+        repo = factory(metadata_file)
+        service = _service(repo, workdir)
+        template = dict(entries[0])
+        target_id = entries[len(entries) // 2]['id']
+
+        # The loop's objects are bound as defaults, so each operation measures this backend and size
+        def append(repo=repo, template=template) -> None:
+            entry = dict(template)
+            entry['id'] = uuid.uuid4().hex
+            repo.append(entry)
+
+        operations = {
+            'load_all': repo.load_all,
+            # Same pass streamed: peak memory should stay flat as the catalogue grows
+            'iter_all': lambda repo=repo: sum(1 for _ in repo.iter_all()),
+            'append': append,
+            'filter_images': lambda service=service: service.filter_images('aspi', 'PROCESSED'),
+            'determine_version': lambda service=service: service.determine_version('Aspirin'),
+            'promote_stage': lambda service=service, target_id=target_id: service.promote_stage(target_id),
+            # Lookup through the id index the promote above built; flat across sizes
+            'get': lambda repo=repo, target_id=target_id: repo.get(target_id),
+        }
+        for name, fn in operations.items():
+            seconds, peak = measure(fn)
+            measurements.append(Measurement('repository', backend, name, size, seconds, peak))
+    return measurements
@@ -0,0 +1,41 @@
+
+from app.services.search_index import SearchIndex
+from benchmarks import catalogue
+from benchmarks.harness import Measurement, benchmark_suite, measure
+
+# One-word, prefix, two-field and accented/mixed-case queries
+QUERIES = ('aspirin', 'para', 'ibuprofen tablet', 'AMOXICILLIN sýrup', 'forte 2')
+
+
+@benchmark_suite('search')
+def run(size: int, workdir: str) -> list[Measurement]:
+    """Inverted index build, per-query latency and a linear substring scan for comparison."""
+    entries = [(e['medicine_name'], e.get('substance'), e.get('form')) for e in catalogue.iter_entries(size)]
+
+    def build() -> SearchIndex:
+        index = SearchIndex()
+        for position, (medicine, substance, form) in enumerate(entries):
+            index.add(position, medicine, substance, form)
+        return index
+
+    measurements = []
+    seconds, peak = measure(build, repeat=1)
+    measurements.append(Measurement('search', 'inverted', 'build', size, seconds, peak))
+
+    index = build()
+
+    def queries() -> None:
+        for query in QUERIES:
+            index.search(query)
+
+    def scan() -> None:
+        for query in QUERIES:
+            terms = query.lower().split()
+            [i for i, fields in enumerate(entries)
+             if all(any(term in (value or '').lower() for value in fields) for term in terms)]
+
+    for backend, fn in (('inverted', queries), ('scan', scan)):
+        seconds, peak = measure(fn)
+        # report per-query time
+        measurements.append(Measurement('search', backend, 'query', size, seconds / len(QUERIES), peak))
+    return measurements
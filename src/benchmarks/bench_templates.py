@@ -0,0 +1,43 @@
+import os
+from types import SimpleNamespace
+
+from app.templating import build_templates, stream_template
+from benchmarks import catalogue
+from benchmarks.harness import Measurement, benchmark_suite, measure
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates')
+
+
+@benchmark_suite('templates')
+def run(size: int, workdir: str) -> list[Measurement]:
+    """Gallery rendering for `size` cards: whole-string render vs streamed generate().
+
+    'render' builds the full page before the first byte can be sent;
+    'first_chunk' is the time to the first streamed chunk (time to first byte
+    of the response) and 'stream' the time to produce every chunk. 'compile'
+    loads all templates into a fresh environment, without and with a warm
+    bytecode cache.
+    """
+    cache_dir = os.path.join(workdir, 'jinja-cache')
+    templates = build_templates(TEMPLATES_DIR, bytecode_cache_dir=cache_dir)
+    images = catalogue.generate(size)
+    # index.html reads the session from the request; an anonymous one is enough
+    context = {'request': SimpleNamespace(session={}), 'images': images, 'q': '', 'stage': '', 'search': ''}
+    measurements: list[Measurement] = []
+
+    for name in ('_gallery.html', 'index.html'):
+        template = templates.get_template(name)
+        # Bound as defaults, so each operation renders this iteration's template
+        operations = {
+            'render': lambda template=template: template.render(context).encode('utf-8'),
+            'first_chunk': lambda name=name: next(stream_template(templates, name, context)),
+            'stream': lambda name=name: sum(len(chunk) for chunk in stream_template(templates, name, context)),
+        }
+        for operation, fn in operations.items():
+            seconds, peak = measure(fn)
+            measurements.append(Measurement('templates', name, operation, size, seconds, peak))
+
+    for backend, directory in (('no-cache', 'off'), ('bytecode-cache', cache_dir)):
+        seconds, peak = measure(lambda directory=directory: build_templates(TEMPLATES_DIR, bytecode_cache_dir=directory))
+        measurements.append(Measurement('templates', backend, 'compile', size, seconds, peak))
+    return measurements
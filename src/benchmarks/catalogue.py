@@ -0,0 +1,57 @@
+import json
+import random
+import uuid
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from app.models.image_entry import Stage
+
+MEDICINES = [
+    'Aspirin', 'Panadol', 'Ibuprofen', 'Algoflex', 'Cataflam', 'Nurofen', 'Paracetamol', 'Amoxicillin',
+    'Augmentin', 'Xanax', 'Controloc', 'Nolpaza', 'Lipitor', 'Concor', 'Euthyrox', 'Metformin',
+]
+FORMS = ['tablet', 'capsule', 'syrup', 'injection', 'cream', 'gel', 'drops']
+SUBSTANCES = ['acetylsalicylic acid', 'paracetamol', 'ibuprofen', 'diclofenac', 'amoxicillin', 'alprazolam',
+              'pantoprazole', 'atorvastatin', 'bisoprolol', 'levothyroxine', 'metformin']
+STAGES = [Stage.UPLOADED.value, Stage.PROCESSED.value, Stage.ARCHIVED.value, Stage.APPROVAL_WAITING.value]
+
+
+def iter_entries(count: int, seed: int = 42) -> Iterator[dict[str, Any]]:
+    """Yield `count` synthetic, deterministic ImageEntry-shaped dicts."""
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=UTC)
+    versions: dict[str, int] = {}
+    for i in range(count):
+        # ~10% of catalogue entries are variants of a base name (e.g. 'Aspirin Forte 3')
+        base = rnd.choice(MEDICINES)
+        med = base if rnd.random() < 0.9 else f"{base} Forte {rnd.randint(1, 50)}"
+        versions[med] = versions.get(med, 0) + 1
+        entry_id = uuid.UUID(int=rnd.getrandbits(128)).hex
+        ext = rnd.choice(['.png', '.jpg', '.webp'])
+        yield {
+            'id': entry_id,
+            'original_name': f"IMG_{i:07d}{ext}",
+            'stored_name': f"{entry_id}{ext}",
+            'url': f"/uploads/{entry_id}{ext}",
+            'size': rnd.randint(50_000, 8_000_000),
+            'content_type': 'image/png' if ext == '.png' else 'image/jpeg' if ext == '.jpg' else 'image/webp',
+            'uploaded_at': (start + timedelta(seconds=i * 37)).isoformat() + 'Z',
+            'medicine_name': med,
+            'version': versions[med],
+            'stage': rnd.choice(STAGES),
+            'form': rnd.choice(FORMS),
+            'substance': rnd.choice(SUBSTANCES),
+        }
+
+
+def generate(count: int, seed: int = 42) -> list[dict[str, Any]]:
+    return list(iter_entries(count, seed))
+
+
+def write_metadata(path: str, count: int, seed: int = 42) -> list[dict[str, Any]]:
+    """Write a synthetic metadata.json the way the repository stores it; returns the entries."""
+    entries = generate(count, seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, indent=2)
+    return entries
@@ -0,0 +1,57 @@
+import random
+import struct
+import threading
+import time
+import zlib
+
+from benchmarks.catalogue import FORMS, MEDICINES, SUBSTANCES
+
+AnalysisResult = tuple[bool | None, str | None, str | None, str | None]
+
+
+class FakePackagePhotoAnalyzer:
+    """Drop-in replacement for PackagePhotoAnalyzer that never calls Gemini.
+
+    - latency_s: blocking delay per call (the real client call blocks the same way)
+    - error_rate: share of calls behaving like an API failure, i.e. (None, None, None, None)
+    - invalid_rate: share of calls rejecting the photo as not a medicine package
+    - incomplete_rate: share of valid answers missing a field (lands in APPROVAL_WAITING)
+    """
+    def __init__(self, latency_s: float = 0.0, error_rate: float = 0.0, invalid_rate: float = 0.0,
+                 incomplete_rate: float = 0.0, seed: int | None = None):
+        self.model_name = 'fake'
+        self._latency_s = latency_s
+        self._error_rate = error_rate
+        self._invalid_rate = invalid_rate
+        self._incomplete_rate = incomplete_rate
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def analyze_image(self, image_bytes: bytes, mime_type: str) -> AnalysisResult | None:
+        with self._lock:
+            self.calls += 1
+            roll = self._rnd.random()
+            incomplete = self._rnd.random() < self._incomplete_rate
+            med = self._rnd.choice(MEDICINES)
+            form = self._rnd.choice(FORMS)
+            substance = self._rnd.choice(SUBSTANCES)
+        if self._latency_s:
+            time.sleep(self._latency_s)
+        if roll < self._error_rate:
+            return None, None, None, None
+        if roll < self._error_rate + self._invalid_rate:
+            return False, None, None, None
+        return True, med, None if incomplete else form, substance
+
+
+def tiny_png(seed: int, width: int = 16, height: int = 16) -> bytes:
+    """Build a small valid RGB PNG with seed-dependent pixels, without Pillow."""
+    rnd = random.Random(seed)
+    rows = b''.join(b'\x00' + bytes(rnd.getrandbits(8) for _ in range(width * 3)) for _ in range(height))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b'')
@@ -0,0 +1,131 @@
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+# suite name -> callable(size, workdir) returning measurements
+SUITES: dict[str, Callable[[int, str], list["Measurement"]]] = {}
+
+
+@dataclass
+class Measurement:
+    suite: str
+    backend: str
+    operation: str
+    size: int
+    seconds: float
+    peak_bytes: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.suite}/{self.backend}/{self.operation}/{self.size}"
+
+
+def benchmark_suite(name: str):
+    """Register a suite function under `name`."""
+    def decorator(fn: Callable[[int, str], list[Measurement]]):
+        SUITES[name] = fn
+        return fn
+    return decorator
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, budget_s: float = 2.0) -> tuple[float, int]:
+    """Return (best wall time in seconds, peak traced allocation in bytes) for `fn`.
+
+    Timing runs without tracemalloc (it slows allocation-heavy code several
+    times); memory is measured in one extra traced call. Repeats stop early once
+    `budget_s` is spent so 1M-entry runs stay bearable.
+    """
+    best = float('inf')
+    spent = 0.0
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        if spent >= budget_s:
+            break
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def measure_retained(build: Callable[[], Any]) -> tuple[float, int]:
+    """Return (wall time of `build`, bytes still allocated while its result is alive).
+
+    Unlike the peak from measure(), this is the resident cost of the structure
+    itself, without the temporaries needed to build it.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    seconds = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return seconds, retained
+
+
+def results_document(measurements: list[Measurement]) -> dict[str, Any]:
+    return {
+        'meta': {
+            'created': datetime.now(UTC).isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+        },
+        'results': {m.key: {'seconds': m.seconds, 'peak_bytes': m.peak_bytes} for m in measurements},
+    }
+
+
+def save_results(path: str, measurements: list[Measurement]) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results_document(measurements), f, indent=2, sort_keys=True)
+
+
+def compare(measurements: list[Measurement], baseline_path: str, time_tolerance: float = 0.5,
+            memory_tolerance: float = 0.25, min_seconds: float = 0.0005) -> list[str]:
+    """Compare against a stored baseline; return human readable regressions.
+
+    Timings below `min_seconds` are too noisy to gate on and are only compared by memory.
+    Keys missing from the baseline are ignored (new benchmarks).
+    """
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f).get('results', {})
+    regressions: list[str] = []
+    for m in measurements:
+        base: dict[str, Any] | None = baseline.get(m.key)
+        if not base:
+            continue
+        if base['seconds'] >= min_seconds and m.seconds > base['seconds'] * (1 + time_tolerance):
+            regressions.append(f"{m.key}: time {m.seconds * 1000:.2f} ms > baseline {base['seconds'] * 1000:.2f} ms (+{time_tolerance:.0%})")
+        if base['peak_bytes'] and m.peak_bytes > base['peak_bytes'] * (1 + memory_tolerance):
+            regressions.append(f"{m.key}: peak memory {m.peak_bytes:,} B > baseline {base['peak_bytes']:,} B (+{memory_tolerance:.0%})")
+    return regressions
+
+
+def format_table(measurements: list[Measurement]) -> str:
+    lines = [f"{'benchmark':<60} {'time':>12} {'peak mem':>14}"]
+    for m in measurements:
+        lines.append(f"{m.key:<60} {m.seconds * 1000:>9.3f} ms {m.peak_bytes / 1024:>11.1f} KB")
+    return "\n".join(lines)
@@ -0,0 +1,245 @@
+"""In-process end-to-end load test.
+
+Drives the real create_app() ASGI app over httpx.ASGITransport with an
+authenticated session and a FakePackagePhotoAnalyzer, so it runs without
+Google credentials or network access:
+
+    python -m benchmarks.loadtest --requests 1000 --concurrency 32 \\
+        --mix upload=1,list=3,filter=4,promote=1 --analyzer-latency 0.2 \\
+        --threshold filter:p95=150 --threshold upload:p99=800
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import httpx
+from fastapi import FastAPI
+from itsdangerous import TimestampSigner
+
+from app.config import AppConfig
+from app.routes import api
+from app.services.auth import session_secret
+from app.storage.filesystem import FileSystem
+from benchmarks import catalogue
+from benchmarks.fakes import FakePackagePhotoAnalyzer, tiny_png
+
+SCENARIOS = ('upload', 'list', 'filter', 'promote')
+DEFAULT_MIX = {'upload': 1, 'list': 3, 'filter': 4, 'promote': 1}
+
+
+@dataclass
+class LoadTestConfig:
+    requests: int = 500
+    concurrency: int = 16
+    mix: dict[str, int] = field(default_factory=lambda: dict(DEFAULT_MIX))
+    seed_entries: int = 1000
+    analyzer_latency_s: float = 0.05
+    error_rate: float = 0.02
+    invalid_rate: float = 0.02
+    seed: int = 7
+    # create_app() configures INFO logging; per-request lines would dominate the run
+    log_level: str = 'WARNING'
+
+
+@dataclass
+class ScenarioStats:
+    latencies_ms: list[float] = field(default_factory=list)
+    rejected: int = 0  # 4xx answers (validation, invalid package): expected domain outcomes
+    errors: int = 0  # 5xx answers and transport exceptions
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile in milliseconds."""
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        rank = max(1, math.ceil(p / 100 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class LoadTestReport:
+    stats: dict[str, ScenarioStats]
+    wall_s: float
+
+    def throughput(self, scenario: str | None = None) -> float:
+        if self.wall_s <= 0:
+            return 0.0
+        if scenario is None:
+            return sum(len(s.latencies_ms) for s in self.stats.values()) / self.wall_s
+        return len(self.stats[scenario].latencies_ms) / self.wall_s
+
+    def violations(self, thresholds: dict[str, dict[str, float]]) -> list[str]:
+        """Check e.g. {'filter': {'p95': 150}} (milliseconds); errors always count as violations."""
+        found = []
+        for scenario, limits in thresholds.items():
+            stats = self.stats.get(scenario)
+            if stats is None:
+                continue
+            for name, limit_ms in limits.items():
+                value = stats.percentile(float(name.lstrip('p')))
+                if value > limit_ms:
+                    found.append(f"{scenario} {name}={value:.1f} ms exceeds {limit_ms:.1f} ms")
+        for scenario, stats in self.stats.items():
+            if stats.errors:
+                found.append(f"{scenario}: {stats.errors} server errors")
+        return found
+
+    def format(self) -> str:
+        lines = [f"{'scenario':<10} {'count':>6} {'4xx':>5} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}"]
+        for name, s in self.stats.items():
+            lines.append(f"{name:<10} {len(s.latencies_ms):>6} {s.rejected:>5} {s.errors:>5} {s.percentile(50):>9.1f} "
+                         f"{s.percentile(95):>9.1f} {s.percentile(99):>9.1f} {self.throughput(name):>8.1f}")
+        lines.append(f"total: {sum(len(s.latencies_ms) for s in self.stats.values())} requests in {self.wall_s:.2f} s "
+                     f"({self.throughput():.1f} req/s)")
+        return "\n".join(lines)
+
+
+def session_cookie(user: dict[str, str], secret: str | None = None) -> str:
+    """Sign a session the way Starlette's SessionMiddleware does."""
+    data = base64.b64encode(json.dumps({'user': user}).encode('utf-8'))
+    return TimestampSigner(secret or session_secret()).sign(data).decode('utf-8')
+
+
+@contextmanager
+def isolated_app(workdir: str, analyzer) -> Iterator[FastAPI]:
+    """Build a fresh app whose uploads and metadata live in `workdir`, with `analyzer` injected."""
+    from app.app import create_app
+
+    saved = AppConfig.UPLOAD_DIR, AppConfig.METADATA_FILE, AppConfig.UPLOAD_RATE_PER_MINUTE
+    AppConfig.UPLOAD_DIR = workdir
+    AppConfig.METADATA_FILE = os.path.join(workdir, 'metadata.json')
+    # Every simulated request shares one session user; only the global admission limits apply
+    AppConfig.UPLOAD_RATE_PER_MINUTE = 0
+    FileSystem().ensure_storage(AppConfig.UPLOAD_DIR, AppConfig.METADATA_FILE)
+    api.reset_singletons()
+    try:
+        app = create_app()
+        app.dependency_overrides[api.get_analyzer] = lambda: analyzer
+        yield app
+    finally:
+        AppConfig.UPLOAD_DIR, AppConfig.METADATA_FILE, AppConfig.UPLOAD_RATE_PER_MINUTE = saved
+        api.reset_singletons()
+
+
+async def run_load_test(config: LoadTestConfig) -> LoadTestReport:
+    rnd = random.Random(config.seed)
+    analyzer = FakePackagePhotoAnalyzer(config.analyzer_latency_s, config.error_rate, config.invalid_rate,
+                                        seed=config.seed)
+    scenarios = [name for name in SCENARIOS if config.mix.get(name)]
+    weights = [config.mix[name] for name in scenarios]
+    stats = {name: ScenarioStats() for name in scenarios}
+
+    with tempfile.TemporaryDirectory(prefix='medicine-loadtest-') as workdir, isolated_app(workdir, analyzer) as app:
+        logging.getLogger().setLevel(config.log_level)
+        entries = catalogue.write_metadata(AppConfig.METADATA_FILE, config.seed_entries, seed=config.seed)
+        known_ids = [e['id'] for e in entries]
+        cookies = {'session': session_cookie({'email': 'loadtest@example.com', 'name': 'Load Test'})}
+        transport = httpx.ASGITransport(app=app)
+        remaining = config.requests
+
+        async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', cookies=cookies) as client:
+            async def one_request(scenario: str, n: int) -> httpx.Response:
+                if scenario == 'upload':
+                    files = {'file': (f"photo-{n}.png", tiny_png(n), 'image/png')}
+                    response = await client.post('/api/images', data={'medicine_name': rnd.choice(catalogue.MEDICINES)}, files=files)
+                    if response.status_code == 201:
+                        known_ids.append(response.json()['id'])
+                    return response
+                if scenario == 'list':
+                    return await client.get('/api/images')
+                if scenario == 'filter':
+                    params = {'q': rnd.choice(catalogue.MEDICINES)[:rnd.randint(0, 4)],
+                              'stage': rnd.choice(['', 'UPLOADED', 'PROCESSED', 'ARCHIVED'])}
+                    return await client.get('/partials/gallery', params=params)
+                return await client.post(f"/images/{rnd.choice(known_ids)}/promote", headers={'HX-Request': 'true'})
+
+            async def worker() -> None:
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    n = remaining
+                    scenario = rnd.choices(scenarios, weights)[0]
+                    start = time.perf_counter()
+                    try:
+                        response = await one_request(scenario, n)
+                        status = response.status_code
+                    except Exception:
+                        logging.getLogger(__name__).exception("Request failed in scenario %s", scenario)
+                        status = 599
+                    stats[scenario].latencies_ms.append((time.perf_counter() - start) * 1000)
+                    if status >= 500:
+                        stats[scenario].errors += 1
+                    elif status >= 400:
+                        stats[scenario].rejected += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(config.concurrency)))
+            wall_s = time.perf_counter() - started
+
+    return LoadTestReport(stats=stats, wall_s=wall_s)
+
+
+def _parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def _parse_threshold(value: str) -> tuple[str, str, float]:
+    # scenario:p95=150
+    try:
+        scenario, rest = value.split(':', 1)
+        name, limit = rest.split('=', 1)
+        return scenario, name, float(limit)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid threshold {value!r}; expected scenario:pNN=milliseconds") from None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest', description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mix', type=_parse_mix, default=dict(DEFAULT_MIX), help='e.g. upload=1,list=3,filter=4,promote=1')
+    parser.add_argument('--seed-entries', type=int, default=1000, help='synthetic catalogue size before the run')
+    parser.add_argument('--analyzer-latency', type=float, default=0.05, help='fake analyzer latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.02)
+    parser.add_argument('--invalid-rate', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--threshold', type=_parse_threshold, action='append', default=[],
+                        help='latency gate, e.g. filter:p95=150 (repeatable); exit 1 when exceeded')
+    args = parser.parse_args(argv)
+
+    config = LoadTestConfig(requests=args.requests, concurrency=args.concurrency, mix=args.mix,
+                            seed_entries=args.seed_entries, analyzer_latency_s=args.analyzer_latency,
+                            error_rate=args.error_rate, invalid_rate=args.invalid_rate, seed=args.seed)
+    report = asyncio.run(run_load_test(config))
+    print(report.format())
+
+    thresholds: dict[str, dict[str, float]] = {}
+    for scenario, name, limit in args.threshold:
+        thresholds.setdefault(scenario, {})[name] = limit
+    violations = report.violations(thresholds)
+    if violations:
+        print("\nThreshold violations:")
+        print("\n".join(f"  {v}" for v in violations))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Cold start benchmark and import-time profile.
+
+Each run is a fresh interpreter that imports app.app (building the app),
+runs the lifespan startup and serves a first request:
+
+    python -m benchmarks.startup --runs 5 --budget-ms 1500 --report 20
+
+Exits 1 when the median import + startup + first request time exceeds the
+budget, so it can gate CI.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; argv[1] is a scratch upload directory
+_STARTUP_SCRIPT = r'''
+import json, os, sys, time
+start = time.perf_counter()
+from app.config import AppConfig
+AppConfig.UPLOAD_DIR = sys.argv[1]
+AppConfig.METADATA_FILE = os.path.join(sys.argv[1], 'metadata.json')
+import app.app
+imported = time.perf_counter()
+from starlette.testclient import TestClient
+before_startup = time.perf_counter()
+with TestClient(app.app.app) as client:
+    started = time.perf_counter()
+    status = client.get('/api/images').status_code
+    served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'startup_ms': (started - before_startup) * 1000,
+    'first_request_ms': (served - started) * 1000,
+    'status': status,
+    'genai_loaded': 'google.genai' in sys.modules,
+}))
+'''
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportTiming]:
+    """Parse `python -X importtime` output (microseconds; two spaces of indent per nesting level)."""
+    timings = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            timings.append(ImportTiming(module, int(self_us), int(cumulative_us), max(0, len(indent) - 1) // 2))
+    return timings
+
+
+def _child_env(extra: dict[str, str] | None = None) -> dict[str, str]:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SRC_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    # the background warmup would compete with the measured first request
+    env.setdefault('WARMUP_ON_STARTUP', 'false')
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    env.update(extra or {})
+    return env
+
+
+def import_profile(module: str = 'app.app') -> list[ImportTiming]:
+    with tempfile.TemporaryDirectory(prefix='medicine-startup-') as workdir:
+        script = (f"from app.config import AppConfig; AppConfig.UPLOAD_DIR = {workdir!r}; "
+                  f"AppConfig.METADATA_FILE = {os.path.join(workdir, 'metadata.json')!r}; import {module}")
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], cwd=SRC_DIR, env=_child_env(),
+                                capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+def measure_startup(runs: int = 5, env: dict[str, str] | None = None) -> list[dict[str, float]]:
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix='medicine-startup-') as workdir:
+            result = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT, workdir], cwd=SRC_DIR, env=_child_env(env),
+                                    capture_output=True, text=True, check=True)
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def format_report(timings: list[ImportTiming], top: int) -> str:
+    lines = [f"{'cumulative':>12} {'self':>10}  module"]
+    for t in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:top]:
+        lines.append(f"{t.cumulative_us / 1000:>9.1f} ms {t.self_us / 1000:>7.1f} ms  {'  ' * t.depth}{t.module}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup', description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='fail when the median import + startup + first request exceeds this')
+    parser.add_argument('--report', type=int, default=0, metavar='N', help='print the N slowest imports of app.app')
+    args = parser.parse_args(argv)
+
+    if args.report:
+        print(format_report(import_profile(), args.report))
+        print()
+
+    samples = measure_startup(args.runs)
+    totals = [s['import_ms'] + s['startup_ms'] + s['first_request_ms'] for s in samples]
+    for key in ('import_ms', 'startup_ms', 'first_request_ms'):
+        print(f"{key:<18} median {statistics.median(s[key] for s in samples):8.1f} ms")
+    median_total = statistics.median(totals)
+    print(f"{'total':<18} median {median_total:8.1f} ms  (min {min(totals):.1f}, max {max(totals):.1f}, {len(samples)} runs)")
+    if any(s['genai_loaded'] for s in samples):
+        print("warning: google.genai was imported during startup")
+
+    if args.budget_ms is not None and median_total > args.budget_ms:
+        print(f"\nStartup budget exceeded: {median_total:.1f} ms > {args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import base64
+import json
+from collections.abc import Callable, Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from itsdangerous import TimestampSigner
+
+from app.config import AppConfig
+from app.routes import api
+from app.services.auth import session_secret
+
+
+class RecognizingAnalyzer:
+    """Stands in for PackagePhotoAnalyzer: every photo is an Aspirin tablet, and Gemini is never called."""
+    model_name = "test"
+
+    def analyze_image(self, image_bytes: bytes, mime_type: str):
+        return True, "Aspirin", "tablet", "acetylsalicylic acid"
+
+
+@pytest.fixture(autouse=True)
+def app_config(tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch) -> type[AppConfig]:
+    """AppConfig with uploads, metadata and staged chunks in a temporary directory, so no test touches the work tree.
+
+    The directory is not the test's tmp_path, which stays empty for the test itself. Override this
+    fixture in a test module to change further settings before `client` builds the app.
+    """
+    root = tmp_path_factory.mktemp("app")
+    upload_dir = root / "uploads"
+    upload_dir.mkdir()
+    monkeypatch.setattr(AppConfig, "UPLOAD_DIR", str(upload_dir))
+    monkeypatch.setattr(AppConfig, "METADATA_FILE", str(upload_dir / "metadata.json"))
+    monkeypatch.setattr(AppConfig, "RESUMABLE_STAGING_DIR", str(root / "staging"))
+    return AppConfig
+
+
+@pytest.fixture()
+def client(app_config: type[AppConfig]) -> Iterator[TestClient]:
+    from app.app import create_app
+
+    # the services are singletons built from AppConfig on first use
+    api.reset_singletons()
+    app = create_app()
+    app.dependency_overrides[api.get_analyzer] = RecognizingAnalyzer
+    yield TestClient(app)
+    api.reset_singletons()
+
+
+@pytest.fixture()
+def session_cookie() -> Callable[[dict[str, str]], str]:
+    """Signs a session for `user` the way Starlette's SessionMiddleware does."""
+    def sign(user: dict[str, str]) -> str:
+        data = base64.b64encode(json.dumps({"user": user}).encode("utf-8"))
+        return TimestampSigner(session_secret()).sign(data).decode("utf-8")
+    return sign
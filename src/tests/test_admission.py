@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from app.config import AppConfig
+from app.services.admission import (
+    AdmissionController,
+    AdmissionLimits,
+    AdmissionMiddleware,
+    AdmissionRejected,
+    FileAdmissionState,
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_limits_each_user_and_refills() -> None:
+    clock = Clock()
+    controller = AdmissionController(AdmissionLimits(rate_per_s=0.5, burst=2), clock=clock)
+
+    controller.admit("a@example.com", 10)
+    controller.admit("a@example.com", 10)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("a@example.com", 10)
+    assert rejected.value.reason == "rate_limited" and rejected.value.retry_after_s == 2
+    # other users have their own bucket
+    controller.admit("b@example.com", 10)
+
+    clock.now += 2
+    controller.admit("a@example.com", 10)
+
+
+def test_backlog_and_inflight_bytes_shed_until_released() -> None:
+    controller = AdmissionController(AdmissionLimits(max_backlog=2, max_inflight_bytes=100, retry_after_s=7))
+
+    big = controller.admit(None, 500)  # alone, an oversized upload still gets in
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit(None, 1)
+    assert rejected.value.reason == "inflight_bytes" and rejected.value.retry_after_s == 7
+    controller.release(big)
+
+    first = controller.admit(None, 10)
+    controller.admit(None, 10)
+    with pytest.raises(AdmissionRejected, match="backlog"):
+        controller.admit(None, 10)
+    controller.release(first)
+    controller.admit(None, 10)
+
+
+def test_state_file_is_shared_between_controllers(tmp_path) -> None:
+    path = str(tmp_path / "admission.json")
+    limits = AdmissionLimits(rate_per_s=0.01, burst=1, max_backlog=1)
+    worker_a = AdmissionController(limits, FileAdmissionState(path))
+    worker_b = AdmissionController(limits, FileAdmissionState(path))
+
+    ticket = worker_a.admit("a@example.com", 1)
+    with pytest.raises(AdmissionRejected, match="backlog"):
+        worker_b.admit("b@example.com", 1)
+    worker_a.release(ticket)
+    with pytest.raises(AdmissionRejected, match="rate_limited"):
+        worker_b.admit("a@example.com", 1)
+
+
+@pytest.fixture()
+def app_config(app_config: type[AppConfig], monkeypatch: pytest.MonkeyPatch) -> type[AppConfig]:
+    monkeypatch.setattr(app_config, "UPLOAD_RATE_PER_MINUTE", 1.0)
+    monkeypatch.setattr(app_config, "UPLOAD_BURST", 1)
+    return app_config
+
+
+def test_upload_routes_answer_429_with_retry_after(client: TestClient, session_cookie) -> None:
+    client.cookies.set("session", session_cookie({"email": "bulk@example.com", "name": "Bulk"}))
+
+    # admitted, then rejected by the route for the missing form fields
+    assert client.post("/api/images").status_code == 422
+    throttled = client.post("/api/images")
+    assert throttled.status_code == 429
+    assert throttled.headers["Retry-After"] == "60"
+    assert client.post("/upload").status_code == 429
+    assert client.get("/api/images").status_code == 200
+
+
+def test_body_without_content_length_counts_as_the_largest_upload() -> None:
+    controller = AdmissionController(AdmissionLimits(max_inflight_bytes=AppConfig.MAX_CONTENT_LENGTH))
+    middleware = AdmissionMiddleware(PlainTextResponse("stored"), controller)
+    controller.admit(None, 1)
+    sent: list[dict] = []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/images", "headers": [(b"transfer-encoding", b"chunked")]}
+    asyncio.run(middleware(scope, receive, send))
+
+    # a chunked multipart body can be as large as any upload, so it doesn't fit beside the one in flight
+    assert sent[0]["status"] == 429
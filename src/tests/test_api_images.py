@@ -0,0 +1,128 @@
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+MEDICINES = ["Aspirin", "Paracetamol", "Panadol", "Ibuprofen", "Aspirin Forte"]
+SUBSTANCES = ["acetylsalicylic acid", "paracetamol", "ibuprofen"]
+STAGES = ["UPLOADED", "PROCESSED", "ARCHIVED", "APPROVAL_WAITING"]
+
+
+def _catalogue(count: int) -> list:
+    """Deterministic entries spreading medicines, substances and stages over each other."""
+    versions = {}
+    entries = []
+    for i in range(count):
+        med = MEDICINES[i % len(MEDICINES)]
+        versions[med] = versions.get(med, 0) + 1
+        entries.append({"id": f"id{i}", "original_name": f"IMG_{i:04d}.png", "stored_name": f"id{i}.png",
+                        "url": f"/uploads/id{i}.png", "size": 1000 + i, "content_type": "image/png",
+                        "uploaded_at": f"2025-01-{1 + i % 28:02d}T10:00:00+00:00Z", "medicine_name": med,
+                        "version": versions[med], "stage": STAGES[i // len(MEDICINES) % len(STAGES)],
+                        "form": "tablet", "substance": SUBSTANCES[i % len(SUBSTANCES)]})
+    return entries
+
+
+@pytest.fixture()
+def client(client: TestClient, app_config) -> TestClient:
+    Path(app_config.METADATA_FILE).write_text(json.dumps(_catalogue(300)))
+    return client
+
+
+def test_ndjson_stream_matches_json_listing(client: TestClient) -> None:
+    listed = client.get("/api/images", params={"q": "aspi", "stage": "processed"}).json()
+
+    streamed = client.get("/api/images", params={"q": "aspi", "stage": "processed"},
+                          headers={"Accept": "application/x-ndjson"})
+
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert lines == listed
+    assert listed and all(e["stage"] == "PROCESSED" and "aspi" in e["medicine_name"].lower() for e in listed)
+
+
+def test_stream_query_param_yields_every_entry(client: TestClient) -> None:
+    with client.stream("GET", "/api/images", params={"stream": "1"}) as response:
+        count = sum(1 for line in response.iter_lines() if line)
+
+    assert count == 300
+
+
+def test_search_param_ranks_and_composes_with_filters(client: TestClient) -> None:
+    ranked = client.get("/api/images", params={"search": "PÁRACETAMOL"}).json()
+
+    assert ranked
+    # medicine name matches (weight 3) come before substance-only matches (weight 2)
+    names = ["paracetamol" in e["medicine_name"].lower() for e in ranked]
+    assert names == sorted(names, reverse=True)
+    assert all("paracetamol" in (e["medicine_name"] + " " + e.get("substance", "")).lower() for e in ranked)
+
+    filtered = client.get("/api/images", params={"search": "para", "stage": "archived"}).json()
+    assert filtered and all(e["stage"] == "ARCHIVED" for e in filtered)
+    streamed = client.get("/api/images", params={"search": "para", "stage": "archived", "stream": "1"})
+    assert [json.loads(line) for line in streamed.text.splitlines()] == filtered
+
+
+def test_stats_follow_stage_transitions(client: TestClient) -> None:
+    listed = client.get("/api/images").json()
+    stats = client.get("/api/stats").json()
+
+    assert stats["total"] == len(listed) == 300
+    assert stats["total_bytes"] == sum(e["size"] for e in listed)
+    assert sum(stats["by_stage"].values()) == 300
+    assert sum(m["count"] for m in stats["medicines"]) == 300
+    assert sum(stats["uploads_per_day"].values()) == 300
+
+    target = next(e for e in listed if e["stage"] == "UPLOADED")
+    client.post(f"/images/{target['id']}/promote")
+    after = client.get("/api/stats").json()
+
+    assert after["by_stage"]["UPLOADED"] == stats["by_stage"]["UPLOADED"] - 1
+    assert after["by_stage"]["PROCESSED"] == stats["by_stage"]["PROCESSED"] + 1
+
+
+def test_gallery_partial_is_streamed_then_served_from_cache(client: TestClient) -> None:
+    streamed = client.get("/partials/gallery", params={"q": "aspi"})
+    assert streamed.status_code == 200
+    # streamed responses have no Content-Length; the cached copy is sent whole
+    assert "content-length" not in streamed.headers
+    assert streamed.text.count('class="bg-white rounded shadow') > 0
+
+    cached = client.get("/partials/gallery", params={"q": "aspi"})
+    assert cached.headers["content-length"] == str(len(cached.content))
+    assert cached.text == streamed.text
+
+
+def test_single_image_get_and_patch_with_etags(client: TestClient, session_cookie) -> None:
+    target = client.get("/api/images", params={"stage": "uploaded"}).json()[0]
+    url = f"/api/images/{target['id']}"
+
+    got = client.get(url)
+    assert got.json() == target
+    etag = got.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/images/missing").status_code == 404
+
+    assert client.patch(url, json={"stage": "PROCESSED"}).status_code == 401
+    client.cookies.set("session", session_cookie({"email": "field@example.com"}))
+    assert client.patch(url, json={}).status_code == 400
+    assert client.patch(url, json={"stage": "BOGUS"}).status_code == 422
+    assert client.patch("/api/images/missing", json={"stage": "PROCESSED"}).status_code == 404
+
+    # If-Match compares strongly: a weak validator never matches
+    assert client.patch(url, json={"stage": "PROCESSED"}, headers={"If-Match": f"W/{etag}"}).status_code == 412
+    patched = client.patch(url, json={"stage": "PROCESSED", "medicine_name": "Brand New"},
+                           headers={"If-Match": etag})
+    assert patched.status_code == 200
+    entry = patched.json()
+    assert (entry["stage"], entry["medicine_name"], entry["version"]) == ("PROCESSED", "Brand New", 1)
+    assert patched.headers["etag"] != etag
+    assert client.get(url, headers={"If-None-Match": etag}).json() == entry
+    # a writer holding the old ETag does not overwrite the change
+    assert client.patch(url, json={"stage": "ARCHIVED"}, headers={"If-Match": etag}).status_code == 412
+
+    listed = client.get("/api/images", params={"search": "brand new"}).json()
+    assert [e["id"] for e in listed] == [target["id"]]
+    medicines = client.get("/api/stats").json()["medicines"]
+    assert {"medicine_name": "Brand New", "count": 1, "latest_version": 1} in medicines
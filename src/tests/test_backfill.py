@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+from app.repository.image_repository import ImageMetadataRepository
+from app.services.backfill import RateLimiter, run_backfill, select_entries
+from app.storage.filesystem import FileSystem
+
+
+class ScriptedAnalyzer:
+    model_name = "model-v2"
+
+    def __init__(self, results: dict) -> None:
+        self.results = results
+        self.calls = []
+
+    def analyze_image(self, image_bytes: bytes, mime_type: str):
+        self.calls.append(image_bytes.decode())
+        return self.results.get(image_bytes.decode(), (True, "Aspirin", "tablet", "acetylsalicylic acid"))
+
+
+def _catalogue(tmp_path: Path, entries: list) -> ImageMetadataRepository:
+    for e in entries:
+        (tmp_path / e["stored_name"]).write_bytes(e["id"].encode())
+    metadata = tmp_path / "metadata.json"
+    metadata.write_text(json.dumps(entries))
+    return ImageMetadataRepository(str(metadata), FileSystem())
+
+
+def _entry(entry_id: str, stage: str = "APPROVAL_WAITING", **fields) -> dict:
+    return {"id": entry_id, "stored_name": f"{entry_id}.png", "content_type": "image/png", "medicine_name": "Aspirin",
+            "version": 1, "stage": stage, **fields}
+
+
+def test_selects_waiting_and_older_model_entries_but_not_duplicate_reviews() -> None:
+    entries = [_entry("w"), _entry("dup", possible_duplicate_of="w"), _entry("old", "PROCESSED", model="model-v1"),
+               _entry("new", "PROCESSED", model="model-v2")]
+
+    assert [e["id"] for e in select_entries(entries, "model-v2")] == ["w"]
+    assert [e["id"] for e in select_entries(entries, "model-v2", older_model=True)] == ["w", "old"]
+
+
+def test_backfill_commits_in_batches_and_resumes_from_checkpoint(tmp_path: Path) -> None:
+    repo = _catalogue(tmp_path, [_entry(f"e{i}") for i in range(5)] + [_entry("down"), _entry("bad")])
+    analyzer = ScriptedAnalyzer({"e1": (True, "Aspirin", None, "acetylsalicylic acid"), "down": None,
+                                 "bad": (False, None, None, None)})
+    checkpoint = str(tmp_path / "backfill.json")
+
+    with patch.object(repo, "update_many", wraps=repo.update_many) as update_many:
+        first = run_backfill(repo, FileSystem(), analyzer, str(tmp_path), batch_size=2, limit=3, checkpoint_path=checkpoint)
+    assert update_many.call_count == 2
+    assert (first.completed, first.incomplete) == (2, 1)
+    assert sorted(json.loads(Path(checkpoint).read_text())["done"]) == ["e0", "e1", "e2"]
+
+    second = run_backfill(repo, FileSystem(), analyzer, str(tmp_path), batch_size=10, checkpoint_path=checkpoint)
+    # e0 and e2 left APPROVAL_WAITING; e1 is still waiting but checkpointed
+    assert second.skipped == 1 and (second.completed, second.failed, second.invalid) == (2, 1, 1)
+    # calls run on a thread pool, so only each run's set of calls is fixed
+    assert sorted(analyzer.calls[:3]) == ["e0", "e1", "e2"]
+    assert sorted(analyzer.calls[3:]) == ["bad", "down", "e3", "e4"]
+    assert not Path(checkpoint).exists()
+
+    stages = {e["id"]: (e["stage"], e.get("model")) for e in repo.load_all()}
+    assert stages["e0"] == ("UPLOADED", "model-v2")
+    assert stages["e1"] == ("APPROVAL_WAITING", "model-v2")  # still missing the form
+    assert stages["down"] == ("APPROVAL_WAITING", None) and stages["bad"] == ("APPROVAL_WAITING", None)
+
+
+def test_backfill_keeps_stage_changes_made_during_the_run(tmp_path: Path) -> None:
+    repo = _catalogue(tmp_path, [_entry("promoted"), _entry("waiting")])
+    reviewer = ImageMetadataRepository(str(tmp_path / "metadata.json"), FileSystem())
+
+    class PromotingAnalyzer(ScriptedAnalyzer):
+        def analyze_image(self, image_bytes: bytes, mime_type: str):
+            # a reviewer promotes the entry while its analysis is in flight
+            if image_bytes == b"promoted":
+                reviewer.patch("promoted", {"stage": "PROCESSED"})
+            return super().analyze_image(image_bytes, mime_type)
+
+    stats = run_backfill(repo, FileSystem(), PromotingAnalyzer({}), str(tmp_path), concurrency=1)
+
+    assert stats.completed == 2
+    stages = {e["id"]: (e["stage"], e.get("model")) for e in repo.load_all()}
+    assert stages == {"promoted": ("PROCESSED", "model-v2"), "waiting": ("UPLOADED", "model-v2")}
+
+
+def test_rate_limiter_spaces_calls() -> None:
+    now = [0.0]
+    sleeps = []
+    limiter = RateLimiter(4.0, clock=lambda: now[0], sleep=sleeps.append)
+
+    for _ in range(3):
+        limiter.wait()
+
+    assert sleeps == [0.25, 0.5]
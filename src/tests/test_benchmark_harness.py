@@ -0,0 +1,30 @@
+import json
+from pathlib import Path
+
+from benchmarks.harness import Measurement, compare, measure, save_results
+
+
+def test_measure_returns_time_and_peak_memory() -> None:
+    seconds, peak = measure(lambda: [0] * 10_000, repeat=2)
+
+    assert seconds > 0
+    assert peak >= 10_000 * 8
+
+
+def test_compare_flags_time_and_memory_regressions(tmp_path: Path) -> None:
+    baseline = tmp_path / "baseline.json"
+    save_results(str(baseline), [
+        Measurement('repository', 'json', 'load_all', 1000, 0.010, 1_000_000),
+        Measurement('repository', 'json', 'append', 1000, 0.020, 1_000_000),
+    ])
+
+    current = [
+        Measurement('repository', 'json', 'load_all', 1000, 0.011, 1_000_000),  # within tolerance
+        Measurement('repository', 'json', 'append', 1000, 0.050, 2_000_000),  # slower and bigger
+        Measurement('repository', 'json', 'new_op', 1000, 1.0, 1),  # not in baseline -> ignored
+    ]
+    regressions = compare(current, str(baseline), time_tolerance=0.5, memory_tolerance=0.25)
+
+    assert len(regressions) == 2
+    assert all(r.startswith('repository/json/append/1000') for r in regressions)
+    assert json.loads(baseline.read_text())['results']['repository/json/load_all/1000']['seconds'] == 0.010
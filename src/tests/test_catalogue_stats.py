@@ -0,0 +1,49 @@
+import json
+from pathlib import Path
+from unittest.mock import Mock
+
+from app.models.catalogue_stats import CatalogueStats
+from app.repository.image_repository import ImageMetadataRepository
+from benchmarks import catalogue
+
+
+def test_add_and_remove_keep_counts_and_latest_version() -> None:
+    stats = CatalogueStats()
+    a1 = {"medicine_name": "Aspirin", "version": 1, "size": 10, "uploaded_at": "2025-09-24T20:54:00+00:00Z"}
+    a3 = {"medicine_name": "aspirin", "version": "3", "size": 5, "stage": "PROCESSED",
+          "uploaded_at": "2025-09-25T08:00:00+00:00Z"}
+    for entry in (a1, a3, {"medicine_name": "Panadol", "version": "oops"}):
+        stats.add(entry)
+
+    data = stats.to_dict()
+    assert data["total"] == 3 and data["total_bytes"] == 15
+    assert data["by_stage"] == {"APPROVAL_WAITING": 0, "UPLOADED": 2, "PROCESSED": 1, "ARCHIVED": 0}
+    assert data["medicines"] == [{"medicine_name": "Aspirin", "count": 2, "latest_version": 3},
+                                 {"medicine_name": "Panadol", "count": 1, "latest_version": 0}]
+    assert data["uploads_per_day"] == {"2025-09-24": 1, "2025-09-25": 1}
+
+    # removing the latest version falls back to the next one; empty groups disappear
+    stats.remove(a3)
+    stats.remove({"medicine_name": "Panadol", "version": "oops"})
+    data = stats.to_dict()
+    assert data["medicines"] == [{"medicine_name": "Aspirin", "count": 1, "latest_version": 1}]
+    assert data["by_stage"]["PROCESSED"] == 0
+    assert data["uploads_per_day"] == {"2025-09-24": 1}
+
+
+def test_repository_keeps_stats_equal_to_a_rebuild(tmp_path: Path) -> None:
+    metadata = tmp_path / "metadata.json"
+    entries = catalogue.write_metadata(str(metadata), 200, seed=5)
+    repo = ImageMetadataRepository(str(metadata), Mock())
+    stats = repo.stats()
+
+    repo.append(dict(entries[0], id="new", medicine_name="Brand New", version=7))
+    repo.update_many({entries[1]["id"]: {"stage": "ARCHIVED"}, entries[2]["id"]: {"medicine_name": "Renamed"}})
+
+    # updated in place, not rebuilt
+    assert repo.stats() is stats
+    assert stats.to_dict() == CatalogueStats.from_entries(repo.iter_all()).to_dict()
+
+    # another worker's write is picked up through the generation
+    metadata.write_text(json.dumps(entries[:3]), encoding="utf-8")
+    assert repo.stats().total == 3
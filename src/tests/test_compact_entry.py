@@ -0,0 +1,52 @@
+from app.models.compact_entry import CompactEntry
+
+
+def _entry(**overrides) -> dict:
+    entry = {
+        "id": "abc", "original_name": "IMG_1.png", "stored_name": "ab/cd/abc.png", "url": "/uploads/ab/cd/abc.png",
+        "size": 1234, "content_type": "image/png", "uploaded_at": "2025-01-01T00:00:00+00:00Z",
+        "medicine_name": "Aspirin", "version": 2, "stage": "PROCESSED", "form": "tablet",
+        "substance": "acetylsalicylic acid", "phash": "00ff00ff00ff00ff",
+    }
+    entry.update(overrides)
+    return entry
+
+
+def test_round_trip_keeps_keys_order_and_unknown_fields() -> None:
+    data = _entry(duplicate_of="orig", duplicate_distance=3)
+
+    restored = CompactEntry.from_dict(data).to_dict()
+
+    assert restored == data
+    assert list(restored) == list(data)
+
+
+def test_absent_fields_stay_absent_and_custom_urls_are_kept() -> None:
+    data = {"id": "x", "stored_name": "x.png", "url": "https://cdn.example.com/x.png"}
+
+    assert CompactEntry.from_dict(data).to_dict() == data
+    assert CompactEntry.from_dict({"id": 1}).to_dict() == {"id": 1}
+
+
+def test_repeated_values_are_shared_between_entries() -> None:
+    # distinct string objects, as json parsing produces them
+    first = CompactEntry.from_dict(_entry(medicine_name="".join(["Asp", "irin"])))
+    second = CompactEntry.from_dict(_entry(medicine_name="".join(["Aspi", "rin"])))
+
+    assert first.medicine_name is second.medicine_name
+    assert not hasattr(first, "__dict__")
+
+
+def test_explicit_nulls_and_key_order_survive_the_round_trip() -> None:
+    # a partial analysis stores nulls; a later write appended "model" after "revision"
+    data = {"id": "p", "stored_name": "p.png", "url": "/uploads/p.png", "form": None, "substance": None,
+            "revision": 3, "model": "gemini-2.5-flash", "possible_duplicate_of": None}
+
+    entry = CompactEntry.from_dict(data)
+    restored = entry.to_dict()
+
+    assert restored == data
+    assert list(restored) == list(data)
+    assert (entry.form, entry.model) == (None, "gemini-2.5-flash")
+    # the common case keeps no per-entry layout
+    assert CompactEntry.from_dict(_entry()).extra is None
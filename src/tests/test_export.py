@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+import tarfile
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.routes import api
+
+
+def _entry(n: int, **fields) -> dict:
+    entry = {"id": f"id{n}", "original_name": f"IMG_{n}.png", "stored_name": f"aa/bb/{n}.png", "url": f"/uploads/aa/bb/{n}.png",
+             "size": 4, "content_type": "image/png", "uploaded_at": f"2025-03-0{n}T10:00:00+00:00Z",
+             "medicine_name": "Aspirin", "version": n, "stage": "UPLOADED"}
+    entry.update(fields)
+    return entry
+
+
+@pytest.fixture()
+def setup(client: TestClient, app_config):
+    upload_dir = Path(app_config.UPLOAD_DIR)
+    (upload_dir / "aa" / "bb").mkdir(parents=True)
+    for n in (1, 2, 3):
+        (upload_dir / "aa" / "bb" / f"{n}.png").write_bytes(bytes([n]) * (600 * n))
+    Path(app_config.METADATA_FILE).write_text(json.dumps([
+        _entry(1, revision=1), _entry(2, medicine_name="Panadol", stage="PROCESSED", duplicate_of="id1", revision=2)]))
+    # the repository the export routes read from
+    return client, api.get_repo(api.get_fs())
+
+
+def test_metadata_export_filters_and_resumes_from_revision(setup) -> None:
+    client, repo = setup
+
+    first = client.get("/api/export/metadata")
+    assert [json.loads(line)["id"] for line in first.text.splitlines()] == ["id1", "id2"]
+    revision = int(first.headers["X-Catalogue-Revision"])
+
+    repo.append(_entry(3))
+    repo.update_many({"id1": {"stage": "PROCESSED"}})
+
+    delta = client.get("/api/export/metadata", params={"since_revision": revision + 1})
+    assert [json.loads(line)["id"] for line in delta.text.splitlines()] == ["id1"]
+    delta = client.get("/api/export/metadata", params={"since_revision": revision})
+    assert [json.loads(line)["id"] for line in delta.text.splitlines()] == ["id1", "id3"]
+    latest = int(delta.headers["X-Catalogue-Revision"])
+    assert client.get("/api/export/metadata", params={"since_revision": latest}).text == ""
+
+    dated = client.get("/api/export/metadata", params={"uploaded_from": "2025-03-02", "uploaded_to": "2025-03-03",
+                                                         "stage": "processed"})
+    assert [json.loads(line)["id"] for line in dated.text.splitlines()] == ["id2"]
+    assert client.get("/api/export/metadata", params={"uploaded_from": "yesterday"}).status_code == 400
+
+
+def test_metadata_export_filters_by_every_stage(setup) -> None:
+    client, repo = setup
+    repo.append(_entry(3, stage="APPROVAL_WAITING"))
+
+    waiting = client.get("/api/export/metadata", params={"stage": "approval_waiting"})
+    assert [json.loads(line)["id"] for line in waiting.text.splitlines()] == ["id3"]
+    assert client.get("/api/export/metadata", params={"stage": "BOGUS"}).status_code == 400
+
+
+def test_csv_export_has_fixed_columns(setup) -> None:
+    client, _ = setup
+
+    response = client.get("/api/export/metadata", params={"format": "csv", "q": "pana"})
+
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(r["id"], r["medicine_name"], r["stage"]) for r in rows] == [("id2", "Panadol", "PROCESSED")]
+    assert "duplicate_of" not in rows[0]
+
+
+def test_tar_export_streams_files_and_skips_missing(setup) -> None:
+    client, repo = setup
+    repo.append(_entry(4, stored_name="aa/bb/gone.png"))
+
+    response = client.get("/api/export/images.tar")
+
+    with tarfile.open(fileobj=io.BytesIO(response.content)) as archive:
+        members = {m.name: archive.extractfile(m).read() for m in archive.getmembers()}
+    assert members == {"aa/bb/1.png": b"\x01" * 600, "aa/bb/2.png": b"\x02" * 1200}
@@ -1,3 +1,4 @@
+import io
 import json
 from pathlib import Path
 from unittest.mock import Mock
@@ -64,3 +65,17 @@ def test_file_size_returns_actual_bytes(fs: FileSystem, tmp_path: Path) -> None:
 
     size = fs.file_size(str(p))
     assert size == len(data)
+
+
+def test_backend_receives_stream_under_relative_key(tmp_path: Path) -> None:
+    backend = Mock()
+    backend.size.return_value = 42
+    fs = FileSystem(backend=backend, root=str(tmp_path))
+    file = FileStorage(stream=io.BytesIO(b"png"), filename="a.png", content_type="image/png")
+
+    fs.save_file(file, str(tmp_path / "abc.png"))
+
+    backend.save.assert_called_once_with("abc.png", file.stream, "image/png")
+    assert fs.file_size(str(tmp_path / "abc.png")) == 42
+    backend.size.assert_called_once_with("abc.png")
+    assert not (tmp_path / "abc.png").exists()
@@ -1,11 +1,12 @@
 import json
+import threading
 from pathlib import Path
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import pytest
 
 from app.config import AppConfig
-from app.repository.image_repository import ImageMetadataRepository
+from app.repository.image_repository import ImageMetadataRepository, PreconditionFailed
 
 
 @pytest.fixture()
@@ -64,7 +65,206 @@ def test_append_loads_appends_and_saves(tmp_metadata_file: Path) -> None:
 
     # final content should include both entries
     content = tmp_metadata_file.read_text(encoding="utf-8")
-    assert json.loads(content) == [{"id": 1}, {"id": 2}]
+    assert json.loads(content) == [{"id": 1}, {"id": 2, "revision": 1}]
 
     # append uses load_all once, which should ensure storage
     fs.ensure_storage.assert_called_once_with(AppConfig.UPLOAD_DIR, str(tmp_metadata_file))
+
+
+def test_generation_changes_on_save_and_external_write(tmp_metadata_file: Path) -> None:
+    repo = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+
+    g1 = repo.generation
+    # stable while nothing changes
+    assert repo.generation == g1
+
+    repo.save_all([{"id": 1}])
+    g2 = repo.generation
+    assert g2 > g1
+
+    # another worker rewrites the file (different size) -> detected via stat
+    tmp_metadata_file.write_text(json.dumps([{"id": 1}, {"id": 2}]), encoding="utf-8")
+    assert repo.generation > g2
+
+
+def test_update_many_patches_entries_by_id(tmp_metadata_file: Path) -> None:
+    tmp_metadata_file.write_text(json.dumps([{"id": "a", "stage": "UPLOADED"}, {"id": "b", "stage": "UPLOADED"}]), encoding="utf-8")
+    repo = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+
+    changed = repo.update_many({"b": {"stage": "PROCESSED"}, "missing": {"stage": "ARCHIVED"}})
+
+    assert changed == 1
+    assert json.loads(tmp_metadata_file.read_text(encoding="utf-8")) == [
+        {"id": "a", "stage": "UPLOADED"}, {"id": "b", "stage": "PROCESSED", "revision": 1}]
+
+    # fields listed in `expect` are only set on entries that still have the expected value
+    assert repo.update_many({"a": {"stage": "ARCHIVED", "model": "m"}, "b": {"stage": "ARCHIVED", "model": "m"}},
+                            expect={"stage": "UPLOADED"}) == 2
+    assert [(e["stage"], e["model"]) for e in repo.load_all()] == [("ARCHIVED", "m"), ("PROCESSED", "m")]
+
+
+def test_update_many_stamps_a_revision_above_patches_racing_its_scan(tmp_metadata_file: Path) -> None:
+    tmp_metadata_file.write_text(json.dumps([{"id": "a"}, {"id": "b"}]), encoding="utf-8")
+    repo = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+    other = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+    iter_all = repo.iter_all
+    scans = []
+
+    def racing_iter_all():
+        # another worker patches right after update_many's first pass over the file
+        try:
+            yield from iter_all()
+        finally:
+            scans.append(1)
+            if len(scans) == 1:
+                other.patch("a", {"stage": "PROCESSED"})
+
+    with patch.object(repo, "iter_all", racing_iter_all):
+        assert repo.update_many({"b": {"stage": "ARCHIVED"}}) == 1
+
+    assert [(e["id"], e.get("stage"), e["revision"]) for e in repo.load_all()] \
+        == [("a", "PROCESSED", 1), ("b", "ARCHIVED", 2)]
+
+
+def test_entries_snapshot_is_reused_and_extended_on_append(tmp_metadata_file: Path) -> None:
+    tmp_metadata_file.write_text(json.dumps([{"id": "a", "medicine_name": "Aspirin"}]), encoding="utf-8")
+    repo = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+
+    first = repo.entries()
+    assert repo.entries() is first
+
+    repo.append({"id": "b", "medicine_name": "Panadol"})
+    after_append = repo.entries()
+
+    assert [e.id for e in after_append] == ["a", "b"]
+    # readers holding the previous snapshot are unaffected
+    assert [e.id for e in first] == ["a"]
+
+    repo.save_all([{"id": "c"}])
+    assert [e.id for e in repo.entries()] == ["c"]
+
+
+def test_iter_all_streams_entries_and_writes_stream_through(tmp_metadata_file: Path) -> None:
+    entries = [{"id": str(i), "medicine_name": "Aspirin", "revision": i} for i in range(50)]
+    tmp_metadata_file.write_text(json.dumps(entries, indent=2), encoding="utf-8")
+    fs = Mock()
+    repo = ImageMetadataRepository(str(tmp_metadata_file), fs)
+
+    assert list(repo.iter_all()) == entries
+    fs.ensure_storage.assert_called_once_with(AppConfig.UPLOAD_DIR, str(tmp_metadata_file))
+
+    # save_all consumes a generator without materializing it
+    repo.save_all(e for e in repo.iter_all() if int(e["id"]) % 2 == 0)
+    assert [e["id"] for e in repo.load_all()] == [str(i) for i in range(0, 50, 2)]
+
+    # writes stamp one above the highest revision found while streaming
+    assert repo.update_many({"48": {"stage": "PROCESSED"}, "missing": {"stage": "ARCHIVED"}}) == 1
+    assert repo.update_many({"missing": {"stage": "ARCHIVED"}}) == 0
+    repo.append({"id": "new"})
+    assert [(e["id"], e["revision"]) for e in repo.load_all()[-2:]] == [("48", 49), ("new", 50)]
+
+
+def test_patch_journals_one_entry_and_other_workers_catch_up(tmp_metadata_file: Path) -> None:
+    entries = [{"id": str(i), "medicine_name": "Aspirin", "stage": "UPLOADED", "revision": i} for i in range(20)]
+    tmp_metadata_file.write_text(json.dumps(entries), encoding="utf-8")
+    repo = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+    other = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+    seen_by_other = other.entries()
+    other_stats = other.stats()
+    before = tmp_metadata_file.read_bytes()
+
+    updated = repo.patch("7", {"stage": "PROCESSED"})
+
+    assert (updated.id, updated.stage, updated.revision) == ("7", "PROCESSED", 20)
+    assert repo.get("7") is updated
+    assert repo.patch("missing", {"stage": "ARCHIVED"}) is None
+    # metadata.json itself is untouched; readers apply the journal over it
+    assert tmp_metadata_file.read_bytes() == before
+    assert next(e for e in repo.load_all() if e["id"] == "7")["stage"] == "PROCESSED"
+    assert [e["stage"] for e in repo.iter_all()].count("PROCESSED") == 1
+
+    # the other worker applies the new journal line to its snapshot and aggregates instead of reloading
+    assert other.get("7").stage == "PROCESSED"
+    assert other.entries() is seen_by_other and other.patched_positions() == [7]
+    assert other.stats() is other_stats and other_stats.stage_counts()["PROCESSED"] == 1
+    assert other.patch("8", {"stage": "ARCHIVED"}).revision == 21
+
+    # a full rewrite folds the journal in and empties it
+    repo.append({"id": "new"})
+    assert Path(f"{tmp_metadata_file}.patches").stat().st_size == 0
+    stored = {e["id"]: e for e in json.loads(tmp_metadata_file.read_text())}
+    assert (stored["7"]["stage"], stored["8"]["stage"], stored["new"]["revision"]) == ("PROCESSED", "ARCHIVED", 22)
+    assert repo.get("new").revision == 22 and other.get("new").id == "new"
+
+
+def test_patch_compacts_the_journal_and_skips_torn_lines(tmp_metadata_file: Path) -> None:
+    tmp_metadata_file.write_text(json.dumps([{"id": "a"}, {"id": "b"}]), encoding="utf-8")
+    journal = Path(f"{tmp_metadata_file}.patches")
+    # a writer died mid-line
+    journal.write_bytes(b'{"id": "a", "set": {"stage": "ARCH')
+    repo = ImageMetadataRepository(str(tmp_metadata_file), Mock(), journal_max_bytes=120)
+
+    repo.patch("b", {"stage": "PROCESSED"})
+    assert [e.get("stage") for e in repo.load_all()] == [None, "PROCESSED"]
+    assert journal.read_bytes().count(b"\n") == 2
+
+    # past journal_max_bytes the journal is folded into metadata.json
+    repo.patch("a", {"medicine_name": "Aspirin"})
+    assert journal.stat().st_size == 0
+    assert [(e["id"], e.get("medicine_name"), e.get("stage")) for e in json.loads(tmp_metadata_file.read_text())] \
+        == [("a", "Aspirin", None), ("b", None, "PROCESSED")]
+
+
+def test_patch_precondition_sees_changes_made_by_other_workers(tmp_metadata_file: Path) -> None:
+    tmp_metadata_file.write_text(json.dumps([{"id": "a", "stage": "UPLOADED"}]), encoding="utf-8")
+    repo = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+    other = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+    assert repo.get("a").stage == other.get("a").stage == "UPLOADED"
+
+    other.patch("a", {"stage": "PROCESSED"})
+
+    # repo's snapshot is stale, but the precondition runs on the entry as of the lock
+    with pytest.raises(PreconditionFailed):
+        repo.patch("a", {"stage": "ARCHIVED"}, precondition=lambda entry: entry.stage == "UPLOADED")
+    assert [e["stage"] for e in repo.load_all()] == ["PROCESSED"]
+    assert repo.patch("a", {"stage": "ARCHIVED"}, precondition=lambda entry: entry.stage == "PROCESSED").stage == "ARCHIVED"
+
+
+def test_readers_on_other_threads_wait_for_a_patch_in_progress(tmp_metadata_file: Path) -> None:
+    tmp_metadata_file.write_text(json.dumps([{"id": "a", "stage": "UPLOADED"}]), encoding="utf-8")
+    repo = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+    seen: list[str] = []
+    reader = threading.Thread(target=lambda: seen.append(repo.get("a").stage))
+
+    def precondition(entry) -> bool:
+        # Runs inside patch(); a reader on another thread must not see the snapshot half updated
+        reader.start()
+        reader.join(0.2)
+        return reader.is_alive()
+
+    repo.patch("a", {"stage": "PROCESSED"}, precondition=precondition)
+    reader.join(5)
+
+    assert seen == ["PROCESSED"]
+    assert repo.stats().stage_counts()["PROCESSED"] == 1
+
+
+def test_patch_builds_callable_fields_from_the_entry_and_stats_under_the_lock(tmp_metadata_file: Path) -> None:
+    tmp_metadata_file.write_text(json.dumps([{"id": "a", "medicine_name": "Aspirin", "version": 1}]), encoding="utf-8")
+    repo = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+    other = ImageMetadataRepository(str(tmp_metadata_file), Mock())
+    assert repo.stats().latest_version("Panadol") == 0
+
+    # another worker renames to the same medicine after repo last read its aggregates
+    other.patch("a", {"medicine_name": "Panadol", "version": 1})
+    other.append({"id": "b", "medicine_name": "Aspirin", "version": 1})
+
+    def rename(entry, stats) -> dict:
+        return {"medicine_name": "Panadol", "version": stats.latest_version("Panadol") + 1} \
+            if entry.medicine_name != "Panadol" else {}
+
+    assert (repo.patch("b", rename).version, repo.get("a").version) == (2, 1)
+    # nothing to change: the entry is returned as it is and no journal line is written
+    journal = Path(f"{tmp_metadata_file}.patches").read_bytes()
+    assert repo.patch("a", rename).version == 1
+    assert Path(f"{tmp_metadata_file}.patches").read_bytes() == journal
@@ -1,3 +1,4 @@
+import io
 import os
 from datetime import datetime
 from unittest.mock import Mock, call
@@ -5,14 +6,41 @@ from unittest.mock import Mock, call
 import pytest
 from werkzeug.datastructures import FileStorage
 
+from app.models.compact_entry import CompactEntry
 from app.models.image_entry import Stage
+from app.repository.image_repository import PreconditionFailed
 from app.services.image_service import ImageService
+from app.services.perceptual_hash import dhash, to_hex
 
 
 @pytest.fixture()
 def mock_repo() -> Mock:
     repo = Mock()
     repo.load_all.return_value = []
+    # read paths use the compact snapshot of whatever load_all returns
+    repo.entries.side_effect = lambda: [CompactEntry.from_dict(e) for e in repo.load_all()]
+    repo.patched_positions.return_value = []
+
+    # single-entry reads and patches go to the same load_all data; `written` records what patch() stored
+    repo.written = []
+
+    def _get(image_id):
+        return next((CompactEntry.from_dict(e) for e in repo.load_all() if e.get('id') == image_id), None)
+
+    def _patch(image_id, fields, precondition=None):
+        entry = next((e for e in repo.load_all() if e.get('id') == image_id), None)
+        if entry is None:
+            return None
+        if precondition is not None and not precondition(CompactEntry.from_dict(entry)):
+            raise PreconditionFailed(image_id)
+        if callable(fields):
+            fields = fields(CompactEntry.from_dict(entry), repo.stats())
+        if fields:
+            entry.update(fields)
+            repo.written.append((image_id, dict(fields)))
+        return CompactEntry.from_dict(entry)
+    repo.get.side_effect = _get
+    repo.patch.side_effect = _patch
     return repo
 
 
@@ -30,6 +58,10 @@ def mock_fs(tmp_path) -> Mock:
         with open(path, 'wb') as f:
             f.write(b"data")
     fs.save_file.side_effect = _save_file
+    def _read_file(path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+    fs.read_file.side_effect = _read_file
     return fs
 
 
@@ -130,6 +162,8 @@ def test_save_upload_success(service: ImageService, mock_repo, mock_fs) -> None:
     # basic field assertions
     assert result['original_name'] == 'My_Photo.PNG'
     assert result['stored_name'] and result['stored_name'].lower().endswith('.png')
+    # sharded layout: ab/cd/<uuid>.png
+    assert result['stored_name'].count('/') == 2
     assert result['url'].startswith('/files/')
     assert result['content_type'] == 'image/png'
     assert result['medicine_name'] == 'Panadol'
@@ -172,32 +206,91 @@ def test_promote_stage_and_persist(service: ImageService, mock_repo) -> None:
     mock_repo.load_all.return_value = entries
 
     updated = service.promote_stage('1')
-    assert any(e['id'] == '1' and e['stage'] == Stage.PROCESSED.value for e in updated)
-    assert mock_repo.save_all.called
+    assert updated['id'] == '1' and updated['stage'] == Stage.PROCESSED.value
+    # only the one entry is written, never the whole catalogue
+    assert mock_repo.written == [('1', {'stage': Stage.PROCESSED.value})]
+    assert not mock_repo.save_all.called
 
     # promote processed to archived
-    mock_repo.save_all.reset_mock()
-    mock_repo.load_all.return_value = entries
-    updated2 = service.promote_stage('2')
-    assert any(e['id'] == '2' and e['stage'] == Stage.ARCHIVED.value for e in updated2)
-    assert mock_repo.save_all.called
+    assert service.promote_stage('2')['stage'] == Stage.ARCHIVED.value
 
     # archived stays archived
-    mock_repo.save_all.reset_mock()
-    mock_repo.load_all.return_value = entries
-    updated3 = service.promote_stage('3')
-    assert any(e['id'] == '3' and e['stage'] == Stage.ARCHIVED.value for e in updated3)
-    assert mock_repo.save_all.called
+    assert service.promote_stage('3')['stage'] == Stage.ARCHIVED.value
 
 
 def test_promote_stage_id_not_found_no_persist(service: ImageService, mock_repo) -> None:
-    entries = [
-        {'id': '1'},  # missing stage -> defaults on return
-    ]
-    mock_repo.load_all.return_value = entries
+    mock_repo.load_all.return_value = [{'id': '1'}]  # missing stage -> defaults on return
 
-    updated = service.promote_stage('nope')
-    # no save_all
+    assert service.promote_stage('nope') is None
+    assert not mock_repo.patch.called
     assert not mock_repo.save_all.called
     # default stage applied on return
-    assert updated[0]['stage'] == Stage.UPLOADED
+    assert service.get_image('1')['stage'] == Stage.UPLOADED
+
+
+def test_promote_stage_accepts_plain_string_stage_from_json(service: ImageService, mock_repo) -> None:
+    # entries loaded from metadata.json carry the stage as a plain string; a missing one means UPLOADED
+    mock_repo.load_all.return_value = [{'id': '1', 'stage': 'UPLOADED'}, {'id': '2'}]
+
+    assert service.promote_stage('1')['stage'] == Stage.PROCESSED.value
+    assert service.promote_stage('2')['stage'] == Stage.PROCESSED.value
+
+
+def test_update_image_renames_to_next_version(service: ImageService, mock_repo) -> None:
+    mock_repo.load_all.return_value = [{'id': '1', 'medicine_name': 'Aspirin', 'version': 1}]
+    mock_repo.stats.return_value.latest_version.return_value = 4
+
+    updated = service.update_image('1', medicine_name=' Panadol ')
+
+    assert (updated['medicine_name'], updated['version']) == ('Panadol', 5)
+    mock_repo.stats.return_value.latest_version.assert_called_once_with('Panadol')
+    # the same name again is not a rename
+    mock_repo.written.clear()
+    assert service.update_image('1', medicine_name='Panadol')['version'] == 5
+    assert mock_repo.written == []
+    # nor is a change of casing: the name is stored as given but keeps its version
+    recased = service.update_image('1', medicine_name='PANADOL')
+    assert (recased['medicine_name'], recased['version']) == ('PANADOL', 5)
+    assert mock_repo.written == [('1', {'medicine_name': 'PANADOL'})]
+    with pytest.raises(ValueError, match='Medicine name is required'):
+        service.update_image('1', medicine_name='  ')
+
+
+def _png_bytes(shade: int) -> bytes:
+    Image = pytest.importorskip("PIL.Image")
+    img = Image.new('RGB', (64, 64), (shade, shade, shade))
+    # a diagonal edge gives the hash some structure
+    for i in range(64):
+        img.putpixel((i, i), (255 - shade, 0, 0))
+    buf = io.BytesIO()
+    img.save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def test_save_upload_reuses_analysis_of_near_duplicate(tmp_path, mock_repo, mock_fs, mock_validator) -> None:
+    content = _png_bytes(120)
+
+    def _save_file(file: FileStorage, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+    mock_fs.save_file.side_effect = _save_file
+    analyzer = Mock()
+    service = ImageService(upload_dir=str(tmp_path), repo=mock_repo, fs=mock_fs, validator=mock_validator, analyzer=analyzer)
+
+    mock_repo.load_all.return_value = [{
+        'id': 'orig', 'medicine_name': 'Algoflex', 'version': 3, 'stage': Stage.PROCESSED.value,
+        'form': 'tablet', 'substance': 'ibuprofen', 'phash': to_hex(dhash(content)),
+    }]
+
+    result = service.save_upload(DummyFile('retake.png'), lambda name: name, 'whatever')
+
+    # Gemini isn't called again; analysis and version come from the original
+    analyzer.analyze_image.assert_not_called()
+    assert result['medicine_name'] == 'Algoflex'
+    assert result['form'] == 'tablet' and result['substance'] == 'ibuprofen'
+    assert result['version'] == 3
+    assert result['duplicate_of'] == 'orig'
+    assert result['phash'] == to_hex(dhash(content))
+    # the original is looked up by id, not by scanning the catalogue
+    mock_repo.get.assert_called_with('orig')
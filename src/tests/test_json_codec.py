@@ -0,0 +1,92 @@
+import io
+import json
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from app.config import AppConfig
+from app.json_codec import (
+    CodecJSONResponse,
+    available_codecs,
+    codec_by_name,
+    get_codec,
+    iter_json_array,
+    iter_ndjson,
+    write_json_array,
+)
+from app.repository.image_repository import ImageMetadataRepository
+
+AVAILABLE = available_codecs()
+ENTRIES = [{"id": "a", "medicine_name": "Algoflex Forte", "size": 12, "version": 1, "stage": "UPLOADED",
+            "form": None, "substance": "ibuprofén"}]
+
+
+@pytest.mark.parametrize("name", AVAILABLE)
+def test_codecs_round_trip_and_match_stdlib(name: str) -> None:
+    codec = codec_by_name(name)
+
+    assert json.loads(codec.dumps(ENTRIES)) == ENTRIES
+    assert codec.loads(codec.dumps(ENTRIES, indent=True)) == ENTRIES
+    assert b"\n  " in codec.dumps(ENTRIES, indent=True)
+
+    buffer = io.BytesIO()
+    codec.dump(ENTRIES, buffer, indent=True)
+    buffer.seek(0)
+    assert codec.load(buffer) == ENTRIES
+
+
+@pytest.mark.parametrize("name", AVAILABLE)
+def test_repository_file_is_portable_across_codecs(name: str, tmp_path: Path) -> None:
+    metadata = tmp_path / "metadata.json"
+    metadata.write_text("[]", encoding="utf-8")
+    ImageMetadataRepository(str(metadata), Mock(), codec=codec_by_name(name)).save_all(ENTRIES)
+
+    # the stdlib reader (the default) understands what a fast codec wrote
+    assert ImageMetadataRepository(str(metadata), Mock(), codec=codec_by_name("stdlib")).load_all() == ENTRIES
+
+
+def test_unknown_codec_is_rejected_and_setting_is_followed(monkeypatch: pytest.MonkeyPatch) -> None:
+    with pytest.raises(ValueError):
+        codec_by_name("yaml")
+
+    monkeypatch.setattr(AppConfig, "JSON_CODEC", AVAILABLE[-1])
+    assert get_codec().name == AVAILABLE[-1]
+    assert json.loads(CodecJSONResponse(ENTRIES).body) == ENTRIES
+
+
+def test_iter_ndjson_batches_lines_into_chunks() -> None:
+    items = [{"id": i} for i in range(10)]
+
+    chunks = list(iter_ndjson(items, chunk_bytes=20))
+
+    assert 1 < len(chunks) < len(items)
+    assert all(chunk.endswith(b"\n") for chunk in chunks)
+    assert [json.loads(line) for line in b"".join(chunks).splitlines()] == items
+    assert list(iter_ndjson([])) == []
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 3, 64 * 1024])
+def test_iter_json_array_streams_elements_across_chunk_boundaries(chunk_bytes: int) -> None:
+    # brackets and quotes inside strings, multi-byte characters and numbers split by a boundary
+    items = ENTRIES + [{"name": "x]\"},[", "tags": [1, -0.5, 2.5e3, None, True]}, "héllo 😀", 12345, [], {}, False]
+    for document in (json.dumps(items), json.dumps(items, indent=2)):
+        assert list(iter_json_array(io.BytesIO(document.encode("utf-8")), chunk_bytes)) == items
+
+    assert list(iter_json_array(io.BytesIO(b" [ ] "))) == []
+    for broken in (b'{"id": "a"}', b"[1, 2", b"[1 2]", b""):
+        with pytest.raises(ValueError):
+            list(iter_json_array(io.BytesIO(broken), chunk_bytes))
+
+
+@pytest.mark.parametrize("name", AVAILABLE)
+def test_write_json_array_matches_indented_dump(name: str) -> None:
+    codec = codec_by_name(name)
+    for items in (ENTRIES * 3, []):
+        expected = io.BytesIO()
+        codec.dump(items, expected, indent=True)
+        streamed = io.BytesIO()
+
+        write_json_array(iter(items), streamed, codec)
+
+        assert streamed.getvalue() == expected.getvalue()
@@ -0,0 +1,38 @@
+import asyncio
+
+from benchmarks.fakes import FakePackagePhotoAnalyzer
+from benchmarks.loadtest import LoadTestConfig, ScenarioStats, run_load_test
+
+
+def test_fake_analyzer_rates_are_configurable() -> None:
+    always_invalid = FakePackagePhotoAnalyzer(invalid_rate=1.0, seed=1)
+    always_error = FakePackagePhotoAnalyzer(error_rate=1.0, seed=1)
+    healthy = FakePackagePhotoAnalyzer(seed=1)
+
+    assert always_invalid.analyze_image(b'x', 'image/png')[0] is False
+    assert always_error.analyze_image(b'x', 'image/png') == (None, None, None, None)
+    valid, med, form, substance = healthy.analyze_image(b'x', 'image/png')
+    assert valid is True and med and form and substance
+
+
+def test_percentiles_use_nearest_rank() -> None:
+    stats = ScenarioStats(latencies_ms=[float(i) for i in range(1, 101)])
+
+    assert stats.percentile(50) == 50.0
+    assert stats.percentile(95) == 95.0
+    assert stats.percentile(99) == 99.0
+
+
+def test_mixed_scenarios_run_end_to_end_without_errors() -> None:
+    config = LoadTestConfig(requests=40, concurrency=4, seed_entries=25, analyzer_latency_s=0.0,
+                            error_rate=0.0, invalid_rate=0.0)
+
+    report = asyncio.run(run_load_test(config))
+
+    assert sum(len(s.latencies_ms) for s in report.stats.values()) == 40
+    assert set(report.stats) == {'upload', 'list', 'filter', 'promote'}
+    # authenticated uploads succeed and nothing fails server side
+    assert report.stats['upload'].rejected == 0
+    assert report.violations({}) == []
+    # an impossible gate is reported
+    assert report.violations({'list': {'p50': -1}})
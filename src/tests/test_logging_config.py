@@ -0,0 +1,90 @@
+import io
+import json
+import logging
+import random
+
+from app import logging_config
+from app.logging_config import (
+    JsonFormatter,
+    SamplingFilter,
+    build_handler,
+    parse_sampling,
+)
+
+
+def _record(name: str = 'app.routes.web', level: int = logging.INFO, msg: str = 'hello %s', args=('world',)) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_json_formatter_includes_request_id_and_duration() -> None:
+    record = _record()
+    record.request_id = 'abc123'
+    record.duration_ms = 12.5
+
+    doc = json.loads(JsonFormatter().format(record))
+
+    assert doc['message'] == 'hello world'
+    assert doc['level'] == 'INFO' and doc['logger'] == 'app.routes.web'
+    assert doc['request_id'] == 'abc123' and doc['duration_ms'] == 12.5
+
+
+def test_sampling_filter_uses_most_specific_prefix_and_keeps_warnings() -> None:
+    sampler = SamplingFilter({'app': 1.0, 'app.routes': 0.0}, rng=random.Random(1))
+
+    assert not sampler.filter(_record('app.routes.web'))
+    assert sampler.filter(_record('app.services.image_service'))
+    assert sampler.filter(_record('app.routes.web', level=logging.WARNING))
+    assert sampler.filter(_record('uvicorn'))
+
+
+def test_parse_sampling_clamps_and_skips_invalid_parts() -> None:
+    assert parse_sampling('app.routes.web=0.1, httpx=0,bad,x=abc,y=5') == {'app.routes.web': 0.1, 'httpx': 0.0, 'y': 1.0}
+
+
+def test_queue_mode_writes_json_lines_from_listener_thread() -> None:
+    stream = io.StringIO()
+    handler, listener = build_handler(stream, mode='queue', json_lines=True, sampling='test.queue.noisy=0')
+    logger = logging.getLogger('test.queue')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        args = ['before']
+        logger.info('state %s', args)
+        args.append('after')  # mutating args after the call must not leak into the line
+        logging.getLogger('test.queue.noisy').info('dropped')
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            logger.exception('failed')
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line['message'] for line in lines] == ["state ['before']", 'failed']
+    assert 'ValueError: boom' in lines[1]['exc_info']
+    assert 'request_id' not in lines[0]
+
+
+def test_queue_mode_replaces_root_handlers_so_records_print_once(monkeypatch, capsys) -> None:
+    monkeypatch.setattr(logging_config, 'LOG_MODE', 'queue')
+    monkeypatch.setattr(logging_config, 'LOG_FORMAT', '%(levelname)s %(message)s')
+    root = logging.getLogger()
+    console = logging.StreamHandler()  # e.g. left by logging.basicConfig()
+    root.addHandler(console)
+    before, level = root.handlers[:], root.level
+    try:
+        logging_config.configure_logging()
+        assert console not in root.handlers
+        logging.getLogger('test.root').warning('once')
+    finally:
+        logging_config.shutdown_logging()
+        # stopping the listener hands the root its handlers back
+        restored = root.handlers[:]
+        root.removeHandler(console)
+        root.setLevel(level)
+
+    assert restored == before
+    assert capsys.readouterr().err.splitlines().count('WARNING once') == 1
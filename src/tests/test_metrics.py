@@ -0,0 +1,39 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.observability.metrics import MetricsMiddleware, render_latest
+
+
+def _sample_count(route: str, status: str) -> float:
+    labels = {'method': 'GET', 'route': route, 'status': status}
+    return REGISTRY.get_sample_value('http_request_duration_seconds_count', labels) or 0.0
+
+
+def test_middleware_labels_by_route_template_not_raw_path() -> None:
+    router = APIRouter()
+
+    @router.get('/things/{thing_id}')
+    async def get_thing(thing_id: str):
+        return {'id': thing_id}
+
+    app = FastAPI()
+    app.include_router(router, prefix='/api')
+    app.add_middleware(MetricsMiddleware)
+    client = TestClient(app)
+
+    before = _sample_count('/api/things/{thing_id}', '200')
+    client.get('/api/things/1')
+    client.get('/api/things/2')
+
+    assert _sample_count('/api/things/{thing_id}', '200') == before + 2
+
+
+def test_render_latest_includes_catalogue_gauges() -> None:
+    payload, content_type = render_latest(lambda: {'UPLOADED': 3, 'ARCHIVED': 1})
+
+    text = payload.decode()
+    assert content_type.startswith('text/plain')
+    assert 'catalogue_entries{stage="UPLOADED"} 3.0' in text
+    assert 'catalogue_entries{stage="ARCHIVED"} 1.0' in text
+    assert 'http_request_duration_seconds' in text
@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app.repository.image_repository import ImageMetadataRepository
+from app.storage.filesystem import FileSystem
+from app.storage.layout import is_sharded, sharded_name
+from app.storage.migrate_layout import migrate_to_sharded
+
+
+@pytest.fixture()
+def catalogue(tmp_path: Path) -> ImageMetadataRepository:
+    entries = []
+    for i in range(5):
+        name = f"{i:032x}.png"
+        (tmp_path / name).write_bytes(f"img{i}".encode())
+        entries.append({"id": str(i), "stored_name": name, "url": f"/uploads/{name}"})
+    (tmp_path / "metadata.json").write_text(json.dumps(entries), encoding="utf-8")
+    return ImageMetadataRepository(str(tmp_path / "metadata.json"), FileSystem(root=str(tmp_path)))
+
+
+def test_sharded_name_is_stable_two_level_hex() -> None:
+    name = sharded_name("0123abcd.png")
+
+    assert name == sharded_name("xx/yy/0123abcd.png")
+    first, second, base = name.split("/")
+    assert base == "0123abcd.png" and len(first) == len(second) == 2
+    assert is_sharded(name) and not is_sharded(base)
+
+
+def test_migration_moves_files_and_rewrites_metadata_in_batches(catalogue: ImageMetadataRepository, tmp_path: Path) -> None:
+    stats = migrate_to_sharded(catalogue, FileSystem(root=str(tmp_path)), str(tmp_path), batch_size=2)
+
+    assert (stats.migrated, stats.batches, stats.missing) == (5, 3, 0)
+    for i, entry in enumerate(catalogue.load_all()):
+        assert entry["stored_name"] == sharded_name(f"{i:032x}.png")
+        assert entry["url"] == f"/uploads/{entry['stored_name']}"
+        assert (tmp_path / entry["stored_name"]).read_bytes() == f"img{i}".encode()
+        assert not (tmp_path / f"{i:032x}.png").exists()
+
+
+def test_migration_resumes_after_interruption(catalogue: ImageMetadataRepository, tmp_path: Path) -> None:
+    fs = FileSystem(root=str(tmp_path))
+    migrate_to_sharded(catalogue, fs, str(tmp_path), batch_size=2, limit=2)
+    # Simulate a crash after the metadata save but before the old file was deleted
+    first = catalogue.load_all()[0]["stored_name"]
+    (tmp_path / first.split("/")[-1]).write_bytes(b"img0")
+
+    stats = migrate_to_sharded(catalogue, fs, str(tmp_path), batch_size=2)
+
+    assert (stats.migrated, stats.cleaned) == (3, 1)
+    assert all(is_sharded(e["stored_name"]) for e in catalogue.load_all())
+    assert sorted(p.name for p in tmp_path.glob("*.png")) == []
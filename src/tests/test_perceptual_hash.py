@@ -0,0 +1,74 @@
+import io
+import random
+
+import pytest
+
+from app.services.perceptual_hash import (
+    PerceptualHashIndex,
+    dhash,
+    from_hex,
+    hamming,
+    to_hex,
+)
+
+Image = pytest.importorskip("PIL.Image")
+ImageEnhance = pytest.importorskip("PIL.ImageEnhance")
+
+
+def _gradient_photo(size=(120, 90), seed: int = 0) -> "Image.Image":
+    rnd = random.Random(seed)
+    img = Image.new('RGB', size)
+    # blocky random pattern so different seeds give different structure
+    for x in range(0, size[0], 10):
+        for y in range(0, size[1], 10):
+            colour = (rnd.randint(0, 255), rnd.randint(0, 255), rnd.randint(0, 255))
+            img.paste(colour, (x, y, x + 10, y + 10))
+    return img
+
+
+def _encode(img, fmt: str = 'PNG') -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, fmt)
+    return buf.getvalue()
+
+
+def test_dhash_is_stable_under_rescale_and_lighting() -> None:
+    original = _gradient_photo()
+    rescaled = original.resize((240, 180))
+    brighter = ImageEnhance.Brightness(original).enhance(1.15)
+
+    h = dhash(_encode(original))
+    assert h is not None
+    assert hamming(h, dhash(_encode(rescaled, 'JPEG'))) <= 6
+    assert hamming(h, dhash(_encode(brighter))) <= 6
+    # an unrelated photo is far away
+    assert hamming(h, dhash(_encode(_gradient_photo(seed=99)))) > 12
+
+
+def test_dhash_returns_none_for_undecodable_bytes() -> None:
+    assert dhash(b'not an image') is None
+
+
+def test_hex_round_trip() -> None:
+    assert from_hex(to_hex(0x0123456789abcdef)) == 0x0123456789abcdef
+    assert from_hex(None) is None
+    assert from_hex('zz') is None
+
+
+def test_index_matches_brute_force() -> None:
+    rnd = random.Random(3)
+    hashes = [rnd.getrandbits(64) for _ in range(2000)]
+    # plant near neighbours of a probe hash
+    probe = rnd.getrandbits(64)
+    hashes += [probe ^ (1 << 3), probe ^ 0b1011, probe ^ (0xF << 40) ^ 0b1]
+    index = PerceptualHashIndex()
+    index.add_all((str(i), h) for i, h in enumerate(hashes))
+
+    for max_distance in (0, 1, 4, 8):
+        expected = sorted(((str(i), hamming(h, probe)) for i, h in enumerate(hashes)
+                           if hamming(h, probe) <= max_distance), key=lambda m: (m[1], m[0]))
+        got = sorted(index.query(probe, max_distance), key=lambda m: (m[1], m[0]))
+        assert got == expected
+
+    assert index.nearest(probe, 4) == (str(2000), 1)
+    assert len(index) == 2003
@@ -0,0 +1,72 @@
+import pytest
+
+from app.services.render_cache import RenderCache
+
+
+@pytest.fixture()
+def cache() -> RenderCache:
+    return RenderCache(max_entries=3, max_bytes=100)
+
+
+def test_hit_after_miss_returns_cached_payload(cache: RenderCache) -> None:
+    calls = []
+
+    def render() -> bytes:
+        calls.append(1)
+        return b"<div>gallery</div>"
+
+    first = cache.get_or_render('gallery', ('asp', ''), 1, render)
+    second = cache.get_or_render('gallery', ('asp', ''), 1, render)
+
+    assert first == second == b"<div>gallery</div>"
+    # rendered only once
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
+
+
+def test_new_generation_invalidates_previous_entries(cache: RenderCache) -> None:
+    cache.get_or_render('gallery', ('', ''), 1, lambda: b"old")
+
+    payload = cache.get_or_render('gallery', ('', ''), 2, lambda: b"new")
+
+    assert payload == b"new"
+    # the old generation entry was dropped, only the fresh one remains
+    assert cache.stats()['entries'] == 1
+
+
+def test_stale_generation_render_is_not_stored(cache: RenderCache) -> None:
+    cache.get_or_render('gallery', ('', ''), 5, lambda: b"current")
+
+    # a slow request that started before the write renders with the older generation
+    cache.get_or_render('api', (), 4, lambda: b"stale")
+
+    assert cache.stats()['entries'] == 1
+
+
+def test_lru_eviction_by_entry_count(cache: RenderCache) -> None:
+    for q in ('a', 'b', 'c'):
+        cache.get_or_render('gallery', (q, ''), 1, lambda q=q: q.encode())
+    # touch 'a' so 'b' becomes least recently used
+    cache.get_or_render('gallery', ('a', ''), 1, lambda: b"unused")
+    cache.get_or_render('gallery', ('d', ''), 1, lambda: b"d")
+
+    stats = cache.stats()
+    assert stats['entries'] == 3
+    assert stats['evictions'] == 1
+    # 'b' must be rendered again
+    assert cache.get_or_render('gallery', ('b', ''), 1, lambda: b"b2") == b"b2"
+
+
+def test_memory_ceiling_is_enforced(cache: RenderCache) -> None:
+    cache.get_or_render('gallery', ('a', ''), 1, lambda: b"x" * 60)
+    cache.get_or_render('gallery', ('b', ''), 1, lambda: b"y" * 60)
+
+    stats = cache.stats()
+    assert stats['bytes'] <= 100
+    assert stats['entries'] == 1
+
+    # payloads larger than the whole budget are served but never stored
+    assert cache.get_or_render('gallery', ('c', ''), 1, lambda: b"z" * 200) == b"z" * 200
+    assert cache.stats()['bytes'] <= 100
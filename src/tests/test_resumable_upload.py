@@ -0,0 +1,130 @@
+import base64
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import AppConfig
+from app.routes import api
+from app.services.admission import AdmissionController, AdmissionLimits
+from app.services.resumable_upload import (
+    ResumableUploadStore,
+    UploadConflict,
+    UploadNotFound,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _metadata(**fields: str) -> str:
+    return ",".join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in fields.items())
+
+
+@pytest.fixture()
+def client(client: TestClient, tmp_path: Path, session_cookie) -> TestClient:
+    store = ResumableUploadStore(str(tmp_path / "staging"), max_size=1024 * 1024, ttl_s=3600)
+    client.app.dependency_overrides[api.get_upload_store] = lambda: store
+    client.cookies.set("session", session_cookie({"email": "field@example.com", "name": "Field"}))
+    return client
+
+
+def test_upload_resumes_after_a_dropped_chunk_and_creates_the_entry(client: TestClient, tmp_path: Path) -> None:
+    body = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40
+    created = client.post("/api/uploads", headers={
+        "Tus-Resumable": "1.0.0", "Upload-Length": str(len(body)),
+        "Upload-Metadata": _metadata(filename="box.png", filetype="image/png", medicine_name="Aspirin")})
+    assert created.status_code == 201
+    location = created.headers["Location"]
+    chunk = {"Tus-Resumable": "1.0.0", "Content-Type": "application/offset+octet-stream"}
+
+    first = client.patch(location, content=body[:4000], headers={**chunk, "Upload-Offset": "0"})
+    assert first.status_code == 204 and first.headers["Upload-Offset"] == "4000"
+
+    # a client that lost track resends from the start: rejected with the offset to resume from
+    stale = client.patch(location, content=body, headers={**chunk, "Upload-Offset": "0"})
+    assert stale.status_code == 409 and stale.headers["Upload-Offset"] == "4000"
+    assert client.head(location).headers["Upload-Offset"] == "4000"
+
+    done = client.patch(location, content=body[4000:], headers={**chunk, "Upload-Offset": "4000"})
+    assert done.status_code == 201
+    entry = done.json()
+    assert entry["medicine_name"] and entry["size"] == len(body)
+    assert (Path(AppConfig.UPLOAD_DIR) / entry["stored_name"]).read_bytes() == body
+
+    # the finished upload still answers HEAD with the entry it produced, but takes no more chunks
+    assert client.head(location).headers["X-Image-Id"] == entry["id"]
+    again = client.patch(location, content=b"", headers={**chunk, "Upload-Offset": str(len(body))})
+    assert again.status_code == 409
+    assert not list((tmp_path / "staging").glob("*.part"))
+
+
+def test_completing_chunk_is_admitted_for_the_declared_length(client: TestClient) -> None:
+    admission = AdmissionController(AdmissionLimits(max_backlog=1, retry_after_s=3))
+    client.app.dependency_overrides[api.get_admission_controller] = lambda: admission
+    body = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+    location = client.post("/api/uploads", headers={
+        "Upload-Length": str(len(body)), "Upload-Metadata": _metadata(filename="box.png", medicine_name="Aspirin")
+    }).headers["Location"]
+    chunk = {"Content-Type": "application/offset+octet-stream"}
+    busy = admission.admit("other@example.com", 1)
+
+    # the analysis backlog is full: the bytes are kept, the completion is shed
+    shed = client.patch(location, content=body, headers={**chunk, "Upload-Offset": "0"})
+    assert shed.status_code == 429 and shed.headers["Retry-After"] == "3"
+    assert shed.headers["Upload-Offset"] == str(len(body))
+
+    admission.release(busy)
+    done = client.patch(location, content=b"", headers={**chunk, "Upload-Offset": str(len(body))})
+    assert done.status_code == 201 and done.json()["size"] == len(body)
+
+
+def test_create_validates_before_any_bytes_are_sent(client: TestClient) -> None:
+    headers = {"Upload-Length": "10", "Upload-Metadata": _metadata(filename="notes.txt", medicine_name="Aspirin")}
+    assert client.post("/api/uploads", headers=headers).status_code == 400
+
+    headers = {"Upload-Length": str(2 * 1024 * 1024), "Upload-Metadata": _metadata(filename="a.png", medicine_name="A")}
+    assert client.post("/api/uploads", headers=headers).status_code == 413
+
+    client.cookies.clear()
+    headers = {"Upload-Length": "10", "Upload-Metadata": _metadata(filename="a.png", medicine_name="A")}
+    assert client.post("/api/uploads", headers=headers).status_code == 401
+
+
+def test_writer_keeps_received_bytes_and_sweeper_expires_idle_uploads(tmp_path: Path) -> None:
+    clock = Clock()
+    store = ResumableUploadStore(str(tmp_path), max_size=100, ttl_s=60, clock=clock)
+    info = store.create(10, "a.png", "image/png", "Aspirin", "u@example.com")
+
+    # the connection drops after the first piece of the chunk
+    with pytest.raises(ConnectionError):
+        with store.writer(info.id, 0) as write:
+            write(b"abcd")
+            raise ConnectionError
+    assert store.get(info.id).offset == 4
+
+    # a retry is refused while another request holds the upload
+    with store.writer(info.id, 4):
+        with pytest.raises(UploadConflict):
+            with store.writer(info.id, 4):
+                pass
+
+    idle = store.create(10, "b.png", "image/png", "Panadol", "u@example.com")
+    clock.now += 45
+    with store.writer(info.id, 4) as write:
+        write(b"ef")  # activity pushes the expiry out
+    clock.now += 30
+
+    assert store.sweep() == [idle.id]
+    with pytest.raises(UploadNotFound):
+        store.get(idle.id)
+
+    with store.writer(info.id, 6) as write:
+        write(b"ghij")
+    assert store.complete(info.id, lambda f: {"id": "entry-1", "bytes": f.read()}) == {"id": "entry-1", "bytes": b"abcdefghij"}
+    assert store.get(info.id).entry_id == "entry-1"
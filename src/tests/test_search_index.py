@@ -0,0 +1,88 @@
+from app.services.search_index import SearchIndex, fold, tokenize
+
+
+def _index(*rows) -> SearchIndex:
+    index = SearchIndex()
+    for position, row in enumerate(rows):
+        index.add(position, *row)
+    return index
+
+
+def test_fold_strips_accents_and_case() -> None:
+    assert fold("Ibuprofén SÝRUP") == "ibuprofen syrup"
+    assert tokenize("Aspirin-Forte 500mg") == ["aspirin", "forte", "500mg"]
+    assert tokenize(None) == []
+
+
+def test_search_matches_prefixes_across_fields_and_ranks_by_field() -> None:
+    index = _index(
+        ("Paracetamol", "paracetamol", "tablet"),   # 0: name + substance
+        ("Panadol", "paracetamol", "syrup"),         # 1: substance only
+        ("Aspirin", "acetylsalicylic acid", "tablet"),
+        ("Paracetamol", "paracetamol", "tablet"),   # 3: same group as 0, newer
+    )
+
+    assert index.search("paracetamol") == [3, 0, 1]
+    assert index.search("PARÁ") == [3, 0, 1]
+    assert index.search("para syr") == [1]
+    assert index.search("tablet asp") == [2]
+    assert index.search("missing") == []
+    assert index.search("   ") == []
+
+
+def test_whole_token_outranks_prefix_match() -> None:
+    index = _index(("Gel", None, None), ("Gelomyrtol", None, None))
+
+    assert index.search("gel") == [0, 1]
+    assert len(index) == 2
+
+
+def test_service_extends_index_on_append_and_rebuilds_on_rewrite(tmp_path) -> None:
+    from unittest.mock import Mock
+
+    from app.repository.image_repository import ImageMetadataRepository
+    from app.services.image_service import ImageService
+    from app.storage.filesystem import FileSystem
+
+    fs = FileSystem()
+    metadata = tmp_path / "metadata.json"
+    metadata.write_text("[]")
+    repo = ImageMetadataRepository(str(metadata), fs)
+    service = ImageService(upload_dir=str(tmp_path), repo=repo, fs=fs, validator=Mock(), analyzer=Mock())
+    repo.append({'id': 'a', 'medicine_name': 'Nurofen', 'substance': 'ibuprofen', 'form': 'tablet'})
+
+    assert [e['id'] for e in service.filter_images(search='ibu')] == ['a']
+    index = service._search_index
+
+    repo.append({'id': 'b', 'medicine_name': 'Ibuprofen', 'substance': 'ibuprofen', 'form': 'gel'})
+    assert [e['id'] for e in service.filter_images(search='ibu')] == ['b', 'a']
+    assert service._search_index is index and len(index) == 2
+
+    repo.update_many({'b': {'medicine_name': 'Dolgit'}})
+    assert [e['id'] for e in service.filter_images(search='dolg')] == ['b']
+    assert service._search_index is not index
+
+
+def test_service_reindexes_entries_patched_in_place(tmp_path) -> None:
+    from unittest.mock import Mock
+
+    from app.repository.image_repository import ImageMetadataRepository
+    from app.services.image_service import ImageService
+    from app.storage.filesystem import FileSystem
+
+    fs = FileSystem()
+    metadata = tmp_path / "metadata.json"
+    metadata.write_text('[{"id": "a", "medicine_name": "Nurofen"}, {"id": "b", "medicine_name": "Aspirin"}]')
+    repo = ImageMetadataRepository(str(metadata), fs)
+    other = ImageMetadataRepository(str(metadata), fs)
+    service = ImageService(upload_dir=str(tmp_path), repo=repo, fs=fs, validator=Mock(), analyzer=Mock())
+    assert [e['id'] for e in service.filter_images(search='nuro')] == ['a']
+    index = service._search_index
+
+    service.update_image('a', medicine_name='Dolgit')
+    # another worker's rename reaches this one through the journal
+    other.patch('b', {'medicine_name': 'Nurofen Forte'})
+
+    assert [e['id'] for e in service.filter_images(search='dolg')] == ['a']
+    assert [e['id'] for e in service.filter_images(search='nuro')] == ['b']
+    assert service._search_index is index and len(index) == 2
@@ -0,0 +1,60 @@
+import json
+import subprocess
+import sys
+
+from benchmarks.startup import SRC_DIR, _child_env, parse_importtime
+
+
+def test_parse_importtime_reads_depth_and_microseconds() -> None:
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |     json.decoder",
+        "import time:       300 |        420 |   json",
+        "import time:      1000 |       1420 | app.app",
+    ])
+
+    timings = parse_importtime(stderr)
+
+    assert [(t.module, t.depth) for t in timings] == [('json.decoder', 2), ('json', 1), ('app.app', 0)]
+    assert timings[-1].self_us == 1000 and timings[-1].cumulative_us == 1420
+
+
+def test_importing_app_defers_genai_and_oauth_until_used(tmp_path) -> None:
+    script = (
+        "import json, sys\n"
+        "from app.config import AppConfig\n"
+        # the app serves UPLOAD_DIR as soon as it is built; keep it out of the work tree
+        f"AppConfig.UPLOAD_DIR = {str(tmp_path)!r}\n"
+        f"AppConfig.METADATA_FILE = {str(tmp_path / 'metadata.json')!r}\n"
+        "import app.app\n"
+        "from app.routes.api import get_analyzer\n"
+        "analyzer = get_analyzer()\n"
+        "deferred = {m: m in sys.modules for m in ('google.genai', 'authlib.integrations.starlette_client')}\n"
+        "from app.services.auth import get_oauth\n"
+        "get_oauth()\n"
+        "print(json.dumps({'deferred': deferred, 'oauth': 'authlib.integrations.starlette_client' in sys.modules}))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=SRC_DIR, capture_output=True, text=True, check=True,
+                            env=_child_env({'GOOGLE_API_KEY': 'test-key'}))
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report['deferred'] == {'google.genai': False, 'authlib.integrations.starlette_client': False}
+    assert report['oauth'] is True
+
+
+def test_settings_read_at_import_honour_dotenv(tmp_path) -> None:
+    (tmp_path / '.env').write_text("GEMINI_MODEL=from-dotenv\nUPLOAD_LAYOUT=flat\n")
+    script = (
+        "import json\n"
+        "from app.config import AppConfig\n"
+        "from app.services.photo_analyzer import PackagePhotoAnalyzer\n"
+        "print(json.dumps({'layout': AppConfig.UPLOAD_LAYOUT, 'model': PackagePhotoAnalyzer().model_name}))\n"
+    )
+    env = _child_env()
+    for name in ('GEMINI_MODEL', 'UPLOAD_LAYOUT', 'GOOGLE_API_KEY'):
+        env.pop(name, None)
+    # `python -c` has no __main__ file, so load_dotenv looks for .env from the working directory
+    result = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, capture_output=True, text=True, check=True,
+                            env=env)
+
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == {'layout': 'flat', 'model': 'from-dotenv'}
@@ -0,0 +1,32 @@
+import os
+from pathlib import Path
+
+from app.templating import build_templates, stream_template
+from benchmarks import catalogue
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+
+def test_templates_are_compiled_at_build_and_reused_from_the_bytecode_cache(tmp_path: Path) -> None:
+    templates = build_templates(TEMPLATES_DIR, bytecode_cache_dir=str(tmp_path))
+
+    names = templates.env.list_templates()
+    assert {"_gallery.html", "index.html"} <= set(names)
+    # compiled into the environment's cache and written out for other workers
+    assert len(templates.env.cache) == len(names)
+    assert len(list(tmp_path.iterdir())) == len(names)
+
+    assert build_templates(TEMPLATES_DIR, bytecode_cache_dir="off").env.bytecode_cache is None
+
+
+def test_stream_template_yields_the_rendered_page_in_chunks(tmp_path: Path) -> None:
+    templates = build_templates(TEMPLATES_DIR, bytecode_cache_dir=str(tmp_path))
+    context = {"images": catalogue.generate(50)}
+    completed = []
+
+    chunks = list(stream_template(templates, "_gallery.html", context, on_complete=completed.append, chunk_chars=4096))
+
+    body = b"".join(chunks)
+    assert len(chunks) > 5 and all(chunks)
+    assert body == templates.get_template("_gallery.html").render(context).encode("utf-8")
+    assert completed == [body]
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from unittest.mock import Mock
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.observability.profiling import SlowRequestProfiler
+from app.observability.timing import (
+    PhaseTimer,
+    ServerTimingMiddleware,
+    current_request_id,
+    current_timer,
+    span,
+)
+
+
+def test_phase_timer_sums_repeated_phases() -> None:
+    timer = PhaseTimer()
+
+    with timer.phase('metadata_load'):
+        time.sleep(0.001)
+    with timer.phase('analyze'):
+        pass
+    with timer.phase('metadata_load'):
+        time.sleep(0.001)
+
+    phases = timer.phases
+    # insertion order is kept and the repeated phase is aggregated
+    assert list(phases) == ['metadata_load', 'analyze']
+    assert phases['metadata_load'] >= 2.0
+
+
+def test_server_timing_header_format() -> None:
+    timer = PhaseTimer()
+    with timer.phase('save_file'):
+        pass
+
+    header = timer.server_timing()
+
+    parts = [p.strip() for p in header.split(',')]
+    assert parts[0].startswith('save_file;dur=')
+    assert parts[-1].startswith('app;dur=')
+
+
+def test_span_is_noop_without_active_timer() -> None:
+    assert current_timer() is None
+    with span('anything'):
+        pass
+
+
+def test_middleware_adds_server_timing_header_with_spans() -> None:
+    app = FastAPI()
+
+    @app.post('/work')
+    async def work():
+        with span('save_file'):
+            pass
+        with span('analyze'):
+            pass
+        return {'ok': True}
+
+    app.add_middleware(ServerTimingMiddleware)
+    response = TestClient(app).post('/work')
+
+    header = response.headers['server-timing']
+    assert 'save_file;dur=' in header
+    assert 'analyze;dur=' in header
+    assert 'app;dur=' in header
+
+
+def test_middleware_dumps_profile_via_profiler_hook() -> None:
+    app = FastAPI()
+
+    @app.get('/slow')
+    async def slow():
+        return {'ok': True}
+
+    profiler = Mock()
+    app.add_middleware(ServerTimingMiddleware, profiler=profiler)
+    TestClient(app).get('/slow')
+
+    profiler.start.assert_called_once()
+    assert profiler.finish.call_count == 1
+    args = profiler.finish.call_args.args
+    assert args[1]['path'] == '/slow'
+
+
+def test_overlapping_requests_are_profiled_one_at_a_time(tmp_path) -> None:
+    app = FastAPI()
+    gate = asyncio.Event()
+
+    @app.get('/wait')
+    async def wait():
+        await gate.wait()
+        return {'ok': True}
+
+    @app.get('/go')
+    async def go():
+        gate.set()
+        return {'ok': True}
+
+    app.add_middleware(ServerTimingMiddleware, profiler=SlowRequestProfiler(0, str(tmp_path)))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            return await asyncio.gather(client.get('/wait'), client.get('/go'))
+
+    # the second request starts while the first is being profiled: it runs unprofiled instead of failing
+    assert [r.status_code for r in asyncio.run(run())] == [200, 200]
+    assert len(list(tmp_path.iterdir())) == 1
+    # and the slot is free again afterwards
+    profiler = SlowRequestProfiler(1e9, str(tmp_path))
+    profile = profiler.start()
+    assert profile is not None and profiler.start() is None
+    profiler.finish(profile, {'path': '/idle'}, 1.0)
+
+
+def test_middleware_sets_request_id_for_the_request() -> None:
+    app = FastAPI()
+
+    @app.get('/id')
+    async def request_id():
+        return {'request_id': current_request_id()}
+
+    app.add_middleware(ServerTimingMiddleware)
+    client = TestClient(app)
+
+    generated = client.get('/id')
+    assert generated.headers['x-request-id'] == generated.json()['request_id']
+    # a well-formed id from a proxy is kept; garbage is replaced
+    assert client.get('/id', headers={'X-Request-ID': 'edge-42'}).json()['request_id'] == 'edge-42'
+    assert client.get('/id', headers={'X-Request-ID': 'bad id\n'}).json()['request_id'] != 'bad id\n'
+    assert current_request_id() is None